@@ -0,0 +1,186 @@
+import os
+from multiprocessing import Pool
+import numpy as np
+from algorithms.shortest_path_search import create_search
+
+# Criteria with all-pairs tables, with the layover time added to every flight (see ShortestPathSearch).
+# 'layovers' holds the number of flights of the path with the fewest flights.
+ALL_PAIRS_METRICS = {'distance': 0, 'cost': 0, 'duration': 2, 'layovers': 0}
+# Number of source airports computed per task sent to a worker process
+SOURCES_PER_TASK = 32
+
+# Compiled graph of a worker process, set once by init_worker instead of being sent with every task
+worker_graph = None
+
+
+def init_worker(compiled):
+    global worker_graph
+    worker_graph = compiled
+
+
+def compute_rows(sources, compiled=None):
+    """
+        Compute the all-pairs table rows of some source airports.
+
+        Args:
+            sources (list of int): The airport ids of the sources.
+            compiled (CompiledGraph): The compiled graph, defaults to the graph of the worker process.
+
+        Returns:
+            tuple: The sources and, per criterion, the (weights, next hops) rows of the sources.
+    """
+    compiled = compiled if compiled is not None else worker_graph
+    node_count = compiled.node_count
+    rows = {}
+    for weight_name, layover_time in ALL_PAIRS_METRICS.items():
+        weights = np.full((len(sources), node_count), np.inf, dtype=np.float64)
+        next_hops = np.full((len(sources), node_count), -1, dtype=np.int32)
+        for row, source in enumerate(sources):
+            search = create_search(compiled, source, weight_name, layover_time)
+            search.search()
+            best, previous = search.best, search.previous
+            weights[row, list(best)] = list(best.values())
+            for target, next_hop in first_hops(source, best, previous).items():
+                next_hops[row, target] = next_hop
+        rows[weight_name] = (weights, next_hops)
+    return sources, rows
+
+
+def first_hops(source, best, previous):
+    # First airport after the source on the path to every reachable airport, following the predecessors
+    hops = {source: source}
+    for target in best:
+        chain = []
+        while target not in hops:
+            chain.append(target)
+            target = previous[target]
+        hop = hops[target]
+        for node in reversed(chain):
+            hop = node if hop == source else hop
+            hops[node] = hop
+    return hops
+
+
+class AllPairsTables:
+    """
+        Precomputed best weights and next-hop matrices between every pair of airports.
+
+        ``weights[criterion][s, t]`` is the best weight from s to t (inf when unreachable) and
+        ``next_hops[criterion][s, t]`` the airport after s on that best path (-1 when unreachable), so a path is
+        read in one lookup per flight. The tables take ``node_count ** 2`` entries per criterion, which is a few
+        MB for the Europe graph.
+    """
+
+    def __init__(self, compiled, weights, next_hops):
+        """
+            Args:
+                compiled (CompiledGraph): The compiled flight graph the tables belong to.
+                weights (dict): Criterion -> matrix of best weights.
+                next_hops (dict): Criterion -> matrix of next hops.
+        """
+        self.compiled = compiled
+        self.weights = weights
+        self.next_hops = next_hops
+
+    @classmethod
+    def build(cls, compiled, processes=None):
+        """
+            Compute the tables, spreading the source airports over a pool of worker processes.
+
+            Args:
+                compiled (CompiledGraph): The compiled flight graph.
+                processes (int): The number of worker processes, defaults to the number of CPUs. With a single
+                                 process the tables are computed in this process.
+
+            Returns:
+                AllPairsTables: The tables.
+        """
+        node_count = compiled.node_count
+        # Store the matrices compactly: weights as float32, next hops in the smallest integer type that fits
+        hop_type = np.int16 if node_count < np.iinfo(np.int16).max else np.int32
+        weights = {name: np.full((node_count, node_count), np.inf, dtype=np.float32) for name in ALL_PAIRS_METRICS}
+        next_hops = {name: np.full((node_count, node_count), -1, dtype=hop_type) for name in ALL_PAIRS_METRICS}
+
+        tasks = [list(range(start, min(start + SOURCES_PER_TASK, node_count)))
+                 for start in range(0, node_count, SOURCES_PER_TASK)]
+        processes = processes if processes is not None else os.cpu_count() or 1
+
+        def store(result):
+            sources, rows = result
+            for name, (weight_rows, next_hop_rows) in rows.items():
+                weights[name][sources] = weight_rows
+                next_hops[name][sources] = next_hop_rows
+
+        if processes <= 1:
+            for sources in tasks:
+                store(compute_rows(sources, compiled))
+        else:
+            with Pool(processes, initializer=init_worker, initargs=(compiled,)) as pool:
+                for result in pool.imap_unordered(compute_rows, tasks):
+                    store(result)
+        return cls(compiled, weights, next_hops)
+
+    def supports(self, weight_name, layover_time):
+        return weight_name in self.weights and ALL_PAIRS_METRICS[weight_name] == layover_time
+
+    def path(self, source, target, weight_name):
+        """
+            Read the best path between two airports from the next-hop matrix.
+
+            Args:
+                source (int): The airport id of the source.
+                target (int): The airport id of the target.
+                weight_name (str): The criterion ('distance', 'cost', 'duration' or 'layovers').
+
+            Returns:
+                list or None: The airport ids along the path, or None if the target is unreachable.
+        """
+        next_hops = self.next_hops[weight_name]
+        if next_hops[source, target] < 0:
+            return None
+        path = [source]
+        while path[-1] != target:
+            path.append(int(next_hops[path[-1], target]))
+        return path
+
+    def save(self, path):
+        """
+            Write the tables to a compressed .npz file.
+
+            Args:
+                path (str): The file to write.
+        """
+        arrays = {'fingerprint': np.array([self.compiled.fingerprint()])}
+        for name in self.weights:
+            arrays[f"{name}/weights"] = self.weights[name]
+            arrays[f"{name}/next_hops"] = self.next_hops[name]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+
+    @classmethod
+    def load(cls, path, compiled):
+        """
+            Read tables written by save.
+
+            Args:
+                path (str): The file to read.
+                compiled (CompiledGraph): The compiled graph the tables must belong to.
+
+            Returns:
+                AllPairsTables or None: The tables, or None if the file is missing or was built for a
+                                        different graph.
+        """
+        if not os.path.isfile(path):
+            return None
+        weights, next_hops = {}, {}
+        with np.load(path) as data:
+            if str(data['fingerprint'][0]) != compiled.fingerprint():
+                return None
+            for key in data.files:
+                if '/' in key:
+                    name, table = key.split('/')
+                    (weights if table == 'weights' else next_hops)[name] = data[key]
+        return cls(compiled, weights, next_hops)
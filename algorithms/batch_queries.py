@@ -0,0 +1,80 @@
+import os
+from multiprocessing import Pool
+
+# Flight graph of a worker process, set once by init_worker instead of being sent with every task
+worker_graph = None
+
+
+def init_worker(graph):
+    global worker_graph
+    worker_graph = graph
+
+
+def run_queries(task, graph=None):
+    """
+        Run a group of route queries that share a source airport.
+
+        The queries run one after the other on the same graph, so the cached search from the source is resumed
+        for each destination instead of searching again.
+
+        Args:
+            task (list): Pairs of (input position, query) where a query is (source, destination, criteria) or
+                         (source, destination, criteria, intermediate airports[, optimise order]).
+            graph (FlightGraph): The flight graph, defaults to the graph of the worker process.
+
+        Returns:
+            list: Pairs of (input position, result of find_route).
+    """
+    graph = graph if graph is not None else worker_graph
+    return [(position, graph.find_route(*query)) for position, query in task]
+
+
+def group_by_source(queries):
+    # Group the queries by source airport, ordering the groups by their first query
+    groups = {}
+    for position, query in enumerate(queries):
+        groups.setdefault(query[0], []).append((position, tuple(query)))
+    return list(groups.values())
+
+
+def find_routes_batch(graph, queries, processes=None):
+    """
+        Answer many route queries, grouped by source airport and spread over a pool of worker processes.
+
+        Args:
+            graph (FlightGraph): The flight graph. Every worker process is initialised with a copy of it, so the
+                                 data files are not read again. With more than one process the graph is switched
+                                 to compiled mode first.
+            queries (iterable): The queries, each (source, destination, criteria) or
+                                (source, destination, criteria, intermediate airports[, optimise order]).
+            processes (int): The number of worker processes, defaults to the number of CPUs. With a single
+                             process the queries are answered in this process.
+
+        Yields:
+            dict or None: The result of find_route for every query, in input order, as soon as it and all the
+                          results before it are available.
+    """
+    tasks = group_by_source(list(queries))
+    processes = processes if processes is not None else os.cpu_count() or 1
+
+    if processes <= 1:
+        yield from in_input_order(run_queries(task, graph) for task in tasks)
+        return
+
+    # Compile before starting the workers so they do not each build the arrays
+    graph.compile()
+    chunk_size = max(1, len(tasks) // (processes * 4))
+    with Pool(processes, initializer=init_worker, initargs=(graph,)) as pool:
+        yield from in_input_order(pool.imap(run_queries, tasks, chunk_size))
+
+
+def in_input_order(task_results):
+    # Release the results of the groups in input order. Groups come back in order of their first query, so
+    # every result is released as soon as all the results in front of it are available.
+    pending = {}  # Input position -> result waiting for the results in front of it
+    next_position = 0
+    for results in task_results:
+        pending.update(results)
+        while next_position in pending:
+            yield pending.pop(next_position)
+            next_position += 1
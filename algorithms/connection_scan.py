@@ -0,0 +1,150 @@
+from bisect import bisect_left, bisect_right
+
+# Shortest time in minutes to change flights at an airport
+MIN_CONNECTION_TIME = 45
+
+
+class ConnectionScan:
+    """
+        Connection Scan Algorithm over the departure-sorted connections of a timetable.
+
+        Earliest arrival queries scan the connections once in departure order from the departure time. A flight
+        is taken when its airport was reached in time to change flights (the source needs no change) and it
+        improves the arrival at its destination, and the scan stops at the first flight leaving after the
+        target was reached. Profile queries scan the connections once in reverse and keep, for every airport,
+        the Pareto set of (departure, arrival at the target) pairs, which gives the best journeys for every
+        departure time in a range from one scan.
+    """
+
+    def __init__(self, timetable, min_connection_time=MIN_CONNECTION_TIME):
+        """
+            Args:
+                timetable (Timetable): The timetable to scan.
+                min_connection_time (int): The shortest time in minutes between the arrival of a flight and the
+                                           departure of the next one.
+        """
+        self.timetable = timetable
+        self.min_connection_time = min_connection_time
+        connections = timetable.connections
+        self.departure_stops = connections['departure_stop'].tolist()
+        self.arrival_stops = connections['arrival_stop'].tolist()
+        self.departure_times = connections['departure_time'].tolist()
+        self.arrival_times = connections['arrival_time'].tolist()
+
+    def scan(self, source, departure_time, target=None):
+        """
+            Scan the connections from a departure time for the earliest arrival at every airport.
+
+            Args:
+                source (int): The airport id of the source in the timetable.
+                departure_time (int): The earliest departure in minutes.
+                target (int): Optional airport id of the target, after whose earliest arrival the scan stops.
+
+            Returns:
+                tuple: The earliest arrival at every airport (inf if not reached) and the connection reaching it
+                       (-1 for none).
+        """
+        node_count = len(self.timetable.iata_codes)
+        arrivals = [float('inf')] * node_count
+        ready = [float('inf')] * node_count  # Earliest departure of a next flight from every airport
+        in_connections = [-1] * node_count
+        arrivals[source] = ready[source] = departure_time
+
+        departure_stops, arrival_stops = self.departure_stops, self.arrival_stops
+        departure_times, arrival_times = self.departure_times, self.arrival_times
+        for connection in range(bisect_left(departure_times, departure_time), len(departure_times)):
+            departure = departure_times[connection]
+            if target is not None and departure >= arrivals[target]:
+                break
+            if ready[departure_stops[connection]] <= departure:
+                arrival, stop = arrival_times[connection], arrival_stops[connection]
+                if arrival < arrivals[stop]:
+                    arrivals[stop] = arrival
+                    ready[stop] = arrival + self.min_connection_time
+                    in_connections[stop] = connection
+        return arrivals, in_connections
+
+    def earliest_arrival(self, source, target, departure_time):
+        """
+            Find the journey that reaches an airport first when leaving at or after a time.
+
+            Args:
+                source (int): The airport id of the source in the timetable.
+                target (int): The airport id of the target in the timetable.
+                departure_time (int): The earliest departure in minutes.
+
+            Returns:
+                list of int or None: The connections of the journey in order, or None if the target cannot be
+                                     reached within the timetable.
+        """
+        _, in_connections = self.scan(source, departure_time, target)
+        if target != source and in_connections[target] < 0:
+            return None
+        journey = []
+        stop = target
+        while stop != source:
+            journey.append(in_connections[stop])
+            stop = self.departure_stops[journey[-1]]
+        journey.reverse()
+        return journey
+
+    def profile(self, source, target, earliest_departure=0, latest_departure=None):
+        """
+            Find the best journeys between two airports for every departure time in a range.
+
+            Args:
+                source (int): The airport id of the source in the timetable.
+                target (int): The airport id of the target in the timetable.
+                earliest_departure (int): The earliest departure in minutes.
+                latest_departure (int): The latest departure in minutes, or None for no limit.
+
+            Returns:
+                list of list of int: The connections of every Pareto-optimal journey, earliest departure first.
+                                     Each journey leaves later and arrives later than the one before it.
+        """
+        node_count = len(self.timetable.iata_codes)
+        # Profile of every airport, added to in decreasing departure and so increasing negated departure.
+        # Arrivals at the target decrease along a profile, as later departures must arrive later to be kept.
+        departures = [[] for _ in range(node_count)]
+        arrivals = [[] for _ in range(node_count)]
+        connections = [[] for _ in range(node_count)]
+
+        def next_connection(stop, ready):
+            # Position in the profile of an airport of the best journey leaving it at or after a time
+            return bisect_right(departures[stop], -ready) - 1
+
+        departure_stops, arrival_stops = self.departure_stops, self.arrival_stops
+        departure_times, arrival_times = self.departure_times, self.arrival_times
+        for connection in range(len(departure_times) - 1, bisect_left(departure_times, earliest_departure) - 1, -1):
+            stop, departure = departure_stops[connection], departure_times[connection]
+            if stop == source and latest_departure is not None and departure > latest_departure:
+                continue
+            next_stop = arrival_stops[connection]
+            if next_stop == target:
+                arrival = arrival_times[connection]
+            else:
+                position = next_connection(next_stop, arrival_times[connection] + self.min_connection_time)
+                if position < 0:
+                    continue
+                arrival = arrivals[next_stop][position]
+
+            if arrivals[stop] and arrival >= arrivals[stop][-1]:
+                continue
+            if departures[stop] and departures[stop][-1] == -departure:
+                # Same departure as the last journey kept, but an earlier arrival
+                departures[stop].pop()
+                arrivals[stop].pop()
+                connections[stop].pop()
+            departures[stop].append(-departure)
+            arrivals[stop].append(arrival)
+            connections[stop].append(connection)
+
+        journeys = []
+        for connection in reversed(connections[source]):
+            journey = [connection]
+            while arrival_stops[journey[-1]] != target:
+                stop = arrival_stops[journey[-1]]
+                position = next_connection(stop, arrival_times[journey[-1]] + self.min_connection_time)
+                journey.append(connections[stop][position])
+            journeys.append(journey)
+        return journeys
@@ -0,0 +1,257 @@
+import heapq
+from itertools import count
+import numpy as np
+from algorithms.multi_leg import LAYOVER_TIME
+
+# Layover time added to a budgeted weight at every connection, as in the route information
+BUDGET_LAYOVER_TIMES = {'distance': 0, 'cost': 0, 'duration': LAYOVER_TIME}
+
+
+class HopLimitedTables:
+    """
+        Best weight from one source to every airport for every number of flights up to a limit, computed with a
+        hop-limited Bellman-Ford over the compiled arrays.
+
+        Row h of the table holds the best weight of the paths with at most h flights. Each row is computed from
+        the previous one in one vectorised pass over the incoming routes of every airport, which the reverse CSR
+        index keeps together: the best route into each airport is a segmented minimum. The whole table takes at
+        most max_flights passes and answers every destination and number of flights from one source.
+    """
+
+    def __init__(self, compiled, source, weight_name, max_flights, layover_time=0):
+        """
+            Args:
+                compiled (CompiledGraph): The compiled flight graph.
+                source (int): The airport id of the source.
+                weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration'), or
+                                   'layovers' for the fewest flights.
+                max_flights (int): The largest number of flights.
+                layover_time (float): Weight added at every connection.
+        """
+        self.compiled = compiled
+        self.source = source
+        # Only the flights are counted for the fewest flights
+        self.layover_time = layover_time if weight_name != 'layovers' else 0
+        self.edge_sources = compiled.edge_sources()
+
+        node_count = compiled.node_count
+        edge_weights = np.ones(compiled.edge_count) if weight_name == 'layovers' else compiled.weights[weight_name]
+        in_degree = np.diff(compiled.reverse_offsets)
+        has_routes = in_degree > 0
+        segment_starts = compiled.reverse_offsets[:-1][has_routes]
+        reverse_targets = np.repeat(np.arange(node_count), in_degree)  # Destination of every incoming route
+        # The layover is added to every flight and taken off again once per path (see weight)
+        reverse_weights = edge_weights[compiled.reverse_edges] + self.layover_time
+
+        self.weights = np.full((max_flights + 1, node_count), np.inf)
+        self.weights[0, source] = 0
+        # Route taken last by the best path of every row, -1 when it is the path of the row above
+        self.parent_edges = np.full((max_flights + 1, node_count), -1, dtype=np.int64)
+        for flights in range(1, max_flights + 1):
+            previous = self.weights[flights - 1]
+            candidates = previous[compiled.reverse_sources] + reverse_weights
+            best_in = np.full(node_count, np.inf)
+            if len(segment_starts):
+                best_in[has_routes] = np.minimum.reduceat(candidates, segment_starts)
+            improved = best_in < previous
+            if not improved.any():
+                # No path gets better with more flights
+                self.weights[flights:] = previous
+                break
+            self.weights[flights] = np.where(improved, best_in, previous)
+            # The first incoming route reaching the minimum of every improved airport
+            reaching = np.flatnonzero(improved[reverse_targets] & (candidates == best_in[reverse_targets]))
+            airports, first = np.unique(reverse_targets[reaching], return_index=True)
+            self.parent_edges[flights, airports] = compiled.reverse_edges[reaching[first]]
+
+    @property
+    def max_flights(self):
+        return self.weights.shape[0] - 1
+
+    def weight(self, target, max_flights=None):
+        """
+            Get the best weight from the source to an airport.
+
+            Args:
+                target (int): The airport id of the target.
+                max_flights (int): The largest number of flights, defaults to the limit of the table.
+
+            Returns:
+                float: The weight of the best path with the layover time of every connection, inf if no path has
+                       that few flights.
+        """
+        flights = self.max_flights if max_flights is None else min(max_flights, self.max_flights)
+        weight = float(self.weights[flights, target])
+        return weight - self.layover_time if target != self.source and weight != float('inf') else weight
+
+    def path_to(self, target, max_flights=None):
+        """
+            Rebuild the best path from the source to an airport.
+
+            Args:
+                target (int): The airport id of the target.
+                max_flights (int): The largest number of flights, defaults to the limit of the table.
+
+            Returns:
+                list or None: The airport ids along the path, or None if no path has that few flights.
+        """
+        flights = self.max_flights if max_flights is None else min(max_flights, self.max_flights)
+        if self.weights[flights, target] == np.inf:
+            return None
+        path = [target]
+        while True:
+            while flights > 0 and self.parent_edges[flights, path[-1]] < 0:
+                flights -= 1
+            if flights == 0:
+                break
+            path.append(int(self.edge_sources[self.parent_edges[flights, path[-1]]]))
+            flights -= 1
+        path.reverse()
+        return path
+
+
+class BudgetSearch:
+    """
+        Label-setting search for the best paths from one source to every airport within budgets on other
+        weights, and optionally within a number of flights.
+
+        A label is one path to an airport with its weight, its budgeted weights and its number of flights.
+        Labels are settled in order of weight and labels over a budget are dropped. A label is also dropped when a
+        label already settled at its airport uses no more of any budget (and no more flights), as that path is at
+        least as good and can be extended by every route this one can. The first label settled at an airport is
+        then its best path within the budgets, so one run from the source answers every destination.
+    """
+
+    def __init__(self, search_graph, source, weight_name, layover_time=0, budgets=None, max_flights=None):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to search.
+                source: The node id of the source airport in the search graph.
+                weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration'), or
+                                   'layovers' for the fewest flights.
+                layover_time (float): Weight added at every connection.
+                budgets (dict): Largest total of other weights ('distance', 'cost' or 'duration'), each with the
+                                layover time of BUDGET_LAYOVER_TIMES at every connection.
+                max_flights (int): The largest number of flights, or None for no limit.
+        """
+        self.search_graph = search_graph
+        self.source = source
+        self.weight_name = weight_name
+        self.layover_time = layover_time
+        self.budgets = dict(budgets or {})
+        self.max_flights = max_flights
+        self.labels = []  # (node, parent label, weight, budgeted weights, flights) of every label
+        self.settled = {}  # Node -> (budgeted weights, flights) of the labels settled at it
+        self.best_labels = {}  # Node -> first label settled at it
+
+    def is_dominated(self, node, spent, flights):
+        for settled_spent, settled_flights in self.settled.get(node, ()):
+            if all(a <= b for a, b in zip(settled_spent, spent)) and \
+                    (self.max_flights is None or settled_flights <= flights):
+                return True
+        return False
+
+    def search(self):
+        """
+            Settle the labels until every airport has its best path within the budgets.
+        """
+        budget_names = list(self.budgets)
+        limits = [self.budgets[name] for name in budget_names]
+        budget_layovers = [BUDGET_LAYOVER_TIMES[name] for name in budget_names]
+        layovers = self.weight_name == 'layovers'
+        # Any weight gives the routes when only the flights are counted
+        edge_names = ['distance' if layovers else self.weight_name] + budget_names
+        out_edges = self.search_graph.out_edges
+
+        counter = count()
+        self.labels.append((self.source, -1, 0, (0,) * len(budget_names), 0))
+        queue = [(0, next(counter), 0)]
+        while queue:
+            weight, _, label = heapq.heappop(queue)
+            node, _, _, spent, flights = self.labels[label]
+            if self.is_dominated(node, spent, flights):
+                continue
+            self.settled.setdefault(node, []).append((spent, flights))
+            self.best_labels.setdefault(node, label)
+            if self.max_flights is not None and flights >= self.max_flights:
+                continue
+
+            # Layovers only count at connections, not before the first flight
+            connection = 1 if flights > 0 else 0
+            for (neighbour, edge_weight), *budget_edges in zip(*(out_edges(node, name) for name in edge_names)):
+                new_spent = tuple(total + edge + layover * connection for total, (_, edge), layover
+                                  in zip(spent, budget_edges, budget_layovers))
+                if any(total > limit for total, limit in zip(new_spent, limits)) or \
+                        self.is_dominated(neighbour, new_spent, flights + 1):
+                    continue
+                new_weight = weight + (1 if layovers else edge_weight + self.layover_time * connection)
+                self.labels.append((neighbour, label, new_weight, new_spent, flights + 1))
+                heapq.heappush(queue, (new_weight, next(counter), len(self.labels) - 1))
+
+    def weight(self, target):
+        # Weight of the best path to an airport within the budgets, inf if there is none
+        label = self.best_labels.get(target)
+        return self.labels[label][2] if label is not None else float('inf')
+
+    def path_to(self, target):
+        """
+            Rebuild the best path from the source to an airport within the budgets.
+
+            Args:
+                target: The node id of the target airport.
+
+            Returns:
+                list or None: The node ids along the path, or None if no path is within the budgets.
+        """
+        label = self.best_labels.get(target)
+        if label is None:
+            return None
+        path = []
+        while label >= 0:
+            path.append(self.labels[label][0])
+            label = self.labels[label][1]
+        path.reverse()
+        return path
+
+
+def find_constrained_paths(graph, source_airport, weight_name, layover_time=0, max_flights=None, budgets=None):
+    """
+        Find the best path from a source to every airport within a number of flights and budgets on other weights.
+
+        With only a number of flights on the compiled graph the paths come from the hop-limited Bellman-Ford
+        tables, otherwise from a budget label-setting search. Either way one run from the source answers every
+        destination.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration'), or
+                               'layovers' for the fewest flights.
+            layover_time (float): Weight added at every connection.
+            max_flights (int): The largest number of flights, or None for no limit.
+            budgets (dict): Largest total of other weights, such as {'cost': 300} (see BudgetSearch).
+
+        Returns:
+            dict: Destination IATA code -> (weight, IATA codes along the path) of every other airport with a path
+                  within the constraints.
+    """
+    compiled = graph.get_compiled()
+    if compiled is not None and max_flights is not None and not budgets:
+        search = HopLimitedTables(compiled, compiled.node_id(source_airport), weight_name, max_flights, layover_time)
+        weights = search.weights[search.max_flights]
+        reached = np.flatnonzero(weights != np.inf).tolist()
+        search_graph = compiled
+    else:
+        search_graph = graph.get_search_graph()
+        search = BudgetSearch(search_graph, search_graph.node_id(source_airport), weight_name, layover_time,
+                              budgets, max_flights)
+        search.search()
+        reached = list(search.best_labels)
+
+    source = search_graph.node_id(source_airport)
+    paths = {}
+    for node in reached:
+        if node != source:
+            path = search_graph.path_to_iata(search.path_to(node))
+            paths[path[-1]] = (search.weight(node), path)
+    return paths
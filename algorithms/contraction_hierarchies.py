@@ -0,0 +1,314 @@
+import heapq
+import os
+from itertools import count
+import numpy as np
+
+# Metrics preprocessed by default, with the layover time added to every flight (see ShortestPathSearch)
+CH_METRICS = {'distance': 0, 'cost': 0, 'duration': 2}
+# Maximum number of airports settled by a witness search before a shortcut is added anyway
+WITNESS_SETTLE_LIMIT = 20
+
+
+class ContractionHierarchy:
+    """
+        Contraction Hierarchies over a compiled flight graph.
+
+        Preprocessing contracts the airports one at a time in order of importance (edge difference plus the
+        number of contracted neighbours), adding a shortcut between two neighbours of the contracted airport
+        whenever a bounded witness search finds no path at least as good that avoids it. Every edge then goes
+        either up or down the hierarchy. A query runs a bidirectional search that only follows upward edges from
+        the source and (backwards) from the target, and unpacks the shortcuts of the best meeting path.
+        Each metric (distance, cost, duration) has its own hierarchy.
+    """
+
+    def __init__(self, compiled, metrics=None):
+        """
+            Args:
+                compiled (CompiledGraph): The compiled flight graph the hierarchy belongs to.
+                metrics (dict): Already preprocessed hierarchies by weight name, as built by contract_metric.
+        """
+        self.compiled = compiled
+        self.metrics = metrics if metrics is not None else {}
+        # Shortcut lookup (source, destination) -> contracted middle airport, per weight name
+        self.middles = {weight_name: self.build_middles(metric) for weight_name, metric in self.metrics.items()}
+
+    @classmethod
+    def build(cls, compiled, metrics=None):
+        """
+            Preprocess a hierarchy for each metric.
+
+            Args:
+                compiled (CompiledGraph): The compiled flight graph.
+                metrics (dict): Weight name -> layover time added to every flight, defaults to CH_METRICS.
+
+            Returns:
+                ContractionHierarchy: The preprocessed hierarchy.
+        """
+        metrics = metrics if metrics is not None else CH_METRICS
+        sources = compiled.edge_sources().tolist()
+        targets = compiled.targets.tolist()
+        built = {}
+        for weight_name, layover_time in metrics.items():
+            weights = [weight + layover_time for weight in compiled.weights[weight_name].tolist()]
+            built[weight_name] = contract_metric(compiled.node_count, sources, targets, weights)
+            built[weight_name]['layover_time'] = np.array([layover_time], dtype=np.float64)
+        return cls(compiled, built)
+
+    @staticmethod
+    def build_middles(metric):
+        middles = {}
+        for prefix, other in (('up', 'up_targets'), ('down', 'down_sources')):
+            offsets, others, middle = metric[prefix + '_offsets'], metric[other], metric[prefix + '_middle']
+            nodes = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+            for node, other_node, middle_node in zip(nodes.tolist(), others.tolist(), middle.tolist()):
+                if middle_node >= 0:
+                    # Down edges are stored at their lower (destination) airport
+                    edge = (node, other_node) if prefix == 'up' else (other_node, node)
+                    middles[edge] = middle_node
+        return middles
+
+    def supports(self, weight_name, layover_time):
+        metric = self.metrics.get(weight_name)
+        return metric is not None and metric['layover_time'][0] == layover_time
+
+    def search(self, source, target, weight_name):
+        """
+            Find the best path between two airports with an upward bidirectional search.
+
+            Args:
+                source (int): The airport id of the source.
+                target (int): The airport id of the target.
+                weight_name (str): The preprocessed metric to minimise.
+
+            Returns:
+                tuple: The airport ids along the unpacked path (or None if unreachable) and the number of
+                       airports settled by the search.
+        """
+        if source == target:
+            return [source], 0
+
+        metric = self.metrics[weight_name]
+        counter = count()
+        forward = (metric['up_offsets'], metric['up_targets'], metric['up_weights'], {source: 0}, {}, set(),
+                   [(0, next(counter), source)])
+        backward = (metric['down_offsets'], metric['down_sources'], metric['down_weights'], {target: 0}, {}, set(),
+                    [(0, next(counter), target)])
+        forward_queue, backward_queue = forward[6], backward[6]
+        best_total = float('inf')
+        meeting_node = None
+
+        while True:
+            # Only keep expanding the sides whose frontier can still improve the best meeting path
+            forward_active = forward_queue and forward_queue[0][0] < best_total
+            backward_active = backward_queue and backward_queue[0][0] < best_total
+            if forward_active and (not backward_active or forward_queue[0][0] <= backward_queue[0][0]):
+                (offsets, others, weights, best, links, settled, queue), other_best = forward, backward[3]
+            elif backward_active:
+                (offsets, others, weights, best, links, settled, queue), other_best = backward, forward[3]
+            else:
+                break
+
+            current_weight, _, current = heapq.heappop(queue)
+            if current in settled:
+                continue
+            settled.add(current)
+
+            if current in other_best and current_weight + other_best[current] < best_total:
+                best_total = current_weight + other_best[current]
+                meeting_node = current
+
+            start, end = offsets[current], offsets[current + 1]
+            for neighbour, weight in zip(others[start:end].tolist(), weights[start:end].tolist()):
+                weight_to_neighbour = current_weight + weight
+                if weight_to_neighbour < best.get(neighbour, float('inf')):
+                    best[neighbour] = weight_to_neighbour
+                    links[neighbour] = current
+                    heapq.heappush(queue, (weight_to_neighbour, next(counter), neighbour))
+
+        settled_count = len(forward[5]) + len(backward[5])
+        if meeting_node is None:
+            return None, settled_count
+
+        # Join the upward path from the source with the upward path from the target, then unpack the shortcuts
+        forward_links, backward_links = forward[4], backward[4]
+        packed = [meeting_node]
+        while packed[-1] != source:
+            packed.append(forward_links[packed[-1]])
+        packed.reverse()
+        while packed[-1] != target:
+            packed.append(backward_links[packed[-1]])
+
+        path = [source]
+        middles = self.middles[weight_name]
+        for edge_source, edge_target in zip(packed, packed[1:]):
+            self.unpack_edge(edge_source, edge_target, middles, path)
+        return path, settled_count
+
+    @staticmethod
+    def unpack_edge(edge_source, edge_target, middles, path):
+        # Replace a shortcut by the two edges it bypasses, recursively, appending the airports after edge_source
+        stack = [(edge_source, edge_target)]
+        while stack:
+            edge = stack.pop()
+            middle = middles.get(edge)
+            if middle is None:
+                path.append(edge[1])
+            else:
+                stack.append((middle, edge[1]))
+                stack.append((edge[0], middle))
+
+    def save(self, path):
+        """
+            Write the hierarchy to a compressed .npz file.
+
+            Args:
+                path (str): The file to write.
+        """
+        arrays = {'fingerprint': np.array([self.compiled.fingerprint()])}
+        for weight_name, metric in self.metrics.items():
+            for name, array in metric.items():
+                arrays[f"{weight_name}/{name}"] = array
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+
+    @classmethod
+    def load(cls, path, compiled):
+        """
+            Read a hierarchy written by save.
+
+            Args:
+                path (str): The file to read.
+                compiled (CompiledGraph): The compiled graph the hierarchy must belong to.
+
+            Returns:
+                ContractionHierarchy or None: The hierarchy, or None if the file is missing or was built
+                                              for a different graph.
+        """
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            if str(data['fingerprint'][0]) != compiled.fingerprint():
+                return None
+            metrics = {}
+            for key in data.files:
+                if key != 'fingerprint':
+                    weight_name, name = key.split('/')
+                    metrics.setdefault(weight_name, {})[name] = data[key]
+        return cls(compiled, metrics)
+
+
+def contract_metric(node_count, sources, targets, weights):
+    """
+        Contract every airport of a graph for one metric.
+
+        Args:
+            node_count (int): The number of airports.
+            sources (list of int): The source airport id of every edge.
+            targets (list of int): The destination airport id of every edge.
+            weights (list of float): The weight of every edge.
+
+        Returns:
+            dict: The hierarchy as arrays: 'rank' of every airport, the upward edges in CSR form
+                  ('up_offsets', 'up_targets', 'up_weights', 'up_middle') and the downward edges stored at their
+                  lower destination ('down_offsets', 'down_sources', 'down_weights', 'down_middle'). A middle of -1
+                  marks an original route, anything else the airport a shortcut bypasses.
+    """
+    out_edges = [{} for _ in range(node_count)]
+    in_edges = [{} for _ in range(node_count)]
+    middle = {}
+    for source, target, weight in zip(sources, targets, weights):
+        if source != target and weight < out_edges[source].get(target, float('inf')):
+            out_edges[source][target] = weight
+            in_edges[target][source] = weight
+
+    def witness_distances(start, skipped, limit, targets):
+        # Bounded Dijkstra from start that avoids the airport being contracted, stopping once all targets settle
+        best = {start: 0}
+        settled = 0
+        remaining = len(targets)
+        queue = [(0, start)]
+        while queue and settled < WITNESS_SETTLE_LIMIT and remaining:
+            weight, current = heapq.heappop(queue)
+            if weight > best[current]:
+                continue
+            settled += 1
+            if current in targets:
+                remaining -= 1
+            for neighbour, edge_weight in out_edges[current].items():
+                weight_to_neighbour = weight + edge_weight
+                # Paths longer than the path through the contracted airport can never be witnesses
+                if weight_to_neighbour <= limit and neighbour != skipped \
+                        and weight_to_neighbour < best.get(neighbour, float('inf')):
+                    best[neighbour] = weight_to_neighbour
+                    heapq.heappush(queue, (weight_to_neighbour, neighbour))
+        return best
+
+    def shortcuts_needed(node):
+        shortcuts = []
+        for source, in_weight in in_edges[node].items():
+            through = {target: in_weight + out_weight for target, out_weight in out_edges[node].items()
+                       if target != source}
+            if not through:
+                continue
+            witnesses = witness_distances(source, node, max(through.values()), through)
+            for target, weight in through.items():
+                if witnesses.get(target, float('inf')) > weight:
+                    shortcuts.append((source, target, weight))
+        return shortcuts
+
+    contracted_neighbours = [0] * node_count
+
+    def priority(node, shortcut_count):
+        return shortcut_count - len(in_edges[node]) - len(out_edges[node]) + contracted_neighbours[node]
+
+    # Start from the worst case of one shortcut per in/out pair; priorities are recomputed when popped
+    queue = [(priority(node, len(in_edges[node]) * len(out_edges[node])), node) for node in range(node_count)]
+    heapq.heapify(queue)
+
+    rank = [0] * node_count
+    up_edges = [None] * node_count
+    down_edges = [None] * node_count
+    next_rank = 0
+    while queue:
+        _, node = heapq.heappop(queue)
+        # Lazy update: recompute the priority and contract only if the airport is still the least important
+        shortcuts = shortcuts_needed(node)
+        current_priority = priority(node, len(shortcuts))
+        if queue and current_priority > queue[0][0]:
+            heapq.heappush(queue, (current_priority, node))
+            continue
+
+        rank[node] = next_rank
+        next_rank += 1
+        # The remaining edges of the airport all lead to airports contracted later, i.e. higher in the hierarchy
+        up_edges[node] = [(target, weight, middle.get((node, target), -1))
+                          for target, weight in out_edges[node].items()]
+        down_edges[node] = [(source, weight, middle.get((source, node), -1))
+                            for source, weight in in_edges[node].items()]
+
+        for source in in_edges[node]:
+            del out_edges[source][node]
+            contracted_neighbours[source] += 1
+        for target in out_edges[node]:
+            del in_edges[target][node]
+            contracted_neighbours[target] += 1
+        out_edges[node] = {}
+        in_edges[node] = {}
+
+        for source, target, weight in shortcuts:
+            if weight < out_edges[source].get(target, float('inf')):
+                out_edges[source][target] = weight
+                in_edges[target][source] = weight
+                middle[(source, target)] = node
+
+    hierarchy = {'rank': np.array(rank, dtype=np.int32)}
+    for prefix, other, edges in (('up', 'up_targets', up_edges), ('down', 'down_sources', down_edges)):
+        hierarchy[prefix + '_offsets'] = np.cumsum([0] + [len(node_edges) for node_edges in edges], dtype=np.int64)
+        flat = [edge for node_edges in edges for edge in node_edges]
+        hierarchy[other] = np.array([edge[0] for edge in flat], dtype=np.int32)
+        hierarchy[prefix + '_weights'] = np.array([edge[1] for edge in flat], dtype=np.float64)
+        hierarchy[prefix + '_middle'] = np.array([edge[2] for edge in flat], dtype=np.int32)
+    return hierarchy
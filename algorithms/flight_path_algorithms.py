@@ -1,16 +1,120 @@
-import heapq
-from collections import deque
+from algorithms.shortest_path_search import find_route_path, find_bidirectional_route_path, \
+    find_bidirectional_layovers_path, find_optimal_flight_path
+from algorithms.multi_leg import find_multi_leg_route
+from algorithms.rerouting import find_candidate_airports
+
+# Search modes of Dijkstra's distance, cost and duration queries
+SEARCH_MODES = ['unidirectional', 'bidirectional', 'contraction hierarchies', 'goal directed']
+# Search modes of BFS's least layovers queries
+BFS_SEARCH_MODES = ['bidirectional', 'unidirectional']
+
+
+def find_rerouted_path(graph, source_airport, destination_airport, find_shortest_path):
+    """
+        Check that flights leave the source, then find the best path with the search of a criteria, rerouting to
+        the nearest airport to the destination that the source reaches when none of its flights can be reached.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            find_shortest_path (callable): (source, destination) -> IATA codes along the best path, or None.
+
+        Returns:
+            list or None: The IATA codes along the best path, or None if no valid route is found.
+    """
+    # Check if flight data from source airport exist in the graph
+    if not graph.get_routes(source_airport):
+        print(f"Flights from '{source_airport}' do not exist.")
+        return None
+
+    # Check if flight data to destination airport exist in the graph
+    if not graph.get_routes_to(destination_airport):
+        print(f"Flights to '{destination_airport}' do not exist")
+    else:
+        # The reachability index rules an unreachable destination out without searching
+        if graph.is_reachable(source_airport, destination_airport) is not False:
+            shortest_path = find_shortest_path(source_airport, destination_airport)
+            if shortest_path is not None:
+                return shortest_path
+        print(f"No flights from {source_airport} to {destination_airport}.")
+
+    # Try the airports nearest to the destination in order of distance and take the first the source reaches
+    for airport, _ in find_candidate_airports(graph, source_airport, destination_airport):
+        if graph.is_reachable(source_airport, airport) is False:
+            continue
+        shortest_path = find_shortest_path(source_airport, airport)
+        if shortest_path is not None:
+            print(f"Rerouting to nearest airport {airport}.")
+            return shortest_path
+    print(f"No flights found to {destination_airport} or nearest airports.")
+    return None
+
+
+def route_information(graph, path):
+    # Route information of a path, or None if no path was found
+    return graph.get_route_information(path) if path is not None else None
 
 
 class Dijkstra:
-    def __init__(self, graph):
+    def __init__(self, graph, search_mode='unidirectional'):
         """
         Initialize Dijkstra's algorithm with the given graph.
 
         Args:
             graph (Graph): The graph representing flight routes.
+            search_mode (str): 'unidirectional' to search from the source only, 'bidirectional' to also
+                               search backwards from the destination over the routes_to index, or
+                               'contraction hierarchies' to query the graph's preprocessed hierarchy
+                               (see FlightGraph.prepare_contraction_hierarchy), or 'goal directed' to run
+                               AStar with its best available heuristic.
         """
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Invalid search mode: '{search_mode}'")
         self.graph = graph
+        self.search_mode = search_mode
+
+    def find_shortest_path(self, source_airport, destination_airport, weight_name, layover_time=0):
+        """
+            Find the path minimising a weight between two airports with the shared shortest path search.
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration').
+                layover_time (float): Layover time added for every connecting flight.
+
+            Returns:
+                list or None: The IATA codes along the best path, or None if the destination is unreachable.
+        """
+        # Look the path up when all-pairs tables were prepared for the current graph
+        answered, shortest_path = self.graph.get_all_pairs_path(source_airport, destination_airport, weight_name,
+                                                                layover_time)
+        if answered:
+            return shortest_path
+
+        if self.search_mode == 'goal directed':
+            return self.graph.astar.find_shortest_path(source_airport, destination_airport, weight_name,
+                                                       layover_time)
+
+        hierarchy = self.graph.contraction_hierarchy
+        if self.search_mode == 'contraction hierarchies' and hierarchy is not None \
+                and hierarchy.compiled is self.graph.get_compiled() and hierarchy.supports(weight_name, layover_time):
+            compiled = hierarchy.compiled
+            path, _ = hierarchy.search(compiled.index[source_airport], compiled.index[destination_airport],
+                                       weight_name)
+            return compiled.path_to_iata(path) if path is not None else None
+        if self.search_mode == 'bidirectional':
+            return find_bidirectional_route_path(self.graph, source_airport, destination_airport, weight_name,
+                                                 layover_time)
+        return find_route_path(self.graph, source_airport, destination_airport, weight_name, layover_time)
+
+    def find_leg_path(self, source_airport, destination_airport, weight_name, layover_time=0):
+        # Best path of a single leg, with the existence checks and nearest-airport rerouting
+        def find_shortest_path(source, destination):
+            return self.find_shortest_path(source, destination, weight_name, layover_time)
+
+        return find_rerouted_path(self.graph, source_airport, destination_airport, find_shortest_path)
 
     # find the shortest distance path between two airports using Dijkstra's shortest path algorithm
     def find_shortest_distance(self, source_airport, destination_airport):
@@ -26,72 +130,8 @@ class Dijkstra:
                               including the flight path, segments, total stops, total distance, total cost,
                               total duration, and total layover time. Returns None if no valid route is found.
         """
-        # Check if flight data from source airport exist in the graph
-        if not self.graph.get_routes(source_airport):
-            print(f"Flights from '{source_airport}' do not exist.")
-            return None
-
-        # Check if flight data to destination airport exist in the graph
-        if not self.graph.get_routes_to(destination_airport):
-            print(f"Flights to '{destination_airport}' do not exist")
-            # Find the nearest airport to the destination recursively
-            nearest_airport = self.graph.find_nearest_airport(destination_airport)
-            print(f"Rerouting to nearest airport {nearest_airport}.")
-
-            # Check if the nearest airports has routes to it
-            if nearest_airport is None or not self.graph.get_routes_to(nearest_airport):
-                print(f"No flights to {nearest_airport}.")
-                return None
-
-            destination_airport = nearest_airport
-
-            # Restart the search from the source airport to the nearest airport
-            return self.find_shortest_distance(source_airport, destination_airport)
-
-        # Clear shortest path memory
-        distances = {}
-        previous_airport = {}  # Initialize a dictionary to store the previous airport for each airport
-
-        # Initialize distances to all airports as infinity
-        distances = {airport: float('inf') for airport in self.graph.airports}
-        distances[source_airport] = 0
-
-        # Initialize priority queue with a simple list
-        priority_queue = [(0, source_airport)]
-
-        while priority_queue:
-            current_distance, current_airport = heapq.heappop(priority_queue)
-
-            # If the destination airport is reached, stop
-            if current_airport == destination_airport:
-                break
-
-            # Visit each neighboring airport of the current airport
-            for neighbour in self.graph.get_neighbors(current_airport):
-                distance_to_neighbour = current_distance + self.graph.calculate_distance(current_airport, neighbour)
-                # Update the distance to the neighbor if it's smaller than the recorded distance
-                if distance_to_neighbour < distances[neighbour]:
-                    distances[neighbour] = distance_to_neighbour
-                    #  Update the path taken
-                    previous_airport[neighbour] = current_airport
-                    heapq.heappush(priority_queue, (distance_to_neighbour, neighbour))
-
-        # Reconstruct the shortest path from the previous_airport dictionary
-        shortest_path = []
-        current_airport = destination_airport
-        while current_airport != source_airport:
-            shortest_path.append(current_airport)
-            current_airport = previous_airport[current_airport]
-        shortest_path.append(source_airport)
-
-        # Reverse the path to get it in the correct order
-        shortest_path.reverse()
-
-        # Get route information
-        route = self.graph.get_route_information(shortest_path)
-
-        # Return the route information
-        return route
+        shortest_path = self.find_leg_path(source_airport, destination_airport, 'distance')
+        return route_information(self.graph, shortest_path)
 
     def find_shortest_distance_multi(self, source_airport, destination_airport, intermediate_airports):
         """
@@ -107,40 +147,8 @@ class Dijkstra:
                               including the flight path, segments, total stops, total distance, total cost,
                               total duration, and total layover time. Returns None if no valid route is found.
         """
-        # Initialize variables
-        multi_flight_segments = []
-        current_source = source_airport
-        flight_path = [current_source]
-        total_layover_time = 0
-
-        # Find the shortest distance for each segment of the multi-flight route
-        for intermediate in intermediate_airports + [destination_airport]:
-            intermediate_flight_route = self.find_shortest_distance(current_source, intermediate)
-            if intermediate_flight_route is None:
-                # No valid route found for this segment, return None
-                return None
-            else:
-                flight_path.extend(intermediate_flight_route["path"][1:])
-                multi_flight_segments.extend(intermediate_flight_route["segments"])
-                total_layover_time += intermediate_flight_route["total_layover_time"]
-                current_source = intermediate
-
-        # Process multi-flight route information
-        total_stops = len(multi_flight_segments)
-        total_distance = sum(segment["distance"] for segment in multi_flight_segments)
-        total_cost = sum(segment["cost"] for segment in multi_flight_segments)
-        total_duration = sum(segment["duration"] for segment in multi_flight_segments)
-
-        # Return aggregated information for the multi-flight route
-        return {
-            "path": flight_path,
-            "segments": multi_flight_segments,
-            "total_stops": total_stops,
-            "total_distance": total_distance,
-            "total_cost": total_cost,
-            "total_duration": total_duration,
-            "total_layover_time": total_layover_time
-        }
+        return find_multi_leg_route(self.graph, self.find_leg_path, source_airport, destination_airport,
+                                    intermediate_airports, 'distance')
 
     def find_least_cost(self, source_airport, destination_airport):
         """
@@ -155,72 +163,8 @@ class Dijkstra:
                               including the flight path, segments, total stops, total distance, total cost,
                               total duration, and total layover time. Returns None if no valid route is found.
         """
-        # Check if flight data from source airport exist in the graph
-        if not self.graph.get_routes(source_airport):
-            print(f"Flights from '{source_airport}' do not exist.")
-            return None
-
-        # Check if flight data to destination airport exist in the graph
-        if not self.graph.get_routes_to(destination_airport):
-            print(f"Flights to '{destination_airport}' do not exist")
-            # Find the nearest airport to the destination recursively
-            nearest_airport = self.graph.find_nearest_airport(destination_airport)
-            print(f"Rerouting to nearest airport {nearest_airport}.")
-
-            # Check if the nearest airports has routes to it
-            if nearest_airport is None or not self.graph.get_routes_to(nearest_airport):
-                print(f"No flights to {nearest_airport}.")
-                return None
-
-            destination_airport = nearest_airport
-
-            # Restart the search from the source airport to the nearest airport
-            return self.find_least_cost(source_airport, destination_airport)
-
-        # Clear shortest path memory
-        costs = {}
-        previous_airport = {}  # Initialize a dictionary to store the previous airport for each airport
-
-        # Initialize cost to all airports as infinity
-        costs = {airport: float('inf') for airport in self.graph.airports}
-        costs[source_airport] = 0
-
-        # Initialize priority queue with a simple list
-        priority_queue = [(0, source_airport)]
-
-        while priority_queue:
-            current_cost, current_airport = heapq.heappop(priority_queue)
-
-            # If the destination airport is reached, stop
-            if current_airport == destination_airport:
-                break
-
-            # Visit each neighboring airport of the current airport
-            for neighbour in self.graph.get_neighbors(current_airport):
-                cost_to_neighbour = current_cost + self.graph.get_flight_cost(current_airport, neighbour)
-                # Update the cost to the neighbor if it's smaller than the recorded cost
-                if cost_to_neighbour < costs[neighbour]:
-                    costs[neighbour] = cost_to_neighbour
-                    #  Update the path taken
-                    previous_airport[neighbour] = current_airport
-                    heapq.heappush(priority_queue, (cost_to_neighbour, neighbour))
-
-        # Reconstruct the shortest path from the previous_airport dictionary
-        shortest_path = []
-        current_airport = destination_airport
-        while current_airport != source_airport:
-            shortest_path.append(current_airport)
-            current_airport = previous_airport[current_airport]
-        shortest_path.append(source_airport)
-
-        # Reverse the path to get it in the correct order
-        shortest_path.reverse()
-
-        # Get route information
-        route = self.graph.get_route_information(shortest_path)
-
-        # Return the route information
-        return route
+        shortest_path = self.find_leg_path(source_airport, destination_airport, 'cost')
+        return route_information(self.graph, shortest_path)
 
     def find_least_cost_multi(self, source_airport, destination_airport, intermediate_airports):
         """
@@ -236,40 +180,8 @@ class Dijkstra:
                               including the flight path, segments, total stops, total distance, total cost,
                               total duration, and total layover time. Returns None if no valid route is found.
         """
-        # Initialize variables
-        multi_flight_segments = []
-        current_source = source_airport
-        flight_path = [current_source]
-        total_layover_time = 0
-
-        # Find the shortest distance for each segment of the multi-flight route
-        for intermediate in intermediate_airports + [destination_airport]:
-            intermediate_flight_route = self.find_least_cost(current_source, intermediate)
-            if intermediate_flight_route is None:
-                # No valid route found for this segment, return None
-                return None
-            else:
-                flight_path.extend(intermediate_flight_route["path"][1:])
-                multi_flight_segments.extend(intermediate_flight_route["segments"])
-                total_layover_time += intermediate_flight_route["total_layover_time"]
-                current_source = intermediate
-
-        # Process multi-flight route information
-        total_stops = len(multi_flight_segments)
-        total_distance = sum(segment["distance"] for segment in multi_flight_segments)
-        total_cost = sum(segment["cost"] for segment in multi_flight_segments)
-        total_duration = sum(segment["duration"] for segment in multi_flight_segments)
-
-        # Return aggregated information for the multi-flight route
-        return {
-            "path": flight_path,
-            "segments": multi_flight_segments,
-            "total_stops": total_stops,
-            "total_distance": total_distance,
-            "total_cost": total_cost,
-            "total_duration": total_duration,
-            "total_layover_time": total_layover_time
-        }
+        return find_multi_leg_route(self.graph, self.find_leg_path, source_airport, destination_airport,
+                                    intermediate_airports, 'cost')
 
     def find_shortest_duration(self, source_airport, destination_airport):
         """
@@ -284,76 +196,8 @@ class Dijkstra:
                               including the flight path, segments, total stops, total distance, total cost,
                               total duration, and total layover time. Returns None if no valid route is found.
         """
-        # Check if flight data from source airport exist in the graph
-        if not self.graph.get_routes(source_airport):
-            print(f"Flights from '{source_airport}' do not exist.")
-            return None
-
-        # Check if flight data to destination airport exist in the graph
-        if not self.graph.get_routes_to(destination_airport):
-            print(f"Flights to '{destination_airport}' do not exist")
-            # Find the nearest airport to the destination recursively
-            nearest_airport = self.graph.find_nearest_airport(destination_airport)
-            print(f"Rerouting to nearest airport {nearest_airport}.")
-
-            # Check if the nearest airports has routes to it
-            if nearest_airport is None or not self.graph.get_routes_to(nearest_airport):
-                print(f"No flights to {nearest_airport}.")
-                return None
-
-            destination_airport = nearest_airport
-
-            # Restart the search from the source airport to the nearest airport
-            return self.find_shortest_duration(source_airport, destination_airport)
-
-        # Clear shortest path memory
-        durations = {}
-        previous_airport = {}  # Initialize a dictionary to store the previous airport for each airport
-
-        # Initialize cost to all airports as infinity
-        durations = {airport: float('inf') for airport in self.graph.airports}
-        durations[source_airport] = 0
-
-        # Initialize priority queue with a simple list
-        priority_queue = [(0, source_airport)]
-
-        while priority_queue:
-            current_duration, current_airport = heapq.heappop(priority_queue)
-
-            # If the destination airport is reached, stop
-            if current_airport == destination_airport:
-                break
-
-            # Visit each neighboring airport of the current airport
-            for neighbour in self.graph.get_neighbors(current_airport):
-                time_to_neighbour = current_duration + self.graph.get_flight_duration(current_airport, neighbour)
-
-                if neighbour != destination_airport:
-                    time_to_neighbour += 2  # Add 2 hours for layover time
-
-                # Update the time to the neighbor if it's smaller than the recorded duration
-                if time_to_neighbour < durations[neighbour]:
-                    durations[neighbour] = time_to_neighbour
-                    #  Update the path taken
-                    previous_airport[neighbour] = current_airport
-                    heapq.heappush(priority_queue, (time_to_neighbour, neighbour))
-
-        # Reconstruct the shortest path from the previous_airport dictionary
-        shortest_path = []
-        current_airport = destination_airport
-        while current_airport != source_airport:
-            shortest_path.append(current_airport)
-            current_airport = previous_airport[current_airport]
-        shortest_path.append(source_airport)
-
-        # Reverse the path to get it in the correct order
-        shortest_path.reverse()
-
-        # Get the route information
-        route = self.graph.get_route_information(shortest_path)
-
-        # Return the route information
-        return route
+        shortest_path = self.find_leg_path(source_airport, destination_airport, 'duration', layover_time=2)
+        return route_information(self.graph, shortest_path)
 
     def find_shortest_duration_multi(self, source_airport, destination_airport, intermediate_airports):
         """
@@ -369,116 +213,61 @@ class Dijkstra:
                               including the flight path, segments, total stops, total distance, total cost,
                               total duration, and total layover time. Returns None if no valid route is found.
         """
-        # Initialize variables
-        multi_flight_segments = []
-        current_source = source_airport
-        flight_path = [current_source]
-        total_layover_time = 0
-
-        # Find the shortest distance for each segment of the multi-flight route
-        for intermediate in intermediate_airports + [destination_airport]:
-            intermediate_flight_route = self.find_shortest_duration(current_source, intermediate)
-            if intermediate_flight_route is None:
-                # No valid route found for this segment, return None
-                return None
-            else:
-                flight_path.extend(intermediate_flight_route["path"][1:])
-                multi_flight_segments.extend(intermediate_flight_route["segments"])
-                total_layover_time += intermediate_flight_route["total_layover_time"]
-                current_source = intermediate
-
-        # Process multi-flight route information
-        total_stops = len(multi_flight_segments)
-        total_distance = sum(segment["distance"] for segment in multi_flight_segments)
-        total_cost = sum(segment["cost"] for segment in multi_flight_segments)
-        total_duration = sum(segment["duration"] for segment in multi_flight_segments)
-
-        # Return aggregated information for the multi-flight route
-        return {
-            "path": flight_path,
-            "segments": multi_flight_segments,
-            "total_stops": total_stops,
-            "total_distance": total_distance,
-            "total_cost": total_cost,
-            "total_duration": total_duration,
-            "total_layover_time": total_layover_time
-        }
+        return find_multi_leg_route(self.graph, self.find_leg_path, source_airport, destination_airport,
+                                    intermediate_airports, 'duration', 2)
 
 
 class BFS:
-    def __init__(self, graph):
-        self.graph = graph
+    def __init__(self, graph, search_mode='bidirectional'):
+        """
+        Initialize Breadth First Search with the given graph.
 
-        # Function to perform Breadth First Search on the flight graph to return path with the least route edges
-
-    def find_least_layovers(self, source_airport, destination_airport, depth=0, max_depth=10):
-        # Create a queue for BFS
-        queue = deque()
-        visited = set()
-
-        previous_airport = {}  # Initialize a dictionary to store the previous airport for each airport
-
-        # Mark the source airport as visited and enqueue it along with the initial layover count of 0
-        queue.append((source_airport, depth))
-        visited.add(source_airport)
-
-        # Iterate over the queue
-        while queue:
-            # Dequeue a vertex from the queue
-            current_airport, current_depth = queue.popleft()
-
-            # If current airport is the destination, stop
-            if current_airport == destination_airport:
-                break
-
-            # Visit each neighboring airport of the current airport
-            for neighbour in self.graph.get_neighbors(current_airport):
-                if neighbour not in visited:
-                    #  Update the path taken
-                    previous_airport[neighbour] = current_airport
-                    visited.add(neighbour)
-                    queue.append((neighbour, current_depth + 1))
-
-        # If the destination airport is not visited, it means it is not reachable
-        if destination_airport not in visited:
-            print(f"No flights from {source_airport} to {destination_airport}.")
-            # Find the nearest airport to the destination recursively
-            nearest_airport = self.graph.find_nearest_airport(destination_airport)
-            print(f"Rerouting to nearest airport {nearest_airport}.")
-
-            # Check if there are routes to the nearest airport
-            if nearest_airport is not None and self.graph.get_routes_to(nearest_airport):
-                destination_airport = nearest_airport
-                print(f"Rerouting to nearest airport {nearest_airport} with available flights.")
-
-                # Check if maximum depth is reached
-                if depth < max_depth:
-                    # Restart the search from the source airport to the nearest airport
-                    return self.find_least_layovers(source_airport, destination_airport, depth + 1, max_depth)
-                else:
-                    print("Maximum recursion depth reached.")
-                    return None
-            else:
-                # If nearest airport has no routes, or doesn't exist, inform user and return None
-                print(f"No flights found to {destination_airport} or nearest airports.")
-                return None
+        Args:
+            graph (Graph): The graph representing flight routes.
+            search_mode (str): 'bidirectional' to search from both airports until the searches meet, or
+                               'unidirectional' to resume the cached search from the source, which answers many
+                               queries from the same source quickly.
+        """
+        if search_mode not in BFS_SEARCH_MODES:
+            raise ValueError(f"Invalid search mode: '{search_mode}'")
+        self.graph = graph
+        self.search_mode = search_mode
 
-        # Reconstruct the shortest path from the previous_airport dictionary
-        shortest_path = []
-        current_airport = destination_airport
-        while current_airport != source_airport:
-            shortest_path.append(current_airport)
-            current_airport = previous_airport[current_airport]
-        shortest_path.append(source_airport)
+    def find_least_layovers(self, source_airport, destination_airport, max_layovers=None):
+        """
+            Find the path with the fewest flights between two airports, ties broken by the least cost.
 
-        # Reverse the path to get it in the correct order
-        shortest_path.reverse()
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                max_layovers (int): The largest number of connections of the route, or None for no limit.
 
-        route = self.graph.get_route_information(shortest_path)
+            Returns:
+                dict or None: A dictionary containing information about the least layovers route,
+                              including the flight path, segments, total stops, total distance, total cost,
+                              total duration, and total layover time. Returns None if no valid route is found.
+        """
+        return route_information(self.graph, self.find_leg_path(source_airport, destination_airport, max_layovers))
+
+    def find_leg_path(self, source_airport, destination_airport, max_layovers=None):
+        # Path with the fewest flights, rerouting to the nearest reachable airport when unreachable
+        max_flights = max_layovers + 1 if max_layovers is not None else None
+
+        def find_shortest_path(source, destination):
+            # Look the path up in the all-pairs tables, or search
+            answered, shortest_path = self.graph.get_all_pairs_path(source, destination, 'layovers')
+            if not answered and self.search_mode == 'bidirectional':
+                return find_bidirectional_layovers_path(self.graph, source, destination, max_flights)
+            if not answered:
+                shortest_path = find_route_path(self.graph, source, destination, 'layovers')
+            if shortest_path is not None and max_flights is not None and len(shortest_path) - 1 > max_flights:
+                return None
+            return shortest_path
 
-        return route
+        return find_rerouted_path(self.graph, source_airport, destination_airport, find_shortest_path)
 
-    def find_least_layovers_multi(self, source_airport, destination_airport, intermediate_airports):
+    def find_least_layovers_multi(self, source_airport, destination_airport, intermediate_airports,
+                                  max_layovers=None):
         """
             Find the least layovers multi-flight route between two airports with intermediate stops.
 
@@ -486,46 +275,15 @@ class BFS:
                 source_airport (str): The IATA code of the source airport.
                 destination_airport (str): The IATA code of the destination airport.
                 intermediate_airports (list of str): List of IATA codes of intermediate airports.
+                max_layovers (int): The largest number of connections of every leg, or None for no limit.
 
             Returns:
                 dict or None: A dictionary containing information about the shortest distance multi-flight route,
                               including the flight path, segments, total stops, total cost, total duration,
                               and total layover time. Returns None if no valid route is found.
         """
-        # Initialize variables
-        multi_flight_segments = []
-        current_source = source_airport
-        flight_path = [current_source]
-        total_layover_time = 0
-
-        # Find the shortest distance for each segment of the multi-flight route
-        for intermediate in intermediate_airports + [destination_airport]:
-            intermediate_flight_route = self.find_least_layovers(current_source, intermediate)
-            if intermediate_flight_route is None:
-                # No valid route found for this segment, return None
-                return None
-            else:
-                flight_path.extend(intermediate_flight_route["path"][1:])
-                multi_flight_segments.extend(intermediate_flight_route["segments"])
-                total_layover_time += intermediate_flight_route["total_layover_time"]
-                current_source = intermediate
-
-        # Process multi-flight route information
-        total_stops = len(multi_flight_segments)
-        total_distance = sum(segment["distance"] for segment in multi_flight_segments)
-        total_cost = sum(segment["cost"] for segment in multi_flight_segments)
-        total_duration = sum(segment["duration"] for segment in multi_flight_segments)
-
-        # Return aggregated information for the multi-flight route
-        return {
-            "path": flight_path,
-            "segments": multi_flight_segments,
-            "total_stops": total_stops,
-            "total_distance": total_distance,
-            "total_cost": total_cost,
-            "total_duration": total_duration,
-            "total_layover_time": total_layover_time
-        }
+        return find_multi_leg_route(self.graph, self.find_leg_path, source_airport, destination_airport,
+                                    intermediate_airports, max_layovers)
 
 
 class AStar:
@@ -533,108 +291,45 @@ class AStar:
         self.graph = graph
 
     def find_optimal_flight(self, source_airport, destination_airport):
-        # Check if flight data from source airport exist in the graph
-        if not self.graph.get_routes(source_airport):
-            print(f"Flights from '{source_airport}' do not exist.")
-            return None
-
-        if not self.graph.get_routes_to(destination_airport):
-            print(f"Flights to '{destination_airport}' do not exist")
-            # Find the nearest airport to the destination recursively
-            nearest_airport = self.graph.find_nearest_airport(destination_airport)
-            print(f"Rerouting to nearest airport {nearest_airport}.")
-
-            # Check if the nearest airports has routes to it
-            if nearest_airport is None or not self.graph.get_routes_to(nearest_airport):
-                print(f"No flights to {nearest_airport}.")
-                return None
-
-            destination_airport = nearest_airport
-
-            # Restart the search from the source airport to the nearest airport
-            return self.find_optimal_flight(source_airport, destination_airport)
-
-        # Initialize a dictionary to store the previous airport for each airport
-        previous_airport = {}
+        return route_information(self.graph, self.find_leg_path(source_airport, destination_airport))
 
-        # Dict to store the actual cost from source to each node
-        g_score = {iata: float('inf') for iata in self.graph.airports}
-        g_score[source_airport] = 0
+    def find_leg_path(self, source_airport, destination_airport):
+        # Optimal flight path, with the existence checks and nearest-airport rerouting
+        def find_shortest_path(source, destination):
+            return find_optimal_flight_path(self.graph, source, destination)
 
-        # Initialize priority queue with a simple list
-        priority_queue = [(0, source_airport)]
+        return find_rerouted_path(self.graph, source_airport, destination_airport, find_shortest_path)
 
-        while priority_queue:
-            current_cost, current_airport = heapq.heappop(priority_queue)
-
-            # If the destination airport is reached, stop
-            if current_airport == destination_airport:
-                break
-
-            # Visit each neighboring airport of the current airport
-            for neighbour in self.graph.get_neighbors(current_airport):
-                tentative_g_score = current_cost + self.graph.calculate_distance(current_airport, neighbour)
-                # Update the distance to the neighbor if it's smaller than the recorded distance
-                if tentative_g_score < g_score[neighbour]:
-                    g_score[neighbour] = tentative_g_score
-                    # Calculate the estimated total cost from the source to the destination through the neighbor
-                    # (using the heuristic, which is the estimated flight cost and duration in this case)
-                    cost_score = self.graph.get_flight_cost(current_airport, neighbour)
-                    duration_score = self.graph.get_flight_duration(current_airport, neighbour)
-                    if neighbour != destination_airport:
-                        duration_score += 2
-                    h_score = cost_score + duration_score
-                    f_score = tentative_g_score + h_score
-                    # Update the path taken
-                    previous_airport[neighbour] = current_airport
-                    heapq.heappush(priority_queue, (f_score, neighbour))
-
-        # Reconstruct the shortest path from the previous_airport dictionary
-        shortest_path = []
-        current_airport = destination_airport
-        while current_airport != source_airport:
-            shortest_path.append(current_airport)
-            current_airport = previous_airport[current_airport]
-        shortest_path.append(source_airport)
-
-        shortest_path.reverse()
+    def find_shortest_path(self, source_airport, destination_airport, weight_name, layover_time=0):
+        """
+            Find the path minimising a weight between two airports with A*, guided by the best heuristic
+            available for the weight.
 
-        route = self.graph.get_route_information(shortest_path)
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration').
+                layover_time (float): Layover time added for every connecting flight.
 
-        return route
+            Returns:
+                list or None: The IATA codes along the best path, or None if the destination is unreachable.
+        """
+        heuristic = self.get_heuristic(destination_airport, weight_name, layover_time)
+        return find_route_path(self.graph, source_airport, destination_airport, weight_name, layover_time, heuristic)
+
+    def get_heuristic(self, destination_airport, weight_name, layover_time):
+        # ALT lower bounds when landmark tables were prepared for the current graph, otherwise great-circle
+        # lower bounds in compiled mode, otherwise no heuristic (plain Dijkstra)
+        landmarks = self.graph.landmarks
+        if landmarks is not None and landmarks.compiled is self.graph.get_compiled() \
+                and landmarks.supports(weight_name, layover_time):
+            return landmarks.heuristic(landmarks.compiled.index[destination_airport], weight_name)
+        great_circle_heuristics = self.graph.get_great_circle_heuristics()
+        if great_circle_heuristics is not None:
+            return great_circle_heuristics.heuristic(great_circle_heuristics.compiled.index[destination_airport],
+                                                     weight_name, layover_time)
+        return None
 
     def find_optimal_flight_multi(self, source_airport, destination_airport, intermediate_airports):
-        # Initialize variables
-        multi_flight_segments = []
-        current_source = source_airport
-        flight_path = [current_source]
-        total_layover_time = 0
-
-        # Find the shortest distance for each segment of the multi-flight route
-        for intermediate in intermediate_airports + [destination_airport]:
-            intermediate_flight_route = self.find_optimal_flight(current_source, intermediate)
-            if intermediate_flight_route is None:
-                # No valid route found for this segment, return None
-                return None
-            else:
-                flight_path.extend(intermediate_flight_route["path"][1:])
-                multi_flight_segments.extend(intermediate_flight_route["segments"])
-                total_layover_time += intermediate_flight_route["total_layover_time"]
-                current_source = intermediate
-
-        # Process multi-flight route information
-        total_stops = len(multi_flight_segments)
-        total_distance = sum(segment["distance"] for segment in multi_flight_segments)
-        total_cost = sum(segment["cost"] for segment in multi_flight_segments)
-        total_duration = sum(segment["duration"] for segment in multi_flight_segments)
-
-        # Return aggregated information for the multi-flight route
-        return {
-            "path": flight_path,
-            "segments": multi_flight_segments,
-            "total_stops": total_stops,
-            "total_distance": total_distance,
-            "total_cost": total_cost,
-            "total_duration": total_duration,
-            "total_layover_time": total_layover_time
-        }
+        return find_multi_leg_route(self.graph, self.find_leg_path, source_airport, destination_airport,
+                                    intermediate_airports)
@@ -0,0 +1,94 @@
+import numpy as np
+from utils.calculation_utils import EARTH_RADIUS, BASE_COST, MIN_COST_PER_KM, BASE_DURATION, FLIGHT_SPEED
+
+# Lower bound of every flight's weight as (fixed part, part per great-circle kilometre), following
+# calculate_flight_cost and calculate_flight_duration.
+FLIGHT_WEIGHT_BOUNDS = {
+    'distance': (0, 1),
+    'cost': (BASE_COST, MIN_COST_PER_KM),
+    'duration': (BASE_DURATION, 1 / FLIGHT_SPEED),
+}
+
+
+class GreatCircleHeuristics:
+    """
+        Goal-directed A* heuristics computed from airport coordinates alone.
+
+        Every flight weighs at least ``fixed + per_km * great-circle distance``, so any path from an airport to
+        the target weighs at least ``fixed + per_km * great-circle distance to the target`` (the fixed part is
+        paid at least once, and the great-circle distance is the shortest way between two points on the sphere).
+        The bound is admissible and consistent. The coefficients are checked against the actual edge weights
+        of the graph and loosened if the data does not follow the formulas, so the bounds stay valid for any
+        dataset.
+    """
+
+    def __init__(self, compiled):
+        """
+            Args:
+                compiled (CompiledGraph): The compiled flight graph.
+        """
+        self.compiled = compiled
+        # Unit vector of every airport on the sphere, great-circle distances follow from their chord lengths
+        latitude, longitude = np.radians(compiled.latitude), np.radians(compiled.longitude)
+        self.unit_vectors = np.column_stack([np.cos(latitude) * np.cos(longitude),
+                                             np.cos(latitude) * np.sin(longitude),
+                                             np.sin(latitude)])
+        self.coefficients = {}  # (weight name, layover time) -> (fixed, per_km)
+
+    def great_circle_distances(self, target):
+        # Great-circle distance in kilometres from every airport to the target
+        chord = np.linalg.norm(self.unit_vectors - self.unit_vectors[target], axis=1)
+        return EARTH_RADIUS * 2 * np.arcsin(np.minimum(chord / 2, 1))
+
+    def get_coefficients(self, weight_name, layover_time):
+        key = (weight_name, layover_time)
+        if key not in self.coefficients:
+            fixed, per_km = FLIGHT_WEIGHT_BOUNDS[weight_name]
+            fixed += layover_time
+
+            compiled = self.compiled
+            sources = compiled.edge_sources()
+            chord = np.linalg.norm(self.unit_vectors[sources] - self.unit_vectors[compiled.targets], axis=1)
+            # Shrink the great-circle distances slightly so rounding never makes a bound exceed a weight
+            edge_distances = EARTH_RADIUS * 2 * np.arcsin(np.minimum(chord / 2, 1)) * (1 - 1e-9)
+            weights = compiled.weights[weight_name] + layover_time
+
+            if len(weights) and np.any(weights < fixed + per_km * edge_distances):
+                # The data does not follow the formulas, fall back to the largest bound proportional to distance
+                fixed = 0
+                positive = edge_distances > 0
+                per_km = float(np.min(weights[positive] / edge_distances[positive])) if np.any(positive) else 0
+                per_km = max(per_km, 0)
+            self.coefficients[key] = (fixed, per_km)
+        return self.coefficients[key]
+
+    def lower_bounds(self, target, weight_name, layover_time=0):
+        """
+            Compute the great-circle lower bound of the weight from every airport to a target.
+
+            Args:
+                target (int): The airport id of the target.
+                weight_name (str): The weight the bounds are for ('distance', 'cost' or 'duration').
+                layover_time (float): Weight added to every flight by the search.
+
+            Returns:
+                numpy.ndarray: The lower bound for every airport.
+        """
+        fixed, per_km = self.get_coefficients(weight_name, layover_time)
+        bounds = fixed + per_km * self.great_circle_distances(target) * (1 - 1e-9)
+        bounds[target] = 0
+        return bounds
+
+    def heuristic(self, target, weight_name, layover_time=0):
+        """
+            Get the great-circle heuristic towards a target for ShortestPathSearch.
+
+            Args:
+                target (int): The airport id of the target.
+                weight_name (str): The weight the heuristic is for.
+                layover_time (float): Weight added to every flight by the search.
+
+            Returns:
+                callable: Airport id -> lower bound of the weight left to the target.
+        """
+        return self.lower_bounds(target, weight_name, layover_time).tolist().__getitem__
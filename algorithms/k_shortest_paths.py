@@ -0,0 +1,158 @@
+import heapq
+from itertools import count
+from algorithms.shortest_path_search import ShortestPathSearch, ReversedSearchGraph
+
+
+class RestrictedSearchGraph:
+    """
+        View of a search graph without some airports and routes, on which the spur paths of Yen's algorithm are
+        searched.
+    """
+
+    def __init__(self, search_graph, removed_nodes, removed_edges):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to restrict.
+                removed_nodes (set): Node ids of the airports to leave out.
+                removed_edges (set): (source, destination) node ids of the routes to leave out.
+        """
+        self.search_graph = search_graph
+        self.removed_nodes = removed_nodes
+        self.removed_edges = removed_edges
+
+    def out_edges(self, node, weight_name):
+        return [(neighbour, weight) for neighbour, weight in self.search_graph.out_edges(node, weight_name)
+                if neighbour not in self.removed_nodes and (node, neighbour) not in self.removed_edges]
+
+
+class KShortestPaths:
+    """
+        Yen's algorithm for the loopless paths between two airports in order of weight.
+
+        Every new path deviates from a path already found at a spur airport: the root up to the spur is kept and
+        the rest is the best spur path that avoids the root and the routes the earlier paths with the same root
+        took out of the spur. One backward search from the target gives the exact weight left from every airport
+        in the full graph, which is reused in two ways. When the tree path from the spur avoids the removed
+        airports and routes, it is the spur path and no search is needed; otherwise the spur path is searched with
+        A*, which these weights guide as a consistent lower bound, as removing airports and routes only makes
+        paths longer.
+    """
+
+    def __init__(self, search_graph, source, target, weight_name, layover_time=0):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to search.
+                source: The node id of the source airport in the search graph.
+                target: The node id of the target airport in the search graph.
+                weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration').
+                layover_time (float): Weight added to every flight.
+        """
+        self.search_graph = search_graph
+        self.source = source
+        self.target = target
+        self.weight_name = weight_name
+        self.layover_time = layover_time
+
+        # Shortest path tree towards the target: the weight left and the next airport from every airport
+        tree = ShortestPathSearch(ReversedSearchGraph(search_graph), target, weight_name, layover_time)
+        tree.search()
+        self.weight_to_target = tree.best
+        self.next_hop = tree.previous
+        self.spur_searches = 0
+
+    def heuristic(self, node):
+        return self.weight_to_target.get(node, float('inf'))
+
+    def prefix_weights(self, path):
+        # Weight of the path up to every airport along it
+        weights = [0]
+        for current, following in zip(path, path[1:]):
+            weight = next(weight for neighbour, weight in self.search_graph.out_edges(current, self.weight_name)
+                          if neighbour == following)
+            weights.append(weights[-1] + weight + self.layover_time)
+        return weights
+
+    def tree_path(self, node):
+        path = [node]
+        while path[-1] != self.target:
+            path.append(self.next_hop[path[-1]])
+        return path
+
+    def spur_path(self, spur, removed_nodes, removed_edges):
+        # Best path from the spur to the target avoiding the removed airports and routes, with its weight
+        if spur not in self.weight_to_target:
+            return None, None
+        path = self.tree_path(spur)
+        if (spur, path[1]) not in removed_edges and removed_nodes.isdisjoint(path):
+            return path, self.weight_to_target[spur]
+
+        self.spur_searches += 1
+        restricted_graph = RestrictedSearchGraph(self.search_graph, removed_nodes, removed_edges)
+        search = ShortestPathSearch(restricted_graph, spur, self.weight_name, self.layover_time, self.heuristic)
+        if not search.search(self.target):
+            return None, None
+        return search.path_to(self.target), search.best[self.target]
+
+    def paths(self):
+        """
+            Generate the loopless paths from the source to the target, best first. Each path is computed only
+            when the next one is asked for.
+
+            Yields:
+                tuple: The weight of the path and the node ids along it.
+        """
+        if self.source not in self.weight_to_target:
+            return
+        if self.source == self.target:
+            yield 0, [self.source]
+            return
+
+        found = [self.tree_path(self.source)]
+        found_weights = [self.prefix_weights(found[0])]
+        yield found_weights[0][-1], found[0]
+
+        counter = count()
+        candidates = []  # Heap of (weight, tie-breaker, path) of the candidate paths
+        seen = {tuple(found[0])}
+        while True:
+            previous_path, previous_weights = found[-1], found_weights[-1]
+            for i, spur in enumerate(previous_path[:-1]):
+                root = previous_path[:i + 1]
+                # Routes out of the spur taken by the paths already found with the same root
+                removed_edges = {(path[i], path[i + 1]) for path in found if path[:i + 1] == root}
+                spur_path, spur_weight = self.spur_path(spur, set(root[:-1]), removed_edges)
+                if spur_path is None:
+                    continue
+                path = root + spur_path[1:]
+                if tuple(path) in seen:
+                    continue
+                seen.add(tuple(path))
+                heapq.heappush(candidates, (previous_weights[i] + spur_weight, next(counter), path))
+
+            if not candidates:
+                return
+            weight, _, path = heapq.heappop(candidates)
+            found.append(path)
+            found_weights.append(self.prefix_weights(path))
+            yield weight, path
+
+
+def find_k_shortest_paths(graph, source_airport, destination_airport, weight_name, layover_time=0):
+    """
+        Generate the loopless paths between two airports in order of weight, on the compiled graph when available.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration').
+            layover_time (float): Weight added to every flight.
+
+        Yields:
+            tuple: The weight of the path (with the layover time of every flight) and the IATA codes along it.
+    """
+    search_graph = graph.get_search_graph()
+    k_shortest_paths = KShortestPaths(search_graph, search_graph.node_id(source_airport),
+                                      search_graph.node_id(destination_airport), weight_name, layover_time)
+    for weight, path in k_shortest_paths.paths():
+        yield weight, search_graph.path_to_iata(path)
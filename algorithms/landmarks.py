@@ -0,0 +1,167 @@
+import os
+import numpy as np
+from algorithms.shortest_path_search import ShortestPathSearch, ReversedSearchGraph
+
+# Metrics with landmark tables by default, with the layover time added to every flight (see ShortestPathSearch)
+ALT_METRICS = {'distance': 0, 'cost': 0, 'duration': 2}
+# Number of landmarks picked by default
+LANDMARK_COUNT = 16
+
+
+class Landmarks:
+    """
+        Landmark tables for A* with ALT (A*, landmarks and the triangle inequality) heuristics.
+
+        For every landmark L and metric, the exact best weight from L to every airport and from every airport to
+        L is stored. By the triangle inequality, d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L),
+        so the largest of these over all landmarks is an admissible and consistent lower bound of the weight
+        left from v to the target t, which keeps A* optimal.
+    """
+
+    def __init__(self, compiled, landmarks, tables):
+        """
+            Args:
+                compiled (CompiledGraph): The compiled flight graph the tables belong to.
+                landmarks (list of int): The airport ids of the landmarks.
+                tables (dict): Weight name -> {'from': array, 'to': array, 'layover_time': array}, where 'from' and
+                               'to' have one row per landmark with the weight from / to the landmark for every
+                               airport (inf when unreachable).
+        """
+        self.compiled = compiled
+        self.landmarks = list(landmarks)
+        self.tables = tables
+
+    @classmethod
+    def build(cls, compiled, count=LANDMARK_COUNT, metrics=None):
+        """
+            Pick landmarks and compute their tables.
+
+            Landmarks are picked greedily, each one being the airport farthest (by distance, in either direction)
+            from the landmarks picked so far, which spreads them around the edges of the network.
+
+            Args:
+                compiled (CompiledGraph): The compiled flight graph.
+                count (int): The number of landmarks.
+                metrics (dict): Weight name -> layover time added to every flight, defaults to ALT_METRICS.
+
+            Returns:
+                Landmarks: The landmark tables.
+        """
+        metrics = metrics if metrics is not None else ALT_METRICS
+        count = min(count, compiled.node_count)
+        reversed_graph = ReversedSearchGraph(compiled)
+
+        def weights_from(search_graph, landmark, weight_name, layover_time):
+            search = ShortestPathSearch(search_graph, landmark, weight_name, layover_time)
+            search.search()
+            row = np.full(compiled.node_count, np.inf)
+            row[list(search.best)] = list(search.best.values())
+            return row
+
+        # Start from the best connected airport, then keep adding the airport farthest from all landmarks
+        landmarks = [int(np.argmax(np.diff(compiled.offsets)))]
+        closest = np.full(compiled.node_count, np.inf)
+        isolated = (np.diff(compiled.offsets) == 0) & (np.diff(compiled.reverse_offsets) == 0)
+        while len(landmarks) < count:
+            landmark = landmarks[-1]
+            reach = np.minimum(weights_from(compiled, landmark, 'distance', 0),
+                               weights_from(reversed_graph, landmark, 'distance', 0))
+            closest = np.minimum(closest, reach)
+            # Airports unreachable from every landmark so far are the best candidates to cover next,
+            # except airports without any route which carry no information
+            candidates = np.where(np.isinf(closest), np.finfo(np.float64).max, closest)
+            candidates[isolated] = -1
+            candidates[landmarks] = -1
+            landmarks.append(int(np.argmax(candidates)))
+
+        tables = {}
+        for weight_name, layover_time in metrics.items():
+            tables[weight_name] = {
+                'from': np.array([weights_from(compiled, landmark, weight_name, layover_time)
+                                  for landmark in landmarks]),
+                'to': np.array([weights_from(reversed_graph, landmark, weight_name, layover_time)
+                                for landmark in landmarks]),
+                'layover_time': np.array([layover_time], dtype=np.float64),
+            }
+        return cls(compiled, landmarks, tables)
+
+    def supports(self, weight_name, layover_time):
+        table = self.tables.get(weight_name)
+        return table is not None and table['layover_time'][0] == layover_time
+
+    def lower_bounds(self, target, weight_name):
+        """
+            Compute the ALT lower bound of the weight from every airport to a target.
+
+            Args:
+                target (int): The airport id of the target.
+                weight_name (str): The metric of the bounds.
+
+            Returns:
+                numpy.ndarray: The lower bound for every airport (inf when the target is provably unreachable).
+        """
+        table = self.tables[weight_name]
+        weights_from, weights_to = table['from'], table['to']
+        with np.errstate(invalid='ignore'):
+            # inf - inf is undefined (no information), while inf - finite proves the target is unreachable
+            bounds = np.concatenate([weights_from[:, target:target + 1] - weights_from,
+                                     weights_to - weights_to[:, target:target + 1]])
+        bounds = np.where(np.isnan(bounds), 0, bounds)
+        return np.maximum(bounds.max(axis=0), 0)
+
+    def heuristic(self, target, weight_name):
+        """
+            Get the ALT heuristic towards a target for ShortestPathSearch.
+
+            Args:
+                target (int): The airport id of the target.
+                weight_name (str): The metric of the heuristic.
+
+            Returns:
+                callable: Airport id -> lower bound of the weight left to the target.
+        """
+        return self.lower_bounds(target, weight_name).tolist().__getitem__
+
+    def save(self, path):
+        """
+            Write the landmark tables to a compressed .npz file.
+
+            Args:
+                path (str): The file to write.
+        """
+        arrays = {'fingerprint': np.array([self.compiled.fingerprint()]),
+                  'landmarks': np.array(self.landmarks, dtype=np.int32)}
+        for weight_name, table in self.tables.items():
+            for name, array in table.items():
+                arrays[f"{weight_name}/{name}"] = array
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+
+    @classmethod
+    def load(cls, path, compiled):
+        """
+            Read landmark tables written by save.
+
+            Args:
+                path (str): The file to read.
+                compiled (CompiledGraph): The compiled graph the tables must belong to.
+
+            Returns:
+                Landmarks or None: The landmark tables, or None if the file is missing or was built for a
+                                   different graph.
+        """
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            if str(data['fingerprint'][0]) != compiled.fingerprint():
+                return None
+            tables = {}
+            for key in data.files:
+                if '/' in key:
+                    weight_name, name = key.split('/')
+                    tables.setdefault(weight_name, {})[name] = data[key]
+            landmarks = data['landmarks'].tolist()
+        return cls(compiled, landmarks, tables)
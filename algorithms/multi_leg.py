@@ -0,0 +1,85 @@
+# Layover time in hours at every connection inside a leg (see FlightGraph.get_route_information)
+LAYOVER_TIME = 2
+
+
+def build_segments(graph, leg_path):
+    """
+        Build the segments of a leg straight from the route edges along its path.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            leg_path (list of str): The IATA codes along the leg.
+
+        Returns:
+            list of dict: The segments of the leg, with a layover at every connection inside the leg.
+    """
+    segments = []
+    for i, (current_airport, next_airport) in enumerate(zip(leg_path, leg_path[1:])):
+        route = graph.get_route(current_airport, next_airport)
+        segments.append({
+            "from": current_airport,
+            "to": next_airport,
+            "distance": route.get_weight('distance'),
+            "cost": route.get_weight('cost'),
+            "duration": route.get_weight('duration'),
+            "layover": LAYOVER_TIME if i < len(leg_path) - 2 else 0
+        })
+    return segments
+
+
+def find_multi_leg_route(graph, find_leg_path, source_airport, destination_airport, intermediate_airports,
+                         *leg_args):
+    """
+        Find a route through intermediate airports for any criteria, one leg at a time.
+
+        Every leg is found with the single-leg path finder of the criteria, which applies its existence checks
+        and nearest-airport rerouting. Every leg starts from a different airport than the one before it, so each
+        leg runs its own search and the trip costs the sum of its legs. Work is only shared at the cache level: a
+        leg repeated in the trip is searched once, and when the trip leaves an airport more than once, a search
+        that the path finder keeps in the graph's search cache (the unidirectional searches without a heuristic)
+        is resumed instead of repeated. The segments and totals of the whole trip are built once from the route
+        edges of the legs.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            find_leg_path (callable): (source, destination, *leg_args) -> IATA codes along the best leg, or None.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            intermediate_airports (list of str): List of IATA codes of intermediate airports.
+            *leg_args: Extra arguments of find_leg_path, such as the weight of the criteria.
+
+        Returns:
+            dict or None: A dictionary containing information about the multi-flight route, including the flight
+                          path, segments, total stops, total distance, total cost, total duration, and total layover
+                          time. Returns None if no valid route is found for a leg.
+    """
+    leg_paths = {}
+    flight_path = [source_airport]
+    segments = []
+    total_layover_time = 0
+
+    current_source = source_airport
+    for stop in intermediate_airports + [destination_airport]:
+        leg = (current_source, stop)
+        if leg not in leg_paths:
+            leg_paths[leg] = find_leg_path(current_source, stop, *leg_args)
+        if leg_paths[leg] is None:
+            # No valid route found for this leg
+            return None
+
+        leg_segments = build_segments(graph, leg_paths[leg])
+        flight_path.extend(leg_paths[leg][1:])
+        segments.extend(leg_segments)
+        total_layover_time += sum(segment["layover"] for segment in leg_segments)
+        current_source = stop
+
+    # Return aggregated information for the multi-flight route
+    return {
+        "path": flight_path,
+        "segments": segments,
+        "total_stops": len(segments),
+        "total_distance": sum(segment["distance"] for segment in segments),
+        "total_cost": sum(segment["cost"] for segment in segments),
+        "total_duration": sum(segment["duration"] for segment in segments),
+        "total_layover_time": total_layover_time
+    }
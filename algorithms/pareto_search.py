@@ -0,0 +1,182 @@
+import heapq
+from itertools import count
+from algorithms.shortest_path_search import find_route_path
+
+# Edge weights of the multi-criteria search, with the layover time added to every flight (see ShortestPathSearch).
+# The number of flights is the fourth criterion.
+PARETO_WEIGHTS = {'distance': 0, 'cost': 0, 'duration': 2}
+PARETO_CRITERIA = tuple(PARETO_WEIGHTS) + ('layovers',)
+
+# Key of every named find_route criteria over the (distance, cost, duration, flights) costs of a path. The fewest
+# flights are tied by cost like the Breadth First Searches (see LAYOVERS_TIE_BREAK). The optimal criteria is not
+# the minimum of a path weight, so it is not selected from the front (see AStar.find_leg_path).
+CRITERIA_KEYS = {
+    'shortest distance': lambda costs: costs[0],
+    'least cost': lambda costs: costs[1],
+    'shortest duration': lambda costs: costs[2],
+    'least layovers': lambda costs: (costs[3], costs[1]),
+}
+
+
+def dominates(costs, other_costs):
+    # True if the costs are at least as good as the other costs in every criterion
+    return costs[0] <= other_costs[0] and costs[1] <= other_costs[1] and costs[2] <= other_costs[2] \
+        and costs[3] <= other_costs[3]
+
+
+class ParetoSearch:
+    """
+        Multi-criteria label-setting search for every Pareto-optimal path between two airports.
+
+        A label is the (distance, cost, duration, flights) costs of one path to an airport. Labels are settled in
+        lexicographic order, so a settled label can never be dominated by a later one, and a label is dropped as
+        soon as a settled label of its airport or of the target dominates it. Every path on the resulting front
+        is better than all others in at least one trade-off, and the best path for any criteria that only gets
+        worse when a cost grows (such as each named find_route criteria) is on it.
+
+        With lower bounds of the costs left to the target, labels are settled in lexicographic order of their
+        estimated total costs instead (which keeps the order of the labels of every airport) and are dropped
+        when a settled path to the target dominates their estimate, so the target is reached early and prunes
+        most of the graph.
+    """
+
+    def __init__(self, search_graph, source, target, lower_bounds=None):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to search.
+                source: The node id of the source airport in the search graph.
+                target: The node id of the target airport in the search graph.
+                lower_bounds (callable): Optional node id -> lower bounds of the (distance, cost, duration, flights)
+                                         left to the target.
+        """
+        self.search_graph = search_graph
+        self.source = source
+        self.target = target
+        self.lower_bounds = lower_bounds
+        self.fronts = {}  # Settled (non-dominated) costs of every reached airport
+        self.labels = []  # (node, parent label index, costs) of every label created by the search
+        self.settled_count = 0
+
+    def is_dominated(self, node, costs, estimate):
+        # Dominated by a settled path to the airport, or its estimate by a settled path to the target
+        for settled_costs in self.fronts.get(node, ()):
+            if dominates(settled_costs, costs):
+                return True
+        for settled_costs in self.fronts.get(self.target, ()):
+            if dominates(settled_costs, estimate):
+                return True
+        return False
+
+    def estimate(self, node, costs):
+        if self.lower_bounds is None:
+            return costs
+        bounds = self.lower_bounds(node)
+        return (costs[0] + bounds[0], costs[1] + bounds[1], costs[2] + bounds[2], costs[3] + bounds[3])
+
+    def search(self):
+        """
+            Run the search.
+
+            Returns:
+                list: The Pareto front as (costs, node ids along the path) pairs in lexicographic order of costs,
+                      empty if the target is unreachable.
+        """
+        if self.source == self.target:
+            return [((0, 0, 0, 0), [self.source])]
+
+        out_edges = self.search_graph.out_edges
+        layover_times = tuple(PARETO_WEIGHTS.values())
+        labels, fronts = self.labels, self.fronts
+        counter = count()
+        labels.append((self.source, -1, (0, 0, 0, 0)))
+        estimate = self.estimate(self.source, (0, 0, 0, 0))
+        priority_queue = [(estimate, next(counter), 0)] if float('inf') not in estimate else []
+        found = []
+
+        while priority_queue:
+            estimate, _, label = heapq.heappop(priority_queue)
+            node, _, costs = labels[label]
+            # Labels may have been dominated by labels settled after they were queued
+            if self.is_dominated(node, costs, estimate):
+                continue
+            fronts.setdefault(node, []).append(costs)
+            self.settled_count += 1
+            if node == self.target:
+                found.append(label)
+                continue
+
+            distance, cost, duration, flights = costs
+            edges = zip(*(out_edges(node, weight_name) for weight_name in PARETO_WEIGHTS))
+            for (neighbour, edge_distance), (_, edge_cost), (_, edge_duration) in edges:
+                new_costs = (distance + edge_distance + layover_times[0], cost + edge_cost + layover_times[1],
+                             duration + edge_duration + layover_times[2], flights + 1)
+                estimate = self.estimate(neighbour, new_costs)
+                # An infinite lower bound proves the target cannot be reached from this airport
+                if float('inf') not in estimate and not self.is_dominated(neighbour, new_costs, estimate):
+                    labels.append((neighbour, label, new_costs))
+                    heapq.heappush(priority_queue, (estimate, next(counter), len(labels) - 1))
+
+        return [(labels[label][2], self.path_to(label)) for label in found]
+
+    def path_to(self, label):
+        path = []
+        while label >= 0:
+            node, label, _ = self.labels[label]
+            path.append(node)
+        path.reverse()
+        return path
+
+
+def select_route(front, criteria):
+    """
+        Select the best path of a Pareto front for a named criteria.
+
+        Args:
+            front (list): The (costs, path) pairs returned by ParetoSearch.search.
+            criteria (str): The find_route criteria ('shortest distance', 'least cost', 'shortest duration' or
+                            'least layovers').
+
+        Returns:
+            tuple or None: The (costs, path) pair, ties broken by the other costs, or None if the front is empty.
+    """
+    key = CRITERIA_KEYS[criteria]
+    return min(front, key=lambda entry: (key(entry[0]), entry[0]), default=None)
+
+
+def find_pareto_routes(graph, source_airport, destination_airport):
+    """
+        Find the Pareto front of paths between two airports, on the compiled graph when available.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+
+        Returns:
+            list: (costs, IATA codes along the path) pairs, where costs are the total distance, cost, duration
+                  (with the layover time of every flight) and number of flights.
+    """
+    # An unreachable target would make the search visit every path to every reachable airport, so rule it out
+    # first with the reachability index, or the (cached) fewest flights search
+    reachable = graph.is_reachable(source_airport, destination_airport)
+    if reachable is None:
+        reachable = find_route_path(graph, source_airport, destination_airport, 'layovers') is not None
+    if not reachable:
+        return []
+
+    search_graph = graph.get_search_graph()
+    target = search_graph.node_id(destination_airport)
+    # Lower bounds from the A* heuristics of each weight (none on the object graph), and at least one more flight
+    heuristics = [graph.astar.get_heuristic(destination_airport, weight_name, layover_time)
+                  for weight_name, layover_time in PARETO_WEIGHTS.items()]
+    lower_bounds = None
+    if None not in heuristics:
+        # The heuristics only exist in compiled mode, so tabulate the bounds of every airport id once
+        nodes = range(search_graph.node_count)
+        flights = [1] * search_graph.node_count
+        flights[target] = 0
+        lower_bounds = list(zip(*([heuristic(node) for node in nodes] for heuristic in heuristics), flights))
+        lower_bounds = lower_bounds.__getitem__
+
+    search = ParetoSearch(search_graph, search_graph.node_id(source_airport), target, lower_bounds)
+    return [(costs, search_graph.path_to_iata(path)) for costs, path in search.search()]
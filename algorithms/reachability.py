@@ -0,0 +1,229 @@
+import os
+import numpy as np
+
+
+def strongly_connected_components(compiled):
+    """
+        Label the strongly connected components of the route network with an iterative Tarjan's algorithm.
+
+        Args:
+            compiled (CompiledGraph): The compiled flight graph.
+
+        Returns:
+            list of int: The component id of every airport. Components are numbered in reverse topological order,
+                         so every route leads to a component with the same or a smaller id.
+    """
+    offsets, targets = compiled.offsets.tolist(), compiled.targets.tolist()
+    node_count = compiled.node_count
+    index = [-1] * node_count  # Order in which the depth first search reached each airport
+    low = [0] * node_count  # Smallest index reachable through the search tree and one more route
+    on_stack = [False] * node_count
+    stack = []
+    component = [-1] * node_count
+    counter = 0
+    component_count = 0
+
+    for root in range(node_count):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, offsets[root])]  # (airport, next route to follow) of the airports being searched
+
+        while work:
+            node, edge = work[-1]
+            if edge < offsets[node + 1]:
+                work[-1] = (node, edge + 1)
+                neighbour = targets[edge]
+                if index[neighbour] < 0:
+                    index[neighbour] = low[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack[neighbour] = True
+                    work.append((neighbour, offsets[neighbour]))
+                elif on_stack[neighbour]:
+                    low[node] = min(low[node], index[neighbour])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            # The airport is the root of a component, made of the airports above it on the stack
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = component_count
+                    if member == node:
+                        break
+                component_count += 1
+
+    return component
+
+
+def pack_bitsets(bitsets, bit_count):
+    # Pack integer bitsets into the rows of a uint8 matrix, bit i of a row being bit (i & 7) of byte (i >> 3)
+    row_bytes = (bit_count + 7) // 8
+    packed = b''.join(bits.to_bytes(row_bytes, 'little') for bits in bitsets)
+    return np.frombuffer(packed, dtype=np.uint8).reshape(len(bitsets), row_bytes).copy()
+
+
+class ReachabilityIndex:
+    """
+        Precomputed reachability between airports, answering whether a destination can be reached at all (and
+        optionally within a number of flights) before any search starts.
+
+        The route network is condensed into its strongly connected components: every airport of a component can
+        reach every other, and the components form a directed acyclic graph. The components reachable from each
+        component are kept as a bitset, built bit-parallel by OR-ing the bitsets of its successor components in
+        reverse topological order. Optional k-hop tables keep, for every airport and every number of flights up
+        to a limit, the bitset of the airports reachable within that many flights. Queries are single bit tests.
+    """
+
+    def __init__(self, compiled, components, reach, hops):
+        """
+            Args:
+                compiled (CompiledGraph): The compiled flight graph the index belongs to.
+                components (array-like): The component id of every airport.
+                reach (numpy.ndarray): Packed bitsets (see pack_bitsets) of the components reachable from each
+                                       component, one row per component.
+                hops (numpy.ndarray): Packed bitsets of the airports reachable from each airport within 1, 2, ...
+                                      flights, of shape (flights, airports, bytes), with no rows when not built.
+        """
+        self.compiled = compiled
+        self.components = np.asarray(components, dtype=np.int32)
+        self.reach = reach
+        self.hops = hops
+        self.component_list = self.components.tolist()
+
+    @classmethod
+    def build(cls, compiled, max_flights=0):
+        """
+            Condense the route network and compute the reachability bitsets.
+
+            Args:
+                compiled (CompiledGraph): The compiled flight graph.
+                max_flights (int): The largest number of flights with k-hop tables, 0 to build none. The tables take
+                                   max_flights * airports^2 / 8 bytes.
+
+            Returns:
+                ReachabilityIndex: The reachability index.
+        """
+        node_count = compiled.node_count
+        component = np.array(strongly_connected_components(compiled), dtype=np.int32)
+        component_count = int(component.max()) + 1 if node_count else 0
+
+        # Routes between different components are the edges of the condensed graph
+        edge_sources, edge_targets = component[compiled.edge_sources()], component[compiled.targets]
+        between = edge_sources != edge_targets
+        successors = [[] for _ in range(component_count)]
+        for source, target in set(zip(edge_sources[between].tolist(), edge_targets[between].tolist())):
+            successors[source].append(target)
+
+        # Successors have smaller ids, so their bitsets are complete when a component is reached
+        reach = []
+        for source in range(component_count):
+            bits = 1 << source
+            for target in successors[source]:
+                bits |= reach[target]
+            reach.append(bits)
+
+        offsets, targets = compiled.offsets.tolist(), compiled.targets.tolist()
+        within = [1 << node for node in range(node_count)]  # Airports reachable within no flights
+        hops = []
+        for _ in range(max_flights):
+            # Within k flights of an airport are the airport and everything within k - 1 flights of a neighbour
+            previous = within
+            within = []
+            for node in range(node_count):
+                bits = previous[node]
+                for edge in range(offsets[node], offsets[node + 1]):
+                    bits |= previous[targets[edge]]
+                within.append(bits)
+            hops.append(pack_bitsets(within, node_count))
+        hops = np.array(hops, dtype=np.uint8).reshape(max_flights, node_count, (node_count + 7) // 8)
+
+        return cls(compiled, component, pack_bitsets(reach, component_count), hops)
+
+    @property
+    def component_count(self):
+        return self.reach.shape[0]
+
+    @property
+    def max_flights(self):
+        return self.hops.shape[0]
+
+    def reachable(self, source, target):
+        """
+            Check whether any path leads from an airport to another.
+
+            Args:
+                source (int): The airport id of the source.
+                target (int): The airport id of the target.
+
+            Returns:
+                bool: True if the target can be reached from the source.
+        """
+        source_component, target_component = self.component_list[source], self.component_list[target]
+        return bool(self.reach[source_component, target_component >> 3] >> (target_component & 7) & 1)
+
+    def within_flights(self, source, target, flights):
+        """
+            Check whether a path of at most a number of flights leads from an airport to another.
+
+            Args:
+                source (int): The airport id of the source.
+                target (int): The airport id of the target.
+                flights (int): The largest number of flights.
+
+            Returns:
+                bool or None: Whether the target can be reached within the flights, or None if that needs a k-hop
+                              table that was not built.
+        """
+        if source == target:
+            return True
+        if flights <= 0 or not self.reachable(source, target):
+            return False
+        # A path without repeated airports never takes more flights than there are other airports
+        if flights >= self.compiled.node_count - 1:
+            return True
+        if flights > self.max_flights:
+            return None
+        return bool(self.hops[flights - 1, source, target >> 3] >> (target & 7) & 1)
+
+    def save(self, path):
+        """
+            Write the index to a compressed .npz file.
+
+            Args:
+                path (str): The file to write.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as file:
+            np.savez_compressed(file, fingerprint=np.array([self.compiled.fingerprint()]),
+                                components=self.components, reach=self.reach, hops=self.hops)
+
+    @classmethod
+    def load(cls, path, compiled):
+        """
+            Read an index written by save.
+
+            Args:
+                path (str): The file to read.
+                compiled (CompiledGraph): The compiled graph the index must belong to.
+
+            Returns:
+                ReachabilityIndex or None: The index, or None if the file is missing or was built for a different
+                                           graph.
+        """
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            if str(data['fingerprint'][0]) != compiled.fingerprint():
+                return None
+            return cls(compiled, data['components'], data['reach'], data['hops'])
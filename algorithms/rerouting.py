@@ -0,0 +1,79 @@
+from algorithms.search_cache import get_source_search
+
+# Number of airports nearest to an unreachable destination that are considered as alternatives
+REROUTE_CANDIDATES = 5
+
+
+def find_candidate_airports(graph, source_airport, destination_airport, k=REROUTE_CANDIDATES):
+    """
+        Find the airports nearest to a destination that flights arrive at, other than the source.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            k (int): The number of airports to find.
+
+        Returns:
+            list: (IATA code, distance from the destination in km) pairs, nearest first.
+    """
+    count = k
+    while True:
+        nearest_airports = graph.find_nearest_airports(destination_airport, 2 * count)
+        candidates = [(airport, distance) for airport, distance in nearest_airports
+                      if airport != source_airport and graph.get_routes_to(airport)]
+        # Stop once enough airports with flights were found or every airport was looked at
+        if len(candidates) >= k or len(nearest_airports) < 2 * count:
+            return candidates[:k]
+        count *= 2
+
+
+def find_reroute_alternatives(graph, source_airport, destination_airport, weight_name, layover_time=0,
+                              k=REROUTE_CANDIDATES, limit=None, max_weight=None):
+    """
+        Find the reachable airports nearest to a destination, as alternatives to it.
+
+        The alternatives are ranked by their distance from the destination, the weight of their best path from
+        the source only breaking ties. Their paths come from the cached search from the source, which is resumed
+        for every candidate, nearest first, until the first limit reachable alternatives are found.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            weight_name (str): The edge weight of the criteria, or 'layovers' for the fewest flights.
+            layover_time (float): Weight added to every flight.
+            k (int): The number of airports nearest to the destination to consider.
+            limit (int): The number of alternatives to find, defaults to all reachable candidates.
+            max_weight (float): The largest weight of the path to an alternative, or None for no limit.
+
+        Returns:
+            list of dict: The alternatives, nearest first, each with the airport, its distance from the destination
+                          in km, the weight of the best path to it and the IATA codes along that path.
+    """
+    # Candidates the reachability index proves unreachable would make the search exhaust the network
+    candidates = [(airport, distance) for airport, distance in
+                  find_candidate_airports(graph, source_airport, destination_airport, k)
+                  if graph.is_reachable(source_airport, airport) is not False]
+    if not candidates:
+        return []
+
+    search_graph, search = get_source_search(graph, source_airport, weight_name, layover_time)
+    alternatives = []
+    for airport, distance in candidates:
+        # Keep the candidates as far as the last one needed, as equally far airports are ranked by weight
+        if limit is not None and len(alternatives) >= limit \
+                and distance > alternatives[-1]["distance_from_destination"]:
+            break
+        target = search_graph.node_id(airport)
+        if not search.search(target) or max_weight is not None and search.best[target] > max_weight:
+            continue
+        alternatives.append({
+            "airport": airport,
+            "distance_from_destination": distance,
+            "weight": search.best[target],
+            "path": search_graph.path_to_iata(search.path_to(target))
+        })
+
+    alternatives.sort(key=lambda alternative: (alternative["distance_from_destination"], alternative["weight"]))
+    return alternatives[:limit]
@@ -0,0 +1,227 @@
+import copy
+import time
+from collections import OrderedDict
+from algorithms.shortest_path_search import create_search
+
+# Maximum number of single-source searches kept by a SearchCache
+SEARCH_CACHE_SIZE = 64
+# Maximum number of find_route results kept by a RouteCache, and their time to live in seconds (None never expires)
+ROUTE_CACHE_SIZE = 1024
+ROUTE_CACHE_TTL = None
+
+
+def get_source_search(graph, source_airport, weight_name, layover_time=0):
+    """
+        Get a search from a source airport, taken from the graph's search cache when enabled.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            weight_name (str): The edge weight to minimise, or 'layovers' for the fewest flights.
+            layover_time (float): Weight added to every flight.
+
+        Returns:
+            tuple: The search graph and the search (ShortestPathSearch or BreadthFirstSearch).
+    """
+    if graph.search_cache is not None:
+        search_graph, search, _ = graph.search_cache.get_search(graph, source_airport, weight_name, layover_time)
+        return search_graph, search
+    search_graph = graph.get_search_graph()
+    return search_graph, create_search(search_graph, search_graph.node_id(source_airport), weight_name, layover_time)
+
+
+class SearchCache:
+    """
+        Least recently used cache of suspended single-source searches.
+
+        A search from a source for a criterion (weight name and layover time) is independent of the destination,
+        so its distances, predecessors and remaining frontier are kept after a query. A later query from the same
+        source is answered from the settled airports (a hit) or by resuming the suspended search until the new
+        destination is settled (a resume), instead of searching again from scratch (a miss). Searches are dropped
+        when the graph changes, and the least recently used search is evicted once the cache is full.
+    """
+
+    def __init__(self, capacity=SEARCH_CACHE_SIZE):
+        """
+            Args:
+                capacity (int): The maximum number of searches to keep.
+        """
+        self.capacity = capacity
+        self.searches = OrderedDict()  # (source, weight name, layover time) -> (graph version, search graph, search)
+        self.hits = 0
+        self.resumes = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_search(self, graph, source_airport, weight_name, layover_time=0):
+        """
+            Get the cached search from a source for a criterion, starting a new one if none is cached or the
+            graph changed since it was started.
+
+            Args:
+                graph (FlightGraph): The flight graph.
+                source_airport (str): The IATA code of the source airport.
+                weight_name (str): The edge weight to minimise, or 'layovers' for the fewest flights.
+                layover_time (float): Weight added to every flight.
+
+            Returns:
+                tuple: The search graph, the search (ShortestPathSearch or BreadthFirstSearch) and whether the
+                       search was taken from the cache.
+        """
+        search_graph = graph.get_search_graph()
+        key = (source_airport, weight_name, layover_time)
+        entry = self.searches.get(key)
+        if entry is not None and entry[0] == graph.version and entry[1] is search_graph:
+            self.searches.move_to_end(key)
+            return search_graph, entry[2], True
+
+        search = create_search(search_graph, search_graph.node_id(source_airport), weight_name, layover_time)
+        self.searches[key] = (graph.version, search_graph, search)
+        self.searches.move_to_end(key)
+        while len(self.searches) > self.capacity:
+            self.searches.popitem(last=False)
+            self.evictions += 1
+        return search_graph, search, False
+
+    def find_path(self, graph, source_airport, destination_airport, weight_name, layover_time=0):
+        """
+            Find the best path between two airports, reusing and extending the cached search from the source.
+
+            Args:
+                graph (FlightGraph): The flight graph.
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                weight_name (str): The edge weight to minimise, or 'layovers' for the fewest flights.
+                layover_time (float): Weight added to every flight.
+
+            Returns:
+                list or None: The IATA codes along the path, or None if the destination is unreachable.
+        """
+        search_graph, search, cached = self.get_search(graph, source_airport, weight_name, layover_time)
+        target = search_graph.node_id(destination_airport)
+
+        if not cached:
+            self.misses += 1
+        elif search.is_settled(target) or not search.frontier_size:
+            # Answered from the settled airports, or the search already proved the destination unreachable
+            self.hits += 1
+        else:
+            self.resumes += 1
+
+        if not search.search(target):
+            return None
+        return search_graph.path_to_iata(search.path_to(target))
+
+    def clear(self):
+        self.searches.clear()
+
+    def stats(self):
+        """
+            Get the cache counters.
+
+            Returns:
+                dict: The number of hits, resumes, misses and evictions, the number of cached searches and the
+                      share of queries answered without starting a new search.
+        """
+        queries = self.hits + self.resumes + self.misses
+        return {
+            'hits': self.hits,
+            'resumes': self.resumes,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.searches),
+            'capacity': self.capacity,
+            'hit rate': (self.hits + self.resumes) / queries if queries else 0,
+        }
+
+
+class RouteCache:
+    """
+        Least recently used cache of FlightGraph.find_route results, keyed by (source, destination, criteria,
+        intermediate airports).
+
+        Every result is stored with the graph version it was computed on and is ignored once the graph changed,
+        so adding an airport or a route invalidates the whole cache. Results can also expire after a time to live.
+        Lookups return a copy, so callers may modify the result freely.
+    """
+
+    def __init__(self, capacity=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL):
+        """
+            Args:
+                capacity (int): The maximum number of results to keep.
+                ttl (float): The number of seconds a result stays valid, or None to keep results until the
+                             graph changes or they are evicted.
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+        self.results = OrderedDict()  # Key -> (graph version, expiry time, result)
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """
+            Look a result up.
+
+            Args:
+                key (tuple): The (source, destination, criteria, intermediate airports) of the query.
+                version (int): The current version of the graph.
+
+            Returns:
+                tuple: Whether a valid result was found, and a copy of the result (which may be None for
+                       queries without a route).
+        """
+        entry = self.results.get(key)
+        if entry is not None:
+            entry_version, expiry, result = entry
+            if entry_version == version and (expiry is None or time.monotonic() < expiry):
+                self.results.move_to_end(key)
+                self.hits += 1
+                return True, copy.deepcopy(result)
+            if entry_version == version:
+                self.expirations += 1
+            del self.results[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, key, version, result):
+        """
+            Store a result, evicting the least recently used results once the cache is full.
+
+            Args:
+                key (tuple): The (source, destination, criteria, intermediate airports) of the query.
+                version (int): The version of the graph the result was computed on.
+                result (dict or None): The result of the query.
+        """
+        if self.capacity <= 0:
+            return
+        expiry = time.monotonic() + self.ttl if self.ttl is not None else None
+        self.results[key] = (version, expiry, copy.deepcopy(result))
+        self.results.move_to_end(key)
+        while len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.results.clear()
+
+    def stats(self):
+        """
+            Get the cache counters.
+
+            Returns:
+                dict: The number of hits, misses, expirations and evictions, the number of cached results and
+                      the share of lookups answered from the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+            'size': len(self.results),
+            'capacity': self.capacity,
+            'ttl': self.ttl,
+            'hit rate': self.hits / lookups if lookups else 0,
+        }
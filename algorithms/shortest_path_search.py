@@ -0,0 +1,589 @@
+import heapq
+from collections import deque
+from itertools import count
+
+# Edge weight breaking ties between the paths with the fewest flights, for the least layovers criteria
+LAYOVERS_TIE_BREAK = 'cost'
+
+
+class ShortestPathSearch:
+    """
+        Label-setting shortest path search (Dijkstra, or A* when a heuristic is given) from a single source.
+
+        The search runs on a search graph, either a FlightGraph or its CompiledGraph, through the
+        ``out_edges(node, weight_name)`` interface. State is created lazily for the airports the search reaches,
+        stale heap entries are skipped using the settled set, and the search stops as soon as the target is
+        settled. The search is resumable: calling ``search`` again with another target continues from the
+        remaining frontier instead of starting over (only without a heuristic, which is specific to one target).
+    """
+
+    def __init__(self, search_graph, source, weight_name, layover_time=0, heuristic=None):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to search.
+                source: The node id of the source airport in the search graph.
+                weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration').
+                layover_time (float): Weight added to every flight. Adding it to every flight instead of only
+                                      the connecting ones keeps the search independent of the target and
+                                      selects the same paths, as every path to a target pays it once extra.
+                heuristic (callable): Optional lower bound of the remaining weight from a node to the target.
+        """
+        self.search_graph = search_graph
+        self.source = source
+        self.weight_name = weight_name
+        self.layover_time = layover_time
+        self.heuristic = heuristic
+
+        self.best = {source: 0}  # Best known weight from the source to each reached airport
+        self.previous = {}  # Previous airport on the best known path to each reached airport
+        self.settled = set()  # Airports whose best weight is final
+        self.counter = count()  # Tie-breaker so the heap never compares nodes
+        estimate = heuristic(source) if heuristic is not None else 0
+        self.priority_queue = [(estimate, next(self.counter), source)] if estimate != float('inf') else []
+
+    def search(self, target=None):
+        """
+            Run the search until the target is settled, or until the frontier is exhausted if no target is given.
+
+            Args:
+                target: The node id of the target airport.
+
+            Returns:
+                bool: True if the target is reachable (always False when no target is given).
+        """
+        if target in self.settled:
+            return True
+        return self.search_any({target} if target is not None else ()) is not None
+
+    def search_any(self, targets):
+        """
+            Run the search until one of the targets is settled, or until the frontier is exhausted.
+
+            Without a heuristic the targets are settled in order of their weight, so calling it again without the
+            returned target finds the next best one.
+
+            Args:
+                targets (collection): The node ids of the target airports, in order of preference.
+
+            Returns:
+                The node id of the target with the least weight, ties going to the earliest target, or None if no
+                target is reachable.
+        """
+        best, previous, settled = self.best, self.previous, self.settled
+        priority_queue, counter, heuristic = self.priority_queue, self.counter, self.heuristic
+        out_edges, weight_name, layover_time = self.search_graph.out_edges, self.weight_name, self.layover_time
+
+        # Once a target is settled, keep settling the airports tied with it so the tie-break does not depend on
+        # where a resumed search stopped
+        found_weight = min((best[target] for target in targets if target in settled), default=None)
+        while priority_queue and (found_weight is None or len(targets) > 1 and priority_queue[0][0] <= found_weight):
+            _, _, current = heapq.heappop(priority_queue)
+
+            # Skip stale entries of airports that were already settled with a smaller weight
+            if current in settled:
+                continue
+            settled.add(current)
+
+            current_weight = best[current]
+            for neighbour, weight in out_edges(current, weight_name):
+                if neighbour in settled:
+                    continue
+                weight_to_neighbour = current_weight + weight + layover_time
+                if weight_to_neighbour < best.get(neighbour, float('inf')):
+                    estimate = weight_to_neighbour
+                    if heuristic is not None:
+                        estimate += heuristic(neighbour)
+                        # An infinite lower bound proves the target cannot be reached from this airport
+                        if estimate == float('inf'):
+                            continue
+                    best[neighbour] = weight_to_neighbour
+                    previous[neighbour] = current
+                    heapq.heappush(priority_queue, (estimate, next(counter), neighbour))
+
+            # If a target airport is settled, stop once the airports tied with it are settled
+            if found_weight is None and current in targets:
+                found_weight = current_weight
+
+        return min((target for target in targets if target in settled), key=best.__getitem__, default=None)
+
+    def is_settled(self, node):
+        return node in self.settled
+
+    @property
+    def frontier_size(self):
+        return len(self.priority_queue)
+
+    def path_to(self, target):
+        """
+            Rebuild the path to a settled target from the predecessors.
+
+            Args:
+                target: The node id of the target airport.
+
+            Returns:
+                list or None: The node ids along the path, or None if the target is not settled.
+        """
+        if target not in self.settled:
+            return None
+        path = [target]
+        while path[-1] != self.source:
+            path.append(self.previous[path[-1]])
+        path.reverse()
+        return path
+
+
+class BreadthFirstSearch:
+    """
+        Resumable Breadth First Search from a single source, finding the paths with the fewest flights.
+
+        It follows the ShortestPathSearch interface (``search``, ``search_any``, ``path_to``, ``best``,
+        ``is_settled``, ``frontier_size``). Among the paths with the fewest flights to an airport, the one with
+        the least tie-break weight is kept, computed in the same traversal: the airports of a level are relaxed
+        from every airport of the level before, so the path to an airport is final once that level is expanded.
+        The search stops at the end of the level that discovers the target, and a later call continues from the
+        remaining queue.
+    """
+
+    def __init__(self, search_graph, source, tie_break=LAYOVERS_TIE_BREAK):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to search.
+                source: The node id of the source airport in the search graph.
+                tie_break (str): The edge weight breaking ties between paths with the fewest flights ('cost' or
+                                 'duration'), or None to keep the first path discovered.
+        """
+        self.search_graph = search_graph
+        self.source = source
+        self.tie_break = tie_break
+        self.best = {source: 0}  # Number of flights from the source to each discovered airport
+        self.tie_weights = {source: 0}  # Least tie-break weight of the paths with the fewest flights
+        self.previous = {}
+        self.queue = deque([source])
+
+    def search(self, target=None):
+        """
+            Run the search until the target is discovered, or until the queue is exhausted if no target is given.
+
+            Args:
+                target: The node id of the target airport.
+
+            Returns:
+                bool: True if the target is reachable (always False when no target is given).
+        """
+        return self.search_any({target} if target is not None else ()) is not None
+
+    def search_any(self, targets):
+        """
+            Run the search until one of the targets is discovered, or until the queue is exhausted.
+
+            Args:
+                targets (collection): The node ids of the target airports, in order of preference.
+
+            Returns:
+                The node id of the target with the fewest flights, ties going to the earliest target, or None if
+                no target is reachable.
+        """
+        best, tie_weights, previous, queue = self.best, self.tie_weights, self.previous, self.queue
+        tie_break, search_graph = self.tie_break, self.search_graph
+
+        def discover(current):
+            # Discover or relax the neighbours of an airport, returning True if a target is among them
+            found = False
+            flights, tie_weight = best[current] + 1, tie_weights[current]
+            if tie_break is not None:
+                edges = search_graph.out_edges(current, tie_break)
+            else:
+                edges = ((neighbour, 0) for neighbour in search_graph.neighbors(current))
+            for neighbour, weight in edges:
+                if neighbour not in best:
+                    best[neighbour] = flights
+                    tie_weights[neighbour] = tie_weight + weight
+                    previous[neighbour] = current
+                    queue.append(neighbour)
+                    found = found or neighbour in targets
+                elif best[neighbour] == flights and tie_weight + weight < tie_weights[neighbour]:
+                    tie_weights[neighbour] = tie_weight + weight
+                    previous[neighbour] = current
+            return found
+
+        # Once a target is discovered, finish expanding the level before it so its path is final and every tied
+        # target is discovered too, whatever level a resumed search stopped in
+        found_level = min((best[target] for target in targets if target in best), default=None)
+        while queue and (found_level is None or (tie_break is not None or len(targets) > 1)
+                         and best[queue[0]] < found_level):
+            current = queue.popleft()
+            if discover(current) and found_level is None:
+                found_level = best[current] + 1
+
+        return min((target for target in targets if target in best), key=best.__getitem__, default=None)
+
+    def is_settled(self, node):
+        # Paths are final once every airport of the level before them was expanded
+        return node in self.best and (not self.queue or self.tie_break is None
+                                      or self.best[self.queue[0]] >= self.best[node])
+
+    @property
+    def frontier_size(self):
+        return len(self.queue)
+
+    def path_to(self, target):
+        """
+            Rebuild the path to a discovered target from the predecessors.
+
+            Args:
+                target: The node id of the target airport.
+
+            Returns:
+                list or None: The node ids along the path, or None if the target is not discovered.
+        """
+        if target not in self.best:
+            return None
+        path = [target]
+        while path[-1] != self.source:
+            path.append(self.previous[path[-1]])
+        path.reverse()
+        return path
+
+
+class ReversedSearchGraph:
+    """
+        View of a search graph with every route reversed, so a ShortestPathSearch on it finds the best weights
+        from every airport to the source instead of from the source.
+    """
+
+    def __init__(self, search_graph):
+        self.search_graph = search_graph
+
+    def out_edges(self, node, weight_name):
+        return self.search_graph.in_edges(node, weight_name)
+
+    def in_edges(self, node, weight_name):
+        return self.search_graph.out_edges(node, weight_name)
+
+
+def create_search(search_graph, source, weight_name, layover_time=0, heuristic=None):
+    # Breadth First Search for the fewest flights, a shortest path search for any edge weight
+    if weight_name == 'layovers':
+        return BreadthFirstSearch(search_graph, source)
+    return ShortestPathSearch(search_graph, source, weight_name, layover_time, heuristic)
+
+
+def find_route_path(graph, source_airport, destination_airport, weight_name, layover_time=0, heuristic=None):
+    """
+        Find the best path between two airports for a weight, on the compiled graph when available.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration'), or
+                               'layovers' for the fewest flights.
+            layover_time (float): Weight added to every flight.
+            heuristic (callable): Optional lower bound of the remaining weight from a node to the destination,
+                                  taking node ids of the search graph.
+
+        Returns:
+            list or None: The IATA codes along the path, or None if the destination is unreachable.
+    """
+    # Searches without a heuristic are not specific to the destination and can be cached and resumed
+    if heuristic is None and graph.search_cache is not None:
+        return graph.search_cache.find_path(graph, source_airport, destination_airport, weight_name, layover_time)
+
+    search_graph = graph.get_search_graph()
+    search = create_search(search_graph, search_graph.node_id(source_airport), weight_name, layover_time, heuristic)
+    target = search_graph.node_id(destination_airport)
+    if not search.search(target):
+        return None
+    return search_graph.path_to_iata(search.path_to(target))
+
+
+def find_optimal_flight_path(graph, source_airport, destination_airport):
+    """
+        Find the optimal flight path between two airports, on the compiled graph when available.
+
+        The search scores the airports by the distance flown to reach them and takes them from the queue in order
+        of that score plus the cost and duration of the flight that reached them, with a 2 hour layover unless
+        that flight lands at the destination. It stops when the destination is taken from the queue.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+
+        Returns:
+            list or None: The IATA codes along the path, or None if the destination is unreachable.
+    """
+    search_graph = graph.get_search_graph()
+    source, target = search_graph.node_id(source_airport), search_graph.node_id(destination_airport)
+    out_edges = search_graph.out_edges
+    g_score = {source: 0}
+    previous = {}
+
+    priority_queue = [(0, source)]
+    while priority_queue:
+        current_cost, current = heapq.heappop(priority_queue)
+
+        # If the destination airport is reached, stop
+        if current == target:
+            break
+
+        for (neighbour, distance), (_, cost), (_, duration) in zip(out_edges(current, 'distance'),
+                                                                   out_edges(current, 'cost'),
+                                                                   out_edges(current, 'duration')):
+            tentative_g_score = current_cost + distance
+            if tentative_g_score < g_score.get(neighbour, float('inf')):
+                g_score[neighbour] = tentative_g_score
+                if neighbour != target:
+                    duration += 2
+                previous[neighbour] = current
+                heapq.heappush(priority_queue, (tentative_g_score + cost + duration, neighbour))
+
+    if target != source and target not in previous:
+        return None
+    path = [target]
+    while path[-1] != source:
+        path.append(previous[path[-1]])
+    path.reverse()
+    return search_graph.path_to_iata(path)
+
+
+class BidirectionalSearch:
+    """
+        Bidirectional Dijkstra between two airports.
+
+        A forward search grows from the source over the outgoing routes and a backward search grows from the
+        target over the incoming routes (``in_edges``, the routes_to index). The side with the smaller frontier key
+        is expanded next, and the search stops once the two smallest frontier keys add up to at least the best
+        path found through an airport reached from both sides.
+    """
+
+    def __init__(self, search_graph, source, target, weight_name, layover_time=0):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to search.
+                source: The node id of the source airport in the search graph.
+                target: The node id of the target airport in the search graph.
+                weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration').
+                layover_time (float): Weight added to every flight.
+        """
+        self.search_graph = search_graph
+        self.source = source
+        self.target = target
+        self.weight_name = weight_name
+        self.layover_time = layover_time
+
+        self.forward_best = {source: 0}
+        self.backward_best = {target: 0}
+        self.forward_previous = {}  # Previous airport on the best known path from the source
+        self.backward_next = {}  # Next airport on the best known path to the target
+        self.forward_settled = set()
+        self.backward_settled = set()
+
+    def search(self):
+        """
+            Run the search.
+
+            Returns:
+                list or None: The node ids along the best path, or None if the target is unreachable.
+        """
+        if self.source == self.target:
+            return [self.source]
+
+        counter = count()
+        forward_queue = [(0, next(counter), self.source)]
+        backward_queue = [(0, next(counter), self.target)]
+        best_total = float('inf')
+        meeting_node = None
+
+        while forward_queue and backward_queue:
+            # Stop once no path through the unsettled frontier can beat the best path found
+            if forward_queue[0][0] + backward_queue[0][0] >= best_total:
+                break
+
+            if forward_queue[0][0] <= backward_queue[0][0]:
+                queue, best, links, settled = forward_queue, self.forward_best, self.forward_previous, \
+                    self.forward_settled
+                other_best, edges = self.backward_best, self.search_graph.out_edges
+            else:
+                queue, best, links, settled = backward_queue, self.backward_best, self.backward_next, \
+                    self.backward_settled
+                other_best, edges = self.forward_best, self.search_graph.in_edges
+
+            current_weight, _, current = heapq.heappop(queue)
+            # Skip stale entries of airports that were already settled with a smaller weight
+            if current in settled:
+                continue
+            settled.add(current)
+
+            for neighbour, weight in edges(current, self.weight_name):
+                weight_to_neighbour = current_weight + weight + self.layover_time
+                if weight_to_neighbour < best.get(neighbour, float('inf')):
+                    best[neighbour] = weight_to_neighbour
+                    links[neighbour] = current
+                    heapq.heappush(queue, (weight_to_neighbour, next(counter), neighbour))
+                # Check for a better path through an airport reached from the other side
+                if neighbour in other_best and best[neighbour] + other_best[neighbour] < best_total:
+                    best_total = best[neighbour] + other_best[neighbour]
+                    meeting_node = neighbour
+
+        if meeting_node is None:
+            return None
+
+        # Join the forward path to the meeting airport with the backward path from it
+        path = [meeting_node]
+        while path[-1] != self.source:
+            path.append(self.forward_previous[path[-1]])
+        path.reverse()
+        while path[-1] != self.target:
+            path.append(self.backward_next[path[-1]])
+        return path
+
+    @property
+    def settled_count(self):
+        return len(self.forward_settled) + len(self.backward_settled)
+
+
+def find_bidirectional_route_path(graph, source_airport, destination_airport, weight_name, layover_time=0):
+    """
+        Find the best path between two airports for a weight with bidirectional Dijkstra.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            weight_name (str): The edge weight to minimise ('distance', 'cost' or 'duration').
+            layover_time (float): Weight added to every flight.
+
+        Returns:
+            list or None: The IATA codes along the path, or None if the destination is unreachable.
+    """
+    search_graph = graph.get_search_graph()
+    search = BidirectionalSearch(search_graph, search_graph.node_id(source_airport),
+                                 search_graph.node_id(destination_airport), weight_name, layover_time)
+    path = search.search()
+    return search_graph.path_to_iata(path) if path is not None else None
+
+
+class BidirectionalBreadthFirstSearch:
+    """
+        Bidirectional Breadth First Search for the path with the fewest flights between two airports.
+
+        A forward search grows from the source over the outgoing routes and a backward search grows from the
+        target over the incoming routes (``in_edges``, the routes_to index), a whole level at a time and always on
+        the side with the smaller frontier. The first level that reaches an airport discovered by the other side
+        holds every path with the fewest flights, so the search stops there and joins the two halves through the
+        meeting airport with the least tie-break weight. With a flight limit, the search stops as soon as the two
+        sides cannot meet within it.
+    """
+
+    def __init__(self, search_graph, source, target, max_flights=None, tie_break=LAYOVERS_TIE_BREAK):
+        """
+            Args:
+                search_graph (FlightGraph or CompiledGraph): The graph to search.
+                source: The node id of the source airport in the search graph.
+                target: The node id of the target airport in the search graph.
+                max_flights (int): The largest number of flights of the path, or None for no limit.
+                tie_break (str): The edge weight breaking ties between paths with the fewest flights ('cost' or
+                                 'duration'), or None to keep the first path found.
+        """
+        self.search_graph = search_graph
+        self.source = source
+        self.target = target
+        self.max_flights = max_flights
+        self.tie_break = tie_break
+
+        self.forward_best = {source: 0}  # Number of flights from the source
+        self.backward_best = {target: 0}  # Number of flights to the target
+        self.forward_tie_weights = {source: 0}
+        self.backward_tie_weights = {target: 0}
+        self.forward_previous = {}  # Previous airport on the best known path from the source
+        self.backward_next = {}  # Next airport on the best known path to the target
+
+    def expand(self, frontier, best, tie_weights, links, edges):
+        # Discover the next level from every airport of a frontier, keeping the least tie-break weight
+        next_frontier = []
+        for current in frontier:
+            flights, tie_weight = best[current] + 1, tie_weights[current]
+            if self.tie_break is not None:
+                current_edges = edges(current, self.tie_break)
+            else:
+                current_edges = ((neighbour, 0) for neighbour, _ in edges(current, 'distance'))
+            for neighbour, weight in current_edges:
+                if neighbour not in best:
+                    best[neighbour] = flights
+                    tie_weights[neighbour] = tie_weight + weight
+                    links[neighbour] = current
+                    next_frontier.append(neighbour)
+                elif best[neighbour] == flights and tie_weight + weight < tie_weights[neighbour]:
+                    tie_weights[neighbour] = tie_weight + weight
+                    links[neighbour] = current
+        return next_frontier
+
+    def search(self):
+        """
+            Run the search.
+
+            Returns:
+                list or None: The node ids along the path, or None if the target is unreachable within the flight
+                              limit.
+        """
+        if self.source == self.target:
+            return [self.source]
+
+        forward_frontier, backward_frontier = [self.source], [self.target]
+        forward_level = backward_level = 0
+        while forward_frontier and backward_frontier:
+            # The next level could only meet the other side with one flight more than allowed
+            if self.max_flights is not None and forward_level + backward_level >= self.max_flights:
+                return None
+
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier = self.expand(forward_frontier, self.forward_best, self.forward_tie_weights,
+                                               self.forward_previous, self.search_graph.out_edges)
+                forward_level += 1
+                meeting = [node for node in forward_frontier if node in self.backward_best]
+            else:
+                backward_frontier = self.expand(backward_frontier, self.backward_best, self.backward_tie_weights,
+                                                self.backward_next, self.search_graph.in_edges)
+                backward_level += 1
+                meeting = [node for node in backward_frontier if node in self.forward_best]
+
+            if meeting:
+                meeting_node = min(meeting, key=lambda node: self.forward_tie_weights[node]
+                                   + self.backward_tie_weights[node])
+                # Join the forward path to the meeting airport with the backward path from it
+                path = [meeting_node]
+                while path[-1] != self.source:
+                    path.append(self.forward_previous[path[-1]])
+                path.reverse()
+                while path[-1] != self.target:
+                    path.append(self.backward_next[path[-1]])
+                return path
+
+        return None
+
+    @property
+    def discovered_count(self):
+        return len(self.forward_best) + len(self.backward_best)
+
+
+def find_bidirectional_layovers_path(graph, source_airport, destination_airport, max_flights=None):
+    """
+        Find the path with the fewest flights between two airports with bidirectional Breadth First Search, ties
+        broken by LAYOVERS_TIE_BREAK.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            max_flights (int): The largest number of flights of the path, or None for no limit.
+
+        Returns:
+            list or None: The IATA codes along the path, or None if the destination is unreachable within the
+                          flight limit.
+    """
+    search_graph = graph.get_search_graph()
+    search = BidirectionalBreadthFirstSearch(search_graph, search_graph.node_id(source_airport),
+                                             search_graph.node_id(destination_airport), max_flights)
+    path = search.search()
+    return search_graph.path_to_iata(path) if path is not None else None
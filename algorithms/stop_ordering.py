@@ -0,0 +1,132 @@
+from itertools import combinations
+from algorithms.search_cache import get_source_search
+
+# Weight name and layover time searched for every find_route criteria (see ShortestPathSearch). The optimal
+# criteria is not the minimum of a path weight (see AStar.find_leg_path), so it has none.
+CRITERIA_WEIGHTS = {
+    'shortest distance': ('distance', 0),
+    'least cost': ('cost', 0),
+    'shortest duration': ('duration', 2),
+    'least layovers': ('layovers', 0),
+}
+# Largest number of stops ordered exactly with Held-Karp, which takes O(2^n * n^2) time
+HELD_KARP_LIMIT = 12
+
+
+def build_cost_matrix(graph, sources, targets, weight_name, layover_time=0):
+    """
+        Compute the best weight from every source airport to every target airport with one search per source.
+
+        Each search is taken from the graph's search cache when enabled and only runs until all the targets are
+        settled, so the searches are reused by the route queries of the trip that follow.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            sources (list of str): The IATA codes of the source airports.
+            targets (list of str): The IATA codes of the target airports.
+            weight_name (str): The edge weight to minimise, or 'layovers' for the fewest flights.
+            layover_time (float): Weight added to every flight.
+
+        Returns:
+            list of list: ``matrix[i][j]`` is the best weight from source i to target j (inf when unreachable).
+    """
+    matrix = []
+    for source_airport in sources:
+        search_graph, search = get_source_search(graph, source_airport, weight_name, layover_time)
+        row = []
+        for destination_airport in targets:
+            target = search_graph.node_id(destination_airport)
+            # Unreachable targets are ruled out by the reachability index, when prepared, without searching
+            reachable = graph.is_reachable(source_airport, destination_airport) is not False and search.search(target)
+            row.append(search.best[target] if reachable else float('inf'))
+        matrix.append(row)
+    return matrix
+
+
+def held_karp(matrix, stops, start, end):
+    # Exact cheapest order of the stops on a path from start to end, by dynamic programming over subsets
+    best = {(1 << i, i): (matrix[start][stop], None) for i, stop in enumerate(stops)}
+    for size in range(2, len(stops) + 1):
+        for subset in combinations(range(len(stops)), size):
+            bits = sum(1 << i for i in subset)
+            for last in subset:
+                previous_bits = bits & ~(1 << last)
+                best[(bits, last)] = min(
+                    (best[(previous_bits, previous)][0] + matrix[stops[previous]][stops[last]], previous)
+                    for previous in subset if previous != last
+                )
+
+    all_bits = (1 << len(stops)) - 1
+    _, last = min((best[(all_bits, last)][0] + matrix[stops[last]][end], last) for last in range(len(stops)))
+    order = []
+    bits = all_bits
+    while last is not None:
+        order.append(stops[last])
+        bits, last = bits & ~(1 << last), best[(bits, last)][1]
+    order.reverse()
+    return order
+
+
+def path_weight(matrix, path):
+    return sum(matrix[current][following] for current, following in zip(path, path[1:]))
+
+
+def nearest_neighbour_two_opt(matrix, stops, start, end):
+    # Greedy order of the stops improved by reversing segments while that makes the path cheaper
+    remaining = list(stops)
+    order = []
+    current = start
+    while remaining:
+        current = min(remaining, key=lambda stop: matrix[current][stop])
+        remaining.remove(current)
+        order.append(current)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(order) - 1):
+            for j in range(i + 1, len(order)):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                if path_weight(matrix, [start] + candidate + [end]) < path_weight(matrix, [start] + order + [end]):
+                    order = candidate
+                    improved = True
+    return order
+
+
+def order_stops(graph, source_airport, destination_airport, intermediate_airports, criteria):
+    """
+        Find the order of the intermediate airports that makes the trip best for a criteria.
+
+        The stop-to-stop weights come from one-to-many searches. Up to HELD_KARP_LIMIT stops are ordered exactly
+        with Held-Karp, more stops with a nearest-neighbour order improved by 2-opt.
+
+        Args:
+            graph (FlightGraph): The flight graph.
+            source_airport (str): The IATA code of the source airport.
+            destination_airport (str): The IATA code of the destination airport.
+            intermediate_airports (list of str): List of IATA codes of intermediate airports, in any order.
+            criteria (str): The find_route criteria to optimise.
+
+        Returns:
+            list of str: The intermediate airports in their best order, or in the given order if no order
+                         connects the whole trip or the criteria has no path weight to order them by.
+    """
+    if len(intermediate_airports) < 2 or criteria not in CRITERIA_WEIGHTS:
+        return list(intermediate_airports)
+
+    weight_name, layover_time = CRITERIA_WEIGHTS[criteria]
+    airports = [source_airport] + list(intermediate_airports) + [destination_airport]
+    # No leg leaves the destination, so it only needs a column
+    matrix = build_cost_matrix(graph, airports[:-1], airports, weight_name, layover_time)
+
+    stops = list(range(1, len(airports) - 1))
+    start, end = 0, len(airports) - 1
+    if len(stops) <= HELD_KARP_LIMIT:
+        order = held_karp(matrix, stops, start, end)
+    else:
+        order = nearest_neighbour_two_opt(matrix, stops, start, end)
+
+    # Keep the given order when no order avoids an unreachable leg, so the usual rerouting applies
+    if path_weight(matrix, [start] + order + [end]) == float('inf'):
+        return list(intermediate_airports)
+    return [airports[stop] for stop in order]
@@ -1,22 +1,101 @@
+import glob
+import hashlib
 import os
+import threading
+import time
+from itertools import islice
 import pandas as pd
-from utils.calculation_utils import haversine_formula_distance
+from utils.calculation_utils import haversine_formula_distance, haversine_formula_distance_array, \
+    calculate_flight_cost_array, calculate_flight_duration_array
 from models.airport import AirportNode
+from models.compiled_graph import CompiledGraph
+from models.spatial_index import SpatialIndex
+from models.timetable import Timetable, parse_time
 from algorithms.flight_path_algorithms import Dijkstra, BFS, AStar
+from algorithms.contraction_hierarchies import ContractionHierarchy
+from algorithms.landmarks import Landmarks, LANDMARK_COUNT
+from algorithms.great_circle import GreatCircleHeuristics
+from algorithms.all_pairs import AllPairsTables
+from algorithms.reachability import ReachabilityIndex
+from algorithms.search_cache import SearchCache, RouteCache, get_source_search
+from algorithms.batch_queries import find_routes_batch
+from algorithms.pareto_search import find_pareto_routes
+from algorithms.stop_ordering import CRITERIA_WEIGHTS, order_stops
+from algorithms.rerouting import REROUTE_CANDIDATES, find_reroute_alternatives
+from algorithms.k_shortest_paths import find_k_shortest_paths
+from algorithms.constrained_routing import BUDGET_LAYOVER_TIMES, find_constrained_paths
+from algorithms.connection_scan import ConnectionScan
+
+# Columns read from the airports file
+AIRPORT_COLUMNS = ['IATA', 'Name', 'City', 'Country', 'Latitude', 'Longitude']
+# Columns read from the flight dataset (europe_flight_dataset.csv)
+FLIGHT_COLUMNS = ['Source Airport IATA', 'Destination Airport IATA']
+FLIGHT_WEIGHT_COLUMNS = ['Distance', 'Estimated Cost', 'Estimated Duration']
+# Columns read from a raw OpenFlights routes file (routes.csv)
+ROUTE_COLUMNS = ['Source airport', 'Destination airport']
+
+# Datasets available through get_graph, as (airports file, flights file) relative to this directory
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DATASETS = {
+    'europe': ('europe_airports.csv', 'europe_flight_dataset.csv'),
+    'world': ('airports.csv', 'routes.csv'),
+}
+SNAPSHOT_DIRECTORY = os.path.join(DATA_DIRECTORY, 'snapshots')
+
+# Graphs built by get_graph, shared by every caller in the process
+graph_registry = {}
+graph_registry_lock = threading.Lock()
 
 
 class FlightGraph:
-    airports = {}  # Adjacency list to store airports as nodes flight routes as edges
+    def __init__(self, airports_file, flights_file, compiled=False, snapshot_dir=None):
+        self.airports = {}  # Adjacency list to store airports as nodes flight routes as edges
+        # Array-backed copy of the graph used by the search algorithms when compiled mode is enabled
+        self.compiled_mode = compiled
+        self.compiled = None
+        # Contraction Hierarchies used by Dijkstra's 'contraction hierarchies' search mode
+        self.contraction_hierarchy = None
+        # Landmark tables used by AStar's ALT heuristics
+        self.landmarks = None
+        # All-pairs route tables answering single-leg queries by lookup
+        self.all_pairs = None
+        # Reachability index answering unreachable and within-k-flights queries before any search
+        self.reachability = None
+        # Great-circle heuristics of the compiled graph, built on first use
+        self.great_circle_heuristics = None
+        # Incremented on every change to the airports or routes, so cached searches can be invalidated
+        self.version = 0
+        # Suspended single-source searches resumed by later queries from the same source
+        self.search_cache = SearchCache()
+        # Results of find_route, invalidated by the version counter
+        self.route_cache = RouteCache()
+        # Spatial index over the airport coordinates and the graph version it was built for, built on first use
+        self.spatial_index = None
+        self.spatial_index_version = None
+        # Scheduled flights and the graph version they were generated for (None when supplied), built on first use
+        self.timetable = None
+        self.timetable_version = None
+        # Connection Scan engine over the timetable
+        self.connection_scan = None
+        # Index of (source IATA, destination IATA) -> RouteEdge for constant-time weight lookups
+        self.route_index = {}
+        # Destination IATA -> RouteEdges arriving there, kept up to date by add_airport and add_flight_route
+        self.routes_to = {}
+        # Time taken by each phase of loading the graph, in seconds
+        self.load_times = {}
 
-    def __init__(self, airports_file, flights_file):
         try:
             if not os.path.isfile(airports_file):
                 raise FileNotFoundError(f"Airports file '{airports_file}' not found.")
             if not os.path.isfile(flights_file):
                 raise FileNotFoundError(f"Flights file '{flights_file}' not found.")
 
-            self.load_airports(airports_file)
-            self.load_flights(flights_file)
+            # Map a compiled snapshot of the source files if one exists, otherwise parse the CSVs
+            if snapshot_dir is None or not self.load_snapshot(airports_file, flights_file, snapshot_dir):
+                self.load_airports(airports_file)
+                self.load_flights(flights_file)
+                if snapshot_dir is not None:
+                    self.save_snapshot(airports_file, flights_file, snapshot_dir)
         except FileNotFoundError as e:
             print("File not found: " + str(e))
         except Exception as e:
@@ -25,31 +104,383 @@ class FlightGraph:
             self.dijkstra = Dijkstra(self)
             self.bfs = BFS(self)
             self.astar = AStar(self)
+            # Built in one pass, as snapshot loading creates the route edges without add_flight_route
+            start = time.perf_counter()
             self.routes_to = self.initialize_routes_to()
+            self.record_load_time('routes to', start)
 
     def load_airports(self, airports_file):
-        airports_df = pd.read_csv(airports_file)
+        start = time.perf_counter()
+        airports_df = pd.read_csv(airports_file, usecols=AIRPORT_COLUMNS, keep_default_na=False,
+                                  na_values={'Latitude': [''], 'Longitude': ['']})
+        # Skip airports without an IATA code (marked as '\\N' in the OpenFlights data)
+        airports_df = airports_df[(airports_df['IATA'] != '') & (airports_df['IATA'] != '\\N')]
+        self.record_load_time('read airports', start)
 
-        for index, row in airports_df.iterrows():
-            airport = AirportNode(row['IATA'], row['Name'], row['City'], row['Country'], row['Latitude'],
-                                  row['Longitude'])
-            self.add_airport(row['IATA'], airport)
+        start = time.perf_counter()
+        for iata, name, city, country, latitude, longitude in zip(*(airports_df[column].tolist()
+                                                                    for column in AIRPORT_COLUMNS)):
+            self.add_airport(iata, AirportNode(iata, name, city, country, latitude, longitude))
+        self.record_load_time('build airports', start)
 
     def load_flights(self, flights_file):
-        flights_df = pd.read_csv(flights_file)
+        start = time.perf_counter()
+        header = pd.read_csv(flights_file, nrows=0).columns
+        if FLIGHT_COLUMNS[0] in header:
+            flights_df = pd.read_csv(flights_file, usecols=FLIGHT_COLUMNS + FLIGHT_WEIGHT_COLUMNS)
+            flights_df.columns = ['source', 'destination', 'distance', 'cost', 'duration']
+        else:
+            # Raw OpenFlights routes file without weights, derive them from the airport coordinates
+            flights_df = pd.read_csv(flights_file, usecols=ROUTE_COLUMNS)
+            flights_df.columns = ['source', 'destination']
+        self.record_load_time('read flights', start)
+
+        start = time.perf_counter()
+        flights_df = flights_df[flights_df['source'].isin(self.airports) &
+                                flights_df['destination'].isin(self.airports)]
+        if 'distance' not in flights_df:
+            flights_df = self.derive_flight_weights(flights_df)
+        # Merge parallel flights (one per airline) on the same route, keeping the best weight per criterion
+        flights_df = flights_df.groupby(['source', 'destination'], sort=False, as_index=False).min()
+        self.record_load_time('prepare flights', start)
+
+        start = time.perf_counter()
+        for source, destination, distance, cost, duration in zip(flights_df['source'].tolist(),
+                                                                 flights_df['destination'].tolist(),
+                                                                 flights_df['distance'].tolist(),
+                                                                 flights_df['cost'].tolist(),
+                                                                 flights_df['duration'].tolist()):
+            self.add_flight_route(source, destination, distance, cost, duration)
+        self.record_load_time('build flights', start)
+
+    def derive_flight_weights(self, flights_df):
+        # Compute distance, cost and duration for every flight in one pass over the coordinate arrays
+        latitude = {iata: airport.latitude for iata, airport in self.airports.items()}
+        longitude = {iata: airport.longitude for iata, airport in self.airports.items()}
+        distance = haversine_formula_distance_array(flights_df['source'].map(latitude).to_numpy(),
+                                                    flights_df['source'].map(longitude).to_numpy(),
+                                                    flights_df['destination'].map(latitude).to_numpy(),
+                                                    flights_df['destination'].map(longitude).to_numpy())
+        return flights_df.assign(distance=distance, cost=calculate_flight_cost_array(distance),
+                                 duration=calculate_flight_duration_array(distance))
+
+    @staticmethod
+    def snapshot_path(airports_file, flights_file, snapshot_dir):
+        # Snapshots are named after the source files and the content hash of their contents
+        content_hash = hashlib.sha256()
+        for source_file in (airports_file, flights_file):
+            with open(source_file, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                    content_hash.update(chunk)
+        source_hash = content_hash.hexdigest()
+        stem = '.'.join(os.path.splitext(os.path.basename(source_file))[0]
+                        for source_file in (airports_file, flights_file))
+        return os.path.join(snapshot_dir, f"{stem}-{source_hash[:16]}.fgsnap"), source_hash
+
+    def load_snapshot(self, airports_file, flights_file, snapshot_dir):
+        """
+            Load the graph from a compiled snapshot of the source files, enabling compiled mode.
+
+            Args:
+                airports_file (str): The airports file the snapshot was built from.
+                flights_file (str): The flights file the snapshot was built from.
+                snapshot_dir (str): The directory holding the snapshots.
+
+            Returns:
+                bool: True if an up-to-date snapshot was loaded, False if the CSVs need to be parsed.
+        """
+        start = time.perf_counter()
+        path, source_hash = self.snapshot_path(airports_file, flights_file, snapshot_dir)
+        snapshot = CompiledGraph.load_snapshot(path, source_hash)
+        if snapshot is None:
+            return False
+        compiled, nodes = snapshot
+        self.record_load_time('read snapshot', start)
+
+        start = time.perf_counter()
+        for (iata, name, city, country), latitude, longitude in zip(nodes, compiled.latitude.tolist(),
+                                                                    compiled.longitude.tolist()):
+            self.add_airport(iata, AirportNode(iata, name, city, country, latitude, longitude))
+        self.record_load_time('build airports', start)
+
+        start = time.perf_counter()
+        sources = compiled.iata_codes
+        offsets = compiled.offsets.tolist()
+        targets = compiled.targets.tolist()
+        distances, costs, durations = (compiled.weights[name].tolist() for name in ('distance', 'cost', 'duration'))
+        # Costs are stored as floats in the snapshot but are whole numbers in the datasets
+        costs = [int(cost) if cost.is_integer() else cost for cost in costs]
+        # Snapshot edges are already merged, so the route edges are created directly
+        for source in range(compiled.node_count):
+            source_airport = sources[source]
+            source_node = self.airports[source_airport]
+            for edge in range(offsets[source], offsets[source + 1]):
+                destination_airport = sources[targets[edge]]
+                weights = {'distance': distances[edge], 'cost': costs[edge], 'duration': durations[edge]}
+                self.route_index[(source_airport, destination_airport)] = source_node.add_route_edge(
+                    destination_airport, weights)
+        self.record_load_time('build flights', start)
+
+        self.compiled_mode = True
+        self.compiled = compiled
+        return True
 
-        for index, row in flights_df.iterrows():
-            self.add_flight_route(row['Source Airport IATA'], row['Destination Airport IATA'], row['Distance'],
-                                  row['Estimated Cost'], row['Estimated Duration'])
+    def save_snapshot(self, airports_file, flights_file, snapshot_dir):
+        # Write a compiled snapshot of the graph and remove the stale snapshots of the same dataset
+        start = time.perf_counter()
+        path, source_hash = self.snapshot_path(airports_file, flights_file, snapshot_dir)
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            compiled = self.compiled if self.compiled is not None else CompiledGraph.from_flight_graph(self)
+            compiled.save_snapshot(path, source_hash, self.airports)
+            stem = os.path.basename(path).rsplit('-', 1)[0]
+            for stale_path in glob.glob(os.path.join(snapshot_dir, f"{stem}-*.fgsnap")):
+                if stale_path != path:
+                    os.remove(stale_path)
+        except OSError as e:
+            print("Could not write graph snapshot: " + str(e))
+            return
+        self.compiled_mode = True
+        self.compiled = compiled
+        self.record_load_time('write snapshot', start)
+
+    def record_load_time(self, phase, start):
+        # Store the time taken by a load phase in seconds
+        self.load_times[phase] = time.perf_counter() - start
 
     def add_airport(self, code, airport):
+        # Drop the index entries of the routes of an airport being replaced
+        if code in self.airports:
+            for route in self.airports[code].routes:
+                self.route_index.pop((code, route.destination_airport), None)
+                self.routes_to[route.destination_airport].remove(route)
         self.airports[code] = airport
+        self.compiled = None
+        self.version += 1
 
     def add_flight_route(self, source_airport, destination_airport, distance, cost, duration):
         if source_airport in self.airports and destination_airport in self.airports:
-            source_node = self.airports[source_airport]
             weights = {'distance': distance, 'cost': cost, 'duration': duration}
-            source_node.add_route_edge(destination_airport, weights)
+            route = self.route_index.get((source_airport, destination_airport))
+            if route is None:
+                source_node = self.airports[source_airport]
+                route = source_node.add_route_edge(destination_airport, weights)
+                self.route_index[(source_airport, destination_airport)] = route
+                self.routes_to.setdefault(destination_airport, []).append(route)
+            else:
+                # Parallel flight (e.g. another airline) on the same route, keep the best weight per criterion
+                for weight_name, value in weights.items():
+                    if value < route.weights[weight_name]:
+                        route.weights[weight_name] = value
+            self.compiled = None
+            self.version += 1
+
+    def get_route(self, source_airport, destination_airport):
+        return self.route_index.get((source_airport, destination_airport))
+
+    def compile(self):
+        """
+            Enable compiled mode and build the CSR arrays the search algorithms run on.
+
+            Returns:
+                CompiledGraph: The compiled graph.
+        """
+        self.compiled_mode = True
+        return self.get_compiled()
+
+    def prepare_contraction_hierarchy(self, path=None):
+        """
+            Preprocess Contraction Hierarchies for the distance, cost and duration criteria and switch Dijkstra
+            to the 'contraction hierarchies' search mode. Enables compiled mode.
+
+            Args:
+                path (str): Optional .npz file to load the preprocessed hierarchy from, or to save it to if it is
+                            missing or was built for different data.
+
+            Returns:
+                ContractionHierarchy: The preprocessed hierarchy.
+        """
+        compiled = self.compile()
+        hierarchy = ContractionHierarchy.load(path, compiled) if path is not None else None
+        if hierarchy is None:
+            hierarchy = ContractionHierarchy.build(compiled)
+            if path is not None:
+                hierarchy.save(path)
+        self.contraction_hierarchy = hierarchy
+        self.dijkstra.search_mode = 'contraction hierarchies'
+        return hierarchy
+
+    def prepare_landmarks(self, path=None, count=LANDMARK_COUNT):
+        """
+            Pick landmarks and compute the tables behind AStar's ALT heuristics. Enables compiled mode.
+
+            Args:
+                path (str): Optional .npz file to load the landmark tables from, or to save them to if it is
+                            missing or was built for different data.
+                count (int): The number of landmarks to pick when building the tables.
+
+            Returns:
+                Landmarks: The landmark tables.
+        """
+        compiled = self.compile()
+        landmarks = Landmarks.load(path, compiled) if path is not None else None
+        if landmarks is None:
+            landmarks = Landmarks.build(compiled, count)
+            if path is not None:
+                landmarks.save(path)
+        self.landmarks = landmarks
+        return landmarks
+
+    def prepare_all_pairs(self, path=None, processes=None):
+        """
+            Precompute all-pairs route tables for the distance, cost, duration and least layovers criteria, after
+            which Dijkstra and BFS answer single-leg queries by lookup. Enables compiled mode.
+
+            Args:
+                path (str): Optional .npz file to load the tables from, or to save them to if it is missing or was
+                            built for different data.
+                processes (int): The number of worker processes used to build the tables.
+
+            Returns:
+                AllPairsTables: The tables.
+        """
+        compiled = self.compile()
+        tables = AllPairsTables.load(path, compiled) if path is not None else None
+        if tables is None:
+            tables = AllPairsTables.build(compiled, processes)
+            if path is not None:
+                tables.save(path)
+        self.all_pairs = tables
+        return tables
+
+    def prepare_reachability(self, path=None, max_flights=0):
+        """
+            Condense the route network into strongly connected components and compute the reachability bitsets,
+            after which unreachable destinations are ruled out before searching. Enables compiled mode.
+
+            Args:
+                path (str): Optional .npz file to load the index from, or to save it to if it is missing or was
+                            built for different data.
+                max_flights (int): The largest number of flights with k-hop tables when building the index.
+
+            Returns:
+                ReachabilityIndex: The reachability index.
+        """
+        compiled = self.compile()
+        reachability = ReachabilityIndex.load(path, compiled) if path is not None else None
+        if reachability is None:
+            reachability = ReachabilityIndex.build(compiled, max_flights)
+            if path is not None:
+                reachability.save(path)
+        self.reachability = reachability
+        return reachability
+
+    def is_reachable(self, source_airport, destination_airport):
+        """
+            Check whether any route leads from an airport to another with the reachability index.
+
+            Returns:
+                bool or None: Whether the destination can be reached, or None if no index was prepared for the
+                              current graph.
+        """
+        reachability = self.reachability
+        if reachability is None or reachability.compiled is not self.get_compiled():
+            return None
+        compiled = reachability.compiled
+        return reachability.reachable(compiled.index[source_airport], compiled.index[destination_airport])
+
+    def is_within_flights(self, source_airport, destination_airport, max_flights):
+        """
+            Check whether a route of at most a number of flights leads from an airport to another.
+
+            Answered from the reachability index when it covers the number of flights, otherwise by the cached
+            fewest flights search from the source.
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                max_flights (int): The largest number of flights.
+
+            Returns:
+                bool: True if the destination can be reached within the flights.
+        """
+        reachability = self.reachability
+        if reachability is not None and reachability.compiled is self.get_compiled():
+            compiled = reachability.compiled
+            within = reachability.within_flights(compiled.index[source_airport], compiled.index[destination_airport],
+                                                 max_flights)
+            if within is not None:
+                return within
+        search_graph, search = get_source_search(self, source_airport, 'layovers')
+        target = search_graph.node_id(destination_airport)
+        return search.search(target) and search.best[target] <= max_flights
+
+    def prepare_timetable(self, path=None):
+        """
+            Set the scheduled flights of the timetable queries, from a real timetable when one is supplied.
+
+            Args:
+                path (str): Optional timetable file (see Timetable.load) to read, or to save a timetable generated
+                            from the routes to if it is missing.
+
+            Returns:
+                Timetable: The timetable.
+        """
+        timetable = Timetable.load(path) if path is not None else None
+        if timetable is None:
+            timetable = Timetable.generate(self)
+            self.timetable_version = self.version
+            if path is not None:
+                timetable.save(path)
+        else:
+            self.timetable_version = None
+        self.timetable = timetable
+        return timetable
+
+    def get_timetable(self):
+        # Return the timetable, generating it from the routes if none was prepared or the routes changed since
+        if self.timetable is None or (self.timetable_version is not None and self.timetable_version != self.version):
+            self.timetable = Timetable.generate(self)
+            self.timetable_version = self.version
+        return self.timetable
+
+    def get_connection_scan(self):
+        timetable = self.get_timetable()
+        if self.connection_scan is None or self.connection_scan.timetable is not timetable:
+            self.connection_scan = ConnectionScan(timetable)
+        return self.connection_scan
+
+    def get_all_pairs_path(self, source_airport, destination_airport, weight_name, layover_time=0):
+        """
+            Look a path up in the all-pairs tables.
+
+            Returns:
+                tuple: Whether the tables answered the query, and the IATA codes along the path (None if the
+                       destination is unreachable).
+        """
+        tables = self.all_pairs
+        compiled = self.get_compiled()
+        if tables is None or tables.compiled is not compiled or not tables.supports(weight_name, layover_time):
+            return False, None
+        path = tables.path(compiled.index[source_airport], compiled.index[destination_airport], weight_name)
+        return True, compiled.path_to_iata(path) if path is not None else None
+
+    def get_great_circle_heuristics(self):
+        # Great-circle heuristics need the coordinate arrays of the compiled graph
+        compiled = self.get_compiled()
+        if compiled is None:
+            return None
+        if self.great_circle_heuristics is None or self.great_circle_heuristics.compiled is not compiled:
+            self.great_circle_heuristics = GreatCircleHeuristics(compiled)
+        return self.great_circle_heuristics
+
+    def get_compiled(self):
+        # Return the compiled graph in compiled mode, rebuilding it if the graph changed since it was built
+        if not self.compiled_mode:
+            return None
+        if self.compiled is None:
+            self.compiled = CompiledGraph.from_flight_graph(self)
+        return self.compiled
 
     def initialize_routes_to(self):
         routes_to = {}
@@ -67,6 +498,29 @@ class FlightGraph:
     def get_routes(self, airport):
         return self.airports[airport].routes
 
+    def get_search_graph(self):
+        # Graph the search algorithms run on: the compiled arrays in compiled mode, the airport objects otherwise
+        compiled = self.get_compiled()
+        return compiled if compiled is not None else self
+
+    def node_id(self, iata_code):
+        # Airports are identified by their IATA code in the object graph
+        return iata_code
+
+    def path_to_iata(self, path):
+        return path
+
+    def out_edges(self, airport, weight_name):
+        # Get (destination airport, weight) pairs of the routes from an airport
+        return [(route.destination_airport, route.get_weight(weight_name)) for route in self.airports[airport].routes]
+
+    def in_edges(self, airport, weight_name):
+        # Get (source airport, weight) pairs of the routes to an airport
+        return [(route.source_airport, route.get_weight(weight_name)) for route in self.get_routes_to(airport)]
+
+    def neighbors(self, airport):
+        return self.get_neighbors(airport)
+
     def get_neighbors(self, airport):
         # Get neighboring airports for a given airport
         if airport in self.airports:
@@ -79,13 +533,10 @@ class FlightGraph:
         if source_airport not in self.airports or destination_airport not in self.airports:
             return None
 
-        # Get routes for the source airport
-        source_routes = self.airports[source_airport].routes
-
-        # Iterate over routes to find a matching destination airport
-        for route in source_routes:
-            if route.destination_airport == destination_airport:
-                return route.get_weight('distance')
+        # Look up the route in the route index
+        route = self.route_index.get((source_airport, destination_airport))
+        if route is not None:
+            return route.get_weight('distance')
 
         # If no matching route is found, return None
         return None
@@ -106,13 +557,10 @@ class FlightGraph:
         if source_airport not in self.airports or destination_airport not in self.airports:
             return float('inf')
 
-        # Get routes for the source airport
-        source_routes = self.airports[source_airport].routes
-
-        # Iterate over routes to find a matching destination airport
-        for route in source_routes:
-            if route.destination_airport == destination_airport:
-                return route.get_weight('cost')
+        # Look up the route in the route index
+        route = self.route_index.get((source_airport, destination_airport))
+        if route is not None:
+            return route.get_weight('cost')
 
         # If no matching route is found, return infinite
         return float('inf')
@@ -122,13 +570,10 @@ class FlightGraph:
         if source_airport not in self.airports or destination_airport not in self.airports:
             return float('inf')
 
-        # Get routes for the source airport
-        source_routes = self.airports[source_airport].routes
-
-        # Iterate over routes to find a matching destination airport
-        for route in source_routes:
-            if route.destination_airport == destination_airport:
-                return route.get_weight('duration')
+        # Look up the route in the route index
+        route = self.route_index.get((source_airport, destination_airport))
+        if route is not None:
+            return route.get_weight('duration')
 
         # If no matching route is found, return infinite
         return float('inf')
@@ -190,21 +635,94 @@ class FlightGraph:
             "total_layover_time": total_layover_time
         }
 
+    def get_spatial_index(self):
+        # Return the spatial index of the airports, rebuilding it if the graph changed since it was built
+        if self.spatial_index is None or self.spatial_index_version != self.version:
+            self.spatial_index = SpatialIndex.from_flight_graph(self)
+            self.spatial_index_version = self.version
+        return self.spatial_index
+
     def find_nearest_airport(self, destination_airport):
         # Find the nearest airport to the destination
-        nearest_distance = float('inf')
-        nearest_airport = None
+        nearest_airports = self.find_nearest_airports(destination_airport, 1)
+        return nearest_airports[0][0] if nearest_airports else None
+
+    def find_nearest_airports(self, airport, k):
+        """
+            Find the airports closest to an airport by great-circle distance.
+
+            Args:
+                airport (str): The IATA code of the airport.
+                k (int): The number of airports to find.
+
+            Returns:
+                list: (IATA code, distance in km) pairs of the closest other airports, closest first. Empty if
+                      the airport is unknown or has no coordinates.
+        """
+        spatial_index = self.get_spatial_index()
+        if airport not in spatial_index.index:
+            return []
+        latitude, longitude = spatial_index.coordinates[spatial_index.index[airport]]
+        return spatial_index.nearest(latitude, longitude, k, exclude=(airport,))
+
+    def find_airports_within_radius(self, airport, radius):
+        """
+            Find the airports within a great-circle distance of an airport.
+
+            Args:
+                airport (str): The IATA code of the airport.
+                radius (float): The largest distance in km.
+
+            Returns:
+                list: (IATA code, distance in km) pairs of the other airports found, closest first.
+        """
+        spatial_index = self.get_spatial_index()
+        if airport not in spatial_index.index:
+            return []
+        latitude, longitude = spatial_index.coordinates[spatial_index.index[airport]]
+        return [(code, distance) for code, distance in spatial_index.within_radius(latitude, longitude, radius)
+                if code != airport]
+
+    def find_airports_in_bounds(self, south, west, north, east):
+        """
+            Find the airports inside a latitude/longitude box, such as the current viewport of the map.
+
+            Args:
+                south (float): The southern edge in degrees.
+                west (float): The western edge in degrees.
+                north (float): The northern edge in degrees.
+                east (float): The eastern edge in degrees.
+
+            Returns:
+                list of str: IATA codes of the airports inside the box.
+        """
+        return self.get_spatial_index().within_bounds(south, west, north, east)
 
-        for airport in self.airports:
-            if airport != destination_airport:
-                distance = self.calculate_distance(airport, destination_airport)
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_airport = airport
+    def find_reroute_alternatives(self, source_airport, destination_airport, criteria, k=REROUTE_CANDIDATES):
+        """
+            Find the airports nearest to a destination that the source reaches, with their best route for a
+            criteria, such as alternatives to a destination that cannot be reached. They are ranked by distance
+            from the destination, the weight of the route only breaking ties.
 
-        return nearest_airport
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                criteria (str): The find_route criteria, other than 'optimal'.
+                k (int): The number of airports nearest to the destination to consider.
 
-    def find_route(self, source_airport, destination_airport, criteria, intermediate_airports=None):
+            Returns:
+                list of dict: The reachable alternatives, nearest first, each with the airport, its distance from the
+                              destination in km, the weight of the best path to it and the IATA codes along that path.
+        """
+        if source_airport not in self.airports or destination_airport not in self.airports:
+            raise ValueError(f"Invalid airports: '{source_airport}', '{destination_airport}'")
+        if criteria not in CRITERIA_WEIGHTS:
+            raise ValueError("Invalid criteria selected.")
+        weight_name, layover_time = CRITERIA_WEIGHTS[criteria]
+        return find_reroute_alternatives(self, source_airport, destination_airport, weight_name, layover_time, k)
+
+    def find_route(self, source_airport, destination_airport, criteria, intermediate_airports=None,
+                   optimise_order=False):
         try:
             if source_airport not in self.airports:
                 raise ValueError(f"Invalid source airport: '{source_airport}'")
@@ -215,45 +733,300 @@ class FlightGraph:
 
             if intermediate_airports is None:
                 intermediate_airports = []
+            for airport in intermediate_airports:
+                if airport not in self.airports:
+                    raise ValueError(f"Invalid intermediate airport: '{airport}'")
 
-            # Check if multi-city flight is required based on the given criteria
-            if criteria in ["optimal", "shortest distance", "least cost", "shortest duration", "least layovers"] \
-                    and intermediate_airports:
-                # Handle multi-city flights
-                if criteria == "optimal":
-                    return self.astar.find_optimal_flight_multi(source_airport, destination_airport,
-                                                                intermediate_airports)
-                elif criteria == "shortest distance":
-                    return self.dijkstra.find_shortest_distance_multi(source_airport,
-                                                                      destination_airport, intermediate_airports)
-                elif criteria == "least cost":
-                    return self.dijkstra.find_least_cost_multi(source_airport, destination_airport,
-                                                               intermediate_airports)
-                elif criteria == "shortest duration":
-                    return self.dijkstra.find_shortest_duration_multi(source_airport, destination_airport,
-                                                                      intermediate_airports)
-                elif criteria == "least layovers":
-                    return self.bfs.find_least_layovers_multi(source_airport, destination_airport,
-                                                              intermediate_airports)
-            else:
-                # Handle single-city flights
-                if criteria == "optimal":
-                    return self.astar.find_optimal_flight(source_airport, destination_airport)
-                elif criteria == "shortest distance":
-                    return self.dijkstra.find_shortest_distance(source_airport, destination_airport)
-                elif criteria == "least cost":
-                    return self.dijkstra.find_least_cost(source_airport, destination_airport)
-                elif criteria == "shortest duration":
-                    return self.dijkstra.find_shortest_duration(source_airport, destination_airport)
-                elif criteria == "least layovers":
-                    return self.bfs.find_least_layovers(source_airport, destination_airport)
+            # Visit the intermediate airports in the order that is best for the criteria instead of as given
+            if optimise_order:
+                intermediate_airports = order_stops(self, source_airport, destination_airport, intermediate_airports,
+                                                    criteria)
+
+            # Answer repeated queries from the route cache while the graph is unchanged
+            key = (source_airport, destination_airport, criteria, tuple(intermediate_airports))
+            found, route = self.route_cache.get(key, self.version)
+            if not found:
+                route = self.search_route(source_airport, destination_airport, criteria, intermediate_airports)
+                if self.is_complete_route(route, destination_airport):
+                    self.route_cache.put(key, self.version, route)
+            return route
         except ValueError as e:
             print("Input Validation error:", e)
             return None
 
+    def is_complete_route(self, route, destination_airport):
+        # Whether a route reaches the destination without a rerouted leg. Only complete routes are cached, so the
+        # messages about missing flights and rerouting are printed again on every query.
+        if route is None or route["path"][-1] != destination_airport:
+            return False
+        path = route["path"]
+        return all(self.get_route(current, following) is not None for current, following in zip(path, path[1:]))
+
+    def find_routes(self, source_airport, destination_airport, criteria_list, intermediate_airports=None,
+                    optimise_order=False):
+        """
+            Find the routes of several criteria between two airports.
+
+            Every criteria is searched on its own with find_route. Selecting them from one Pareto front (see
+            find_pareto_routes) was measured to be no faster even for all four criteria it covers, and several
+            times slower for a single criteria or on the object graph.
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                criteria_list (list of str): The criteria to find routes for.
+                intermediate_airports (list of str): Optional airports to stop at on the way.
+                optimise_order (bool): Visit the intermediate airports in the best order for each criteria.
+
+            Returns:
+                dict: Criteria -> route information (None if no route was found).
+        """
+        return {criteria: self.find_route(source_airport, destination_airport, criteria, intermediate_airports,
+                                          optimise_order)
+                for criteria in criteria_list}
+
+    def find_pareto_routes(self, source_airport, destination_airport):
+        """
+            Find every Pareto-optimal route between two airports over distance, cost, duration and layovers, the
+            routes no other route beats on all four. Each of the shortest distance, least cost, shortest duration
+            and least layovers routes is one of them (see select_route).
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+
+            Returns:
+                list of dict: The route information of every route on the front (see get_route_information), empty
+                              if the destination is unreachable.
+        """
+        if source_airport not in self.airports:
+            raise ValueError(f"Invalid source airport: '{source_airport}'")
+        if destination_airport not in self.airports:
+            raise ValueError(f"Invalid destination airport: '{destination_airport}'")
+        return [self.get_route_information(path) for _, path in find_pareto_routes(self, source_airport,
+                                                                                   destination_airport)]
+
+    def find_routes_batch(self, queries, processes=None):
+        """
+            Answer many route queries at once, grouped by source airport and spread over worker processes.
+
+            Args:
+                queries (iterable): The queries, each (source, destination, criteria) or
+                                    (source, destination, criteria, intermediate airports[, optimise order]).
+                processes (int): The number of worker processes, defaults to the number of CPUs.
+
+            Returns:
+                generator: The result of find_route for every query, in input order.
+        """
+        return find_routes_batch(self, queries, processes)
+
+    def find_alternative_routes(self, source_airport, destination_airport, criteria, k=None):
+        """
+            Find the best alternative routes between two airports for a criteria, best first.
+
+            The routes are the loopless paths in order of the weight of the criteria (Yen's algorithm). They are
+            computed lazily, so the first route is available immediately and every next one is only computed when
+            asked for.
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                criteria (str): 'shortest distance', 'least cost' or 'shortest duration'.
+                k (int): The largest number of routes, or None for every route.
+
+            Returns:
+                generator: The route information of every route (see get_route_information).
+        """
+        if source_airport not in self.airports:
+            raise ValueError(f"Invalid source airport: '{source_airport}'")
+        if destination_airport not in self.airports:
+            raise ValueError(f"Invalid destination airport: '{destination_airport}'")
+        if criteria not in CRITERIA_WEIGHTS or criteria == "least layovers":
+            raise ValueError("Invalid criteria selected.")
+
+        weight_name, layover_time = CRITERIA_WEIGHTS[criteria]
+        paths = find_k_shortest_paths(self, source_airport, destination_airport, weight_name, layover_time)
+        return (self.get_route_information(path) for _, path in islice(paths, k))
+
+    def find_constrained_routes(self, source_airport, criteria, max_stops=None, budgets=None):
+        """
+            Find the best route for a criteria from a source to every airport within a number of stops and budgets
+            on other weights, such as the cheapest routes with at most 2 stops or the fastest routes under 300 cost.
+
+            One run from the source answers every destination: a hop-limited Bellman-Ford on the compiled graph
+            when only the stops are limited, a budget label-setting search otherwise.
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                criteria (str): The find_route criteria to optimise, other than 'optimal'.
+                max_stops (int): The largest number of stops (connections) of a route, or None for no limit.
+                budgets (dict): The largest total 'distance', 'cost' or 'duration' (with the layovers) of a route,
+                                such as {'cost': 300}.
+
+            Returns:
+                dict: Destination IATA code -> route information (see get_route_information) of the best route
+                      within the constraints, for every airport that has one.
+        """
+        weight_name, layover_time, max_flights = self.validate_constraints(source_airport, criteria, max_stops,
+                                                                           budgets)
+        paths = find_constrained_paths(self, source_airport, weight_name, layover_time, max_flights, budgets)
+        return {destination: self.get_route_information(path) for destination, (_, path) in paths.items()}
+
+    def find_constrained_route(self, source_airport, destination_airport, criteria, max_stops=None, budgets=None):
+        """
+            Find the best route for a criteria between two airports within a number of stops and budgets on other
+            weights (see find_constrained_routes).
+
+            Returns:
+                dict or None: The route information of the best route within the constraints, or None if there is
+                              none.
+        """
+        if destination_airport not in self.airports:
+            raise ValueError(f"Invalid destination airport: '{destination_airport}'")
+        weight_name, layover_time, max_flights = self.validate_constraints(source_airport, criteria, max_stops,
+                                                                           budgets)
+        paths = find_constrained_paths(self, source_airport, weight_name, layover_time, max_flights, budgets)
+        if destination_airport not in paths:
+            return None
+        return self.get_route_information(paths[destination_airport][1])
+
+    def validate_constraints(self, source_airport, criteria, max_stops, budgets):
+        # Check a constrained route query, returning the weight, layover time and largest number of flights
+        if source_airport not in self.airports:
+            raise ValueError(f"Invalid source airport: '{source_airport}'")
+        if criteria not in CRITERIA_WEIGHTS:
+            raise ValueError("Invalid criteria selected.")
+        if max_stops is not None and (not isinstance(max_stops, int) or max_stops < 0):
+            raise ValueError(f"Invalid number of stops: {max_stops}")
+        for weight_name, limit in (budgets or {}).items():
+            if weight_name not in BUDGET_LAYOVER_TIMES:
+                raise ValueError(f"Invalid budget: '{weight_name}'")
+            if limit < 0:
+                raise ValueError(f"Invalid {weight_name} budget: {limit}")
+        weight_name, layover_time = CRITERIA_WEIGHTS[criteria]
+        return weight_name, layover_time, max_stops + 1 if max_stops is not None else None
+
+    def find_earliest_arrival(self, source_airport, destination_airport, departure_time):
+        """
+            Find the scheduled journey that arrives first when leaving at or after a time, such as the earliest
+            arrival when leaving at 09:00.
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                departure_time (str or int): The earliest departure, 'HH:MM', 'HH:MM+D' or minutes since 00:00 of
+                                             the first day of the timetable.
+
+            Returns:
+                dict or None: The journey information (see Timetable.get_journey_information), or None if the
+                              destination cannot be reached within the timetable.
+        """
+        self.validate_journey_airports(source_airport, destination_airport)
+        departure_time = parse_time(departure_time)
+        timetable = self.get_timetable()
+        if source_airport == destination_airport or source_airport not in timetable.index \
+                or destination_airport not in timetable.index:
+            return None
+        journey = self.get_connection_scan().earliest_arrival(timetable.index[source_airport],
+                                                              timetable.index[destination_airport], departure_time)
+        return timetable.get_journey_information(journey) if journey is not None else None
+
+    def find_departure_profile(self, source_airport, destination_airport, earliest_departure=0,
+                               latest_departure=None):
+        """
+            Find the best scheduled journeys between two airports for every departure time in a range.
+
+            Args:
+                source_airport (str): The IATA code of the source airport.
+                destination_airport (str): The IATA code of the destination airport.
+                earliest_departure (str or int): The earliest departure, as for find_earliest_arrival.
+                latest_departure (str or int): The latest departure, or None for the end of the timetable.
+
+            Returns:
+                list of dict: The journey information of every journey that no other journey leaves later than
+                              and arrives earlier than, earliest departure first.
+        """
+        self.validate_journey_airports(source_airport, destination_airport)
+        earliest_departure = parse_time(earliest_departure)
+        latest_departure = parse_time(latest_departure) if latest_departure is not None else None
+        timetable = self.get_timetable()
+        if source_airport == destination_airport or source_airport not in timetable.index \
+                or destination_airport not in timetable.index:
+            return []
+        journeys = self.get_connection_scan().profile(timetable.index[source_airport],
+                                                      timetable.index[destination_airport], earliest_departure,
+                                                      latest_departure)
+        return [timetable.get_journey_information(journey) for journey in journeys]
+
+    def validate_journey_airports(self, source_airport, destination_airport):
+        if source_airport not in self.airports:
+            raise ValueError(f"Invalid source airport: '{source_airport}'")
+        if destination_airport not in self.airports:
+            raise ValueError(f"Invalid destination airport: '{destination_airport}'")
+
+    def search_route(self, source_airport, destination_airport, criteria, intermediate_airports):
+        # Check if multi-city flight is required based on the given criteria
+        if criteria in ["optimal", "shortest distance", "least cost", "shortest duration", "least layovers"] \
+                and intermediate_airports:
+            # Handle multi-city flights
+            if criteria == "optimal":
+                return self.astar.find_optimal_flight_multi(source_airport, destination_airport,
+                                                            intermediate_airports)
+            elif criteria == "shortest distance":
+                return self.dijkstra.find_shortest_distance_multi(source_airport,
+                                                                  destination_airport, intermediate_airports)
+            elif criteria == "least cost":
+                return self.dijkstra.find_least_cost_multi(source_airport, destination_airport,
+                                                           intermediate_airports)
+            elif criteria == "shortest duration":
+                return self.dijkstra.find_shortest_duration_multi(source_airport, destination_airport,
+                                                                  intermediate_airports)
+            elif criteria == "least layovers":
+                return self.bfs.find_least_layovers_multi(source_airport, destination_airport,
+                                                          intermediate_airports)
+        else:
+            # Handle single-city flights
+            if criteria == "optimal":
+                return self.astar.find_optimal_flight(source_airport, destination_airport)
+            elif criteria == "shortest distance":
+                return self.dijkstra.find_shortest_distance(source_airport, destination_airport)
+            elif criteria == "least cost":
+                return self.dijkstra.find_least_cost(source_airport, destination_airport)
+            elif criteria == "shortest duration":
+                return self.dijkstra.find_shortest_duration(source_airport, destination_airport)
+            elif criteria == "least layovers":
+                return self.bfs.find_least_layovers(source_airport, destination_airport)
+
+
+def get_graph(dataset='europe'):
+    """
+        Get the shared graph of a dataset, building it on first use.
+
+        Args:
+            dataset (str): The name of the dataset, one of the keys of DATASETS.
+
+        Returns:
+            FlightGraph: The compiled graph of the dataset, with its reachability index so unreachable
+                         destinations are ruled out before searching.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: '{dataset}'")
+
+    with graph_registry_lock:
+        if dataset not in graph_registry:
+            airports_file, flights_file = DATASETS[dataset]
+            graph = FlightGraph(os.path.join(DATA_DIRECTORY, airports_file),
+                                os.path.join(DATA_DIRECTORY, flights_file),
+                                compiled=True, snapshot_dir=SNAPSHOT_DIRECTORY)
+            # Kept next to the snapshot and rebuilt when it was built for different data
+            graph.prepare_reachability(os.path.join(SNAPSHOT_DIRECTORY, f"{dataset}-reachability.npz"))
+            graph_registry[dataset] = graph
+        return graph_registry[dataset]
+
 
-# test
-graph = FlightGraph("data/europe_airports.csv", "data/europe_flight_dataset.csv")
-# print(graph.find_route("LHR", "CRV", "optimal", ['AMS']))
-# print(graph.find_route("LHR", "CRV", "least layovers", ['AMS']))
-# print(graph.find_route("LHR", "CRV", "shortest distance", ['AMS']))
+if __name__ == "__main__":
+    # test
+    graph = get_graph("europe")
+    print(graph.find_route("LHR", "CRV", "optimal", ['AMS']))
+    # print(graph.find_route("LHR", "CRV", "least layovers", ['AMS']))
+    # print(graph.find_route("LHR", "CRV", "shortest distance", ['AMS']))
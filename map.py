@@ -1,5 +1,6 @@
 import sys
-from PyQt5.QtCore import Qt
+import threading
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -24,14 +25,69 @@ import re
 import folium.plugins
 
 
+# Map colour and message label of the route of every criteria
+ROUTE_STYLES = {
+    "optimal": ("red", "Optimal"),
+    "shortest distance": ("orange", "Shortest"),
+    "least cost": ("purple", "Cheapest"),
+    "shortest duration": ("green", "Shortest Duration"),
+    "least layovers": ("blue", "Least Layover"),
+}
+
+
+class RouteSearchSignals(QObject):
+    # Emitted with the search generation, the criteria and the route found (None if there is no route)
+    finished = pyqtSignal(int, str, object)
+
+
+class RouteSearchWorker(QRunnable):
+    """
+        Searches the routes of the ticked criteria one after the other on the background search thread, so the
+        window stays responsive, and sends every route back to the GUI thread through its finished signal
+    """
+
+    def __init__(self, graph, generation, cancelled, criteria_list, source_iata, destination_iata,
+                 intermediate_iata, optimise_order=False):
+        """
+            Args:
+                graph (FlightGraph): The flight graph to search
+                generation (int): The search generation of the inputs
+                cancelled (threading.Event): Set when the inputs change and the search is no longer needed
+                criteria_list (list): The criteria to find routes for, in drawing order
+                source_iata (str): The source IATA code
+                destination_iata (str): The destination IATA code
+                intermediate_iata (list): The IATA codes of the stops, None if there are none
+                optimise_order (bool): Visit the stops in the best order for the criteria instead of as entered
+        """
+        super().__init__()
+        self.graph = graph
+        self.generation = generation
+        self.cancelled = cancelled
+        self.criteria_list = criteria_list
+        self.source_iata = source_iata
+        self.destination_iata = destination_iata
+        self.intermediate_iata = intermediate_iata
+        self.optimise_order = optimise_order
+        self.signals = RouteSearchSignals()
+
+    def run(self):
+        # The search stops between criteria once cancelled
+        for criteria in self.criteria_list:
+            if self.cancelled.is_set():
+                return
+            route = self.graph.find_route(
+                self.source_iata, self.destination_iata, criteria, self.intermediate_iata, self.optimise_order
+            )
+            if not self.cancelled.is_set():
+                self.signals.finished.emit(self.generation, criteria, route)
+
+
 class MapWindow(QMainWindow):
 
     def __init__(self):
 
         super().__init__()
-        self.AirportGraph = flight_graph.FlightGraph(
-            "data/europe_airports.csv", "data/europe_flight_dataset.csv"
-        )
+        self.AirportGraph = flight_graph.get_graph("europe")
         self.setWindowTitle("Airport Locator")
         self.setGeometry(100, 100, 1920, 1080)
 
@@ -42,13 +98,21 @@ class MapWindow(QMainWindow):
         self.source_airport_data = []
         self.destination_airport_data = []
 
-        # Data for maximum flights
+        # Data for maximum flights, the stops can be visited in their best order so more than two are practical
         self.nums_of_flight_added = 0
-        self.max_no_of_flight = 2
+        self.max_no_of_flight = 8
 
         # List to store newly added flight field layouts
         self.flight_fields = []
 
+        # Background route searches: a single search thread, as the search and route caches of the graph are not
+        # thread-safe, and the generation and cancellation flag of the current inputs
+        self.search_pool = QThreadPool()
+        self.search_pool.setMaxThreadCount(1)
+        self.search_generation = 0
+        self.search_cancelled = threading.Event()
+        self.pending_criteria = set()
+
         # Create input field and button
         self.source_country_input_label = QLabel("Source Country:")
         self.source_airport_input_label = QLabel("Source Airport:")
@@ -127,6 +191,14 @@ class MapWindow(QMainWindow):
         self.cheapest_checkbox = QCheckBox("Cheapest Cost")
         self.shortest_dur_checkbox = QCheckBox("Shortest Duration")
         self.least_layover_checkbox = QCheckBox("Least Layover")
+        self.best_order_checkbox = QCheckBox("Best Stop Order")
+
+        # Cancel the searches in progress whenever the inputs change
+        for input_widget in (self.source_airport_dropdown, self.destination_airport_dropdown):
+            input_widget.currentIndexChanged.connect(self.cancel_search)
+        for checkbox in (self.optimal_checkbox, self.shortest_dist_checkbox, self.cheapest_checkbox,
+                         self.shortest_dur_checkbox, self.least_layover_checkbox, self.best_order_checkbox):
+            checkbox.stateChanged.connect(self.cancel_search)
 
         # Create layout for checkboxes
         checkbox_layout = QVBoxLayout()
@@ -139,6 +211,8 @@ class MapWindow(QMainWindow):
         checkbox_layout.addWidget(self.shortest_dur_checkbox)  # shortest duration
         checkbox_layout.addSpacing(10)
         checkbox_layout.addWidget(self.least_layover_checkbox)  # least layover
+        checkbox_layout.addSpacing(10)
+        checkbox_layout.addWidget(self.best_order_checkbox)  # reorder the stops
         checkbox_layout.setAlignment(Qt.AlignHCenter)
         checkbox_layout.setContentsMargins(0, 20, 0, 20)
 
@@ -237,6 +311,7 @@ class MapWindow(QMainWindow):
                 new_destination_country_dropdown, new_destination_airport_dropdown
             )
         )
+        new_destination_airport_dropdown.currentIndexChanged.connect(self.cancel_search)
 
         # Create layouts for new flight fields
 
@@ -274,7 +349,7 @@ class MapWindow(QMainWindow):
             QMessageBox.information(
                 self,
                 "Maximum Limit Reached",
-                "You can only add a maximum of 3 source-destination pairs.",
+                f"You can only add a maximum of {self.max_no_of_flight} stops.",
             )
 
     def remove_last_flight(self, input_layout):
@@ -298,6 +373,7 @@ class MapWindow(QMainWindow):
             # Update number of flights and remove layout from flight_fields list
             self.nums_of_flight_added -= 1
             del self.flight_fields[-1]
+            self.cancel_search()
 
         else:
             QMessageBox.information(
@@ -511,93 +587,71 @@ class MapWindow(QMainWindow):
                 QMessageBox.information(self, "Invalid Route Path", "One or more locations are the same")
                 return
 
-        airport_graph = self.AirportGraph
-        airport_map = folium.Map(
+        # Cancel the searches of the previous inputs before starting new ones
+        self.cancel_search()
+        self.airport_map = folium.Map(
             location=[50.170824, 15.087472], zoom_start=4, tiles="cartodb positron"
         )
-        node_airport = airport_graph.airports
-        message_information = []
+        self.search_source, self.search_destination = source_iata, destination_iata
+        self.message_information = []
+
+        # Search the route of every ticked criteria in the background and draw each one as soon as it is found
+        criteria_checkboxes = {
+            "optimal": self.optimal_checkbox,
+            "shortest distance": self.shortest_dist_checkbox,
+            "least cost": self.cheapest_checkbox,
+            "shortest duration": self.shortest_dur_checkbox,
+            "least layovers": self.least_layover_checkbox,
+        }
+        criteria_list = [criteria for criteria, checkbox in criteria_checkboxes.items() if checkbox.isChecked()]
+        worker = RouteSearchWorker(
+            self.AirportGraph, self.search_generation, self.search_cancelled, criteria_list, source_iata,
+            destination_iata, intermediate_iata, self.best_order_checkbox.isChecked()
+        )
+        worker.signals.finished.connect(self.draw_route)
+        self.pending_criteria = set(criteria_list)
+        self.search_pool.start(worker)
 
-        # Optimal Path
-        if self.optimal_checkbox.isChecked():
-            optimal_path = airport_graph.find_route(
-                source_iata, destination_iata, "optimal", intermediate_iata
-            )
-            if optimal_path:
-                self.create_paths(
-                    optimal_path, node_airport, airport_map, destination_iata, "red"
-                )
-            else:
-                message_information.append(f"Optimal: No Flight Routes Available from {source_iata} to {destination_iata}")
-    
-        # Shortest Distance Path
-        if self.shortest_dist_checkbox.isChecked():
-            shortest_path = airport_graph.find_route(
-                source_iata, destination_iata, "shortest distance", intermediate_iata
-            )
-            if shortest_path:
-                self.create_paths(
-                    shortest_path, node_airport, airport_map, destination_iata, "orange"
-                )
-            else:
-                message_information.append(f"Shortest: No Flight Routes Available from {source_iata} to {destination_iata}")
-            
+    def cancel_search(self):
+        """
+            Cancel the route searches of the previous inputs, called whenever the user changes the inputs.
+            A queued search is removed and a running search stops before its next criteria, the route it is
+            searching being discarded.
+        """
+        self.search_pool.clear()
+        self.search_cancelled.set()
+        self.search_cancelled = threading.Event()
+        self.search_generation += 1
+        self.pending_criteria = set()
 
-        # Cheapest Path
-        if self.cheapest_checkbox.isChecked():
-            cheapest_path = airport_graph.find_route(
-                source_iata, destination_iata, "least cost", intermediate_iata
-            )
-            if cheapest_path:
-                self.create_paths(
-                    cheapest_path, node_airport, airport_map, destination_iata, "purple"
-                )
-            else:
-                message_information.append(f"Cheapest: No Flight Routes Available from {source_iata} to {destination_iata}")
-            
-        # Shortest Duration Path
-        if self.shortest_dur_checkbox.isChecked():
-            shortest_dur_path = airport_graph.find_route(
-                source_iata, destination_iata, "shortest duration", intermediate_iata
-            )
-            if shortest_dur_path:
-                self.create_paths(
-                    shortest_dur_path,
-                    node_airport,
-                    airport_map,
-                    destination_iata,
-                    "green",
-                )
-            else:
-                message_information.append(f"Shortest Duration: No Flight Routes Available from {source_iata} to {destination_iata}")
-            
-        # Least Layovers Path
-        if self.least_layover_checkbox.isChecked():
-            least_layover_path = airport_graph.find_route(
-                source_iata, destination_iata, "least layovers", intermediate_iata
-            )
-            if least_layover_path:
-                self.create_paths(
-                    least_layover_path,
-                    node_airport,
-                    airport_map,
-                    destination_iata,
-                    "blue",
-                )
-            else:
-                message_information.append(f"Least Layover: No Flight Routes Available from {source_iata} to {destination_iata}")
+    def draw_route(self, generation, criteria, route):
+        """
+            Draw the route found by a background search on the map, runs on the GUI thread
 
-        messageString = ""        
-        if message_information is not None:
-            for message in message_information:
-                messageString += message + "\n"
-                
-        if messageString != "":
-            QMessageBox.information(self,"No Flightes Routes Available",messageString)
+            Args:
+                generation (int): The search generation the route belongs to
+                criteria (str): The criteria of the route
+                route (dict): The route found, None if there is no route
+        """
+        # Ignore routes of inputs that have changed since the search started
+        if generation != self.search_generation:
+            return
+        self.pending_criteria.discard(criteria)
 
-        airport_map.save("airport_map.html")
+        color, label = ROUTE_STYLES[criteria]
+        if route:
+            self.create_paths(route, self.AirportGraph.airports, self.airport_map, self.search_destination, color)
+        else:
+            self.message_information.append(
+                f"{label}: No Flight Routes Available from {self.search_source} to {self.search_destination}"
+            )
+        self.airport_map.save("airport_map.html")
         self.web_view.setHtml(open("airport_map.html").read())
 
+        # Report the criteria without routes once every search has finished
+        if not self.pending_criteria and self.message_information:
+            messageString = "\n".join(self.message_information) + "\n"
+            QMessageBox.information(self, "No Flightes Routes Available", messageString)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -14,3 +14,4 @@ class AirportNode:
     def add_route_edge(self, destination_airport, weights):
         route_edge = RouteEdge(self.iata_code, destination_airport, weights)
         self.routes.append(route_edge)
+        return route_edge
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+WEIGHT_NAMES = ('distance', 'cost', 'duration')
+
+# Snapshot file layout: magic, 8-byte header length, JSON header, then the arrays aligned to 8 bytes
+SNAPSHOT_MAGIC = b'FGSNAP01'
+SNAPSHOT_ARRAYS = ('latitude', 'longitude', 'offsets', 'targets', 'distance', 'cost', 'duration',
+                   'reverse_offsets', 'reverse_sources', 'reverse_edges')
+
+
+class CompiledGraph:
+    """
+        Array-backed snapshot of a FlightGraph stored in compressed sparse row (CSR) form.
+
+        Airports are given integer ids in insertion order. The outgoing routes of airport ``i`` are the
+        edges ``offsets[i]`` to ``offsets[i + 1] - 1``; ``targets`` holds the destination id of each edge and
+        ``distance``, ``cost`` and ``duration`` hold the edge weights in parallel typed arrays. The incoming
+        routes (the ``routes_to`` index) are kept in the same form in ``reverse_offsets``, ``reverse_sources``
+        and ``reverse_edges``, the latter pointing back into the forward edge arrays.
+    """
+
+    def __init__(self, iata_codes, latitude, longitude, offsets, targets, distance, cost, duration,
+                 reverse_index=None):
+        self.fingerprint_hash = None
+        self.iata_codes = list(iata_codes)  # Airport id -> IATA code
+        self.index = {code: i for i, code in enumerate(self.iata_codes)}  # IATA code -> airport id
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.weights = {
+            'distance': np.asarray(distance, dtype=np.float64),
+            'cost': np.asarray(cost, dtype=np.float64),
+            'duration': np.asarray(duration, dtype=np.float64),
+        }
+        if reverse_index is None:
+            self.build_reverse_index()
+        else:
+            self.reverse_offsets, self.reverse_sources, self.reverse_edges = reverse_index
+
+    @classmethod
+    def from_flight_graph(cls, graph):
+        """
+            Compile the object graph of a FlightGraph into CSR arrays.
+
+            Args:
+                graph (FlightGraph): The graph to compile.
+
+            Returns:
+                CompiledGraph: The compiled graph.
+        """
+        iata_codes = list(graph.airports)
+        index = {code: i for i, code in enumerate(iata_codes)}
+        node_count = len(iata_codes)
+
+        latitude = np.empty(node_count, dtype=np.float64)
+        longitude = np.empty(node_count, dtype=np.float64)
+        offsets = np.zeros(node_count + 1, dtype=np.int64)
+        targets, distance, cost, duration = [], [], [], []
+
+        for i, code in enumerate(iata_codes):
+            airport = graph.airports[code]
+            latitude[i] = airport.latitude
+            longitude[i] = airport.longitude
+            for route in airport.routes:
+                targets.append(index[route.destination_airport])
+                distance.append(route.get_weight('distance'))
+                cost.append(route.get_weight('cost'))
+                duration.append(route.get_weight('duration'))
+            offsets[i + 1] = len(targets)
+
+        return cls(iata_codes, latitude, longitude, offsets, targets, distance, cost, duration)
+
+    def build_reverse_index(self):
+        # Sort edge ids by destination to group the incoming edges of every airport together
+        sources = self.edge_sources()
+        order = np.argsort(self.targets, kind='stable')
+        self.reverse_edges = order.astype(np.int64)
+        self.reverse_sources = sources[order]
+        self.reverse_offsets = np.zeros(self.node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.targets, minlength=self.node_count), out=self.reverse_offsets[1:])
+
+    @property
+    def node_count(self):
+        return len(self.iata_codes)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def node_id(self, iata_code):
+        return self.index[iata_code]
+
+    def out_edges(self, node, weight_name):
+        """
+            Get the outgoing edges of an airport.
+
+            Args:
+                node (int): The airport id.
+                weight_name (str): The weight to return for each edge ('distance', 'cost' or 'duration').
+
+            Returns:
+                zip: Pairs of (destination id, weight) as plain Python numbers.
+        """
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return zip(self.targets[start:end].tolist(), self.weights[weight_name][start:end].tolist())
+
+    def in_edges(self, node, weight_name):
+        """
+            Get the incoming edges of an airport.
+
+            Args:
+                node (int): The airport id.
+                weight_name (str): The weight to return for each edge ('distance', 'cost' or 'duration').
+
+            Returns:
+                zip: Pairs of (source id, weight) as plain Python numbers.
+        """
+        start, end = self.reverse_offsets[node], self.reverse_offsets[node + 1]
+        edges = self.reverse_edges[start:end]
+        return zip(self.reverse_sources[start:end].tolist(), self.weights[weight_name][edges].tolist())
+
+    def out_degree(self, node):
+        return int(self.offsets[node + 1] - self.offsets[node])
+
+    def in_degree(self, node):
+        return int(self.reverse_offsets[node + 1] - self.reverse_offsets[node])
+
+    def neighbors(self, node):
+        return self.targets[self.offsets[node]:self.offsets[node + 1]].tolist()
+
+    def path_to_iata(self, path):
+        return [self.iata_codes[node] for node in path]
+
+    def nbytes(self):
+        # Memory held by the typed arrays (excluding the IATA code table)
+        arrays = [self.latitude, self.longitude, self.offsets, self.targets, self.reverse_offsets,
+                  self.reverse_sources, self.reverse_edges] + list(self.weights.values())
+        return sum(array.nbytes for array in arrays)
+
+    def fingerprint(self):
+        # Content hash of the airports, routes and weights, used to match preprocessed data to this graph
+        if self.fingerprint_hash is None:
+            content_hash = hashlib.sha256('\n'.join(self.iata_codes).encode('utf-8'))
+            for array in (self.offsets, self.targets, self.weights['distance'], self.weights['cost'],
+                          self.weights['duration']):
+                content_hash.update(np.ascontiguousarray(array).tobytes())
+            self.fingerprint_hash = content_hash.hexdigest()
+        return self.fingerprint_hash
+
+    def edge_sources(self):
+        # Source airport id of every edge
+        return np.repeat(np.arange(self.node_count, dtype=np.int32), np.diff(self.offsets))
+
+    def snapshot_arrays(self):
+        return {
+            'latitude': self.latitude, 'longitude': self.longitude, 'offsets': self.offsets,
+            'targets': self.targets, 'distance': self.weights['distance'], 'cost': self.weights['cost'],
+            'duration': self.weights['duration'], 'reverse_offsets': self.reverse_offsets,
+            'reverse_sources': self.reverse_sources, 'reverse_edges': self.reverse_edges,
+        }
+
+    def save_snapshot(self, path, source_hash, airports):
+        """
+            Write the compiled graph to a binary snapshot file.
+
+            Args:
+                path (str): The snapshot file to write.
+                source_hash (str): Content hash of the source files the graph was loaded from.
+                airports (dict): The AirportNode objects of the graph, used to store the node table.
+        """
+        arrays = self.snapshot_arrays()
+        layout = {}
+        offset = 0
+        for name in SNAPSHOT_ARRAYS:
+            array = np.ascontiguousarray(arrays[name])
+            layout[name] = [array.dtype.str, offset, len(array)]
+            offset += (array.nbytes + 7) // 8 * 8
+
+        header = json.dumps({
+            'source_hash': source_hash,
+            'arrays': layout,
+            'nodes': [[code, airports[code].name, airports[code].city, airports[code].country]
+                      for code in self.iata_codes],
+        }).encode('utf-8')
+        header += b' ' * (-len(header) % 8)
+
+        # Write to a temporary file first so a crash never leaves a truncated snapshot behind
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as snapshot_file:
+            snapshot_file.write(SNAPSHOT_MAGIC)
+            snapshot_file.write(len(header).to_bytes(8, 'little'))
+            snapshot_file.write(header)
+            for name in SNAPSHOT_ARRAYS:
+                data = np.ascontiguousarray(arrays[name]).tobytes()
+                snapshot_file.write(data)
+                snapshot_file.write(b'\0' * (-len(data) % 8))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path, source_hash=None):
+        """
+            Memory-map a compiled graph from a binary snapshot file.
+
+            Args:
+                path (str): The snapshot file to read.
+                source_hash (str): If given, the snapshot is rejected unless it was built from this content hash.
+
+            Returns:
+                tuple or None: The CompiledGraph and its node table (list of [IATA, name, city, country]),
+                               or None if the file is missing, invalid or stale.
+        """
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, 'rb') as snapshot_file:
+            if snapshot_file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                return None
+            header_length = int.from_bytes(snapshot_file.read(8), 'little')
+            header = json.loads(snapshot_file.read(header_length).decode('utf-8'))
+
+        if source_hash is not None and header['source_hash'] != source_hash:
+            return None
+
+        data_offset = len(SNAPSHOT_MAGIC) + 8 + header_length
+        arrays = {}
+        for name, (dtype, offset, length) in header['arrays'].items():
+            if length == 0:
+                arrays[name] = np.empty(0, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=data_offset + offset, shape=(length,))
+
+        nodes = header['nodes']
+        compiled = cls([node[0] for node in nodes], arrays['latitude'], arrays['longitude'], arrays['offsets'],
+                       arrays['targets'], arrays['distance'], arrays['cost'], arrays['duration'],
+                       reverse_index=(arrays['reverse_offsets'], arrays['reverse_sources'],
+                                      arrays['reverse_edges']))
+        return compiled, nodes
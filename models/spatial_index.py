@@ -0,0 +1,269 @@
+import heapq
+from math import asin, sin
+import numpy as np
+from utils.calculation_utils import EARTH_RADIUS
+
+# Ranges of at most this many points are scanned instead of split further
+LEAF_SIZE = 8
+
+
+class KDTree:
+    """
+        Static k-d tree over points in any number of dimensions, stored implicitly in one array.
+
+        The points are reordered so that every range ``[start, end)`` of the tree keeps its splitting point at the
+        middle index, the points below the split before it and the points above the split after it. Ranges of
+        up to LEAF_SIZE points are leaves and are scanned. Each range is split on the dimension with the widest
+        spread, which keeps the ranges compact for clustered data such as airports.
+    """
+
+    def __init__(self, points):
+        """
+            Args:
+                points (array-like): The points, one row of coordinates per point.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(len(points), -1)
+        order = np.arange(len(points))
+        self.split_dimensions = {}  # Middle index of a split range -> dimension it is split on
+        self.build(points, order, 0, len(points))
+        self.ids = order.tolist()  # Tree position -> index of the point in the input
+        self.points = points[order].tolist()
+
+    def build(self, points, order, start, end):
+        if end - start <= LEAF_SIZE:
+            return
+        coordinates = points[order[start:end]]
+        dimension = int(np.argmax(coordinates.max(axis=0) - coordinates.min(axis=0)))
+        middle = (start + end) // 2
+        order[start:end] = order[start:end][np.argpartition(coordinates[:, dimension], middle - start)]
+        self.split_dimensions[middle] = dimension
+        self.build(points, order, start, middle)
+        self.build(points, order, middle + 1, end)
+
+    def squared_distance(self, position, point):
+        return sum((a - b) * (a - b) for a, b in zip(self.points[position], point))
+
+    def nearest(self, point, k=1, exclude=()):
+        """
+            Find the k points closest to a point.
+
+            Args:
+                point (sequence): The query coordinates.
+                k (int): The number of points to find.
+                exclude (collection): Indices of points to skip.
+
+            Returns:
+                list: (index, squared distance) pairs of the closest points, closest first.
+        """
+        heap = []  # Max-heap of (-squared distance, index) of the k best points found so far
+
+        def consider(position):
+            if self.ids[position] in exclude:
+                return
+            entry = (-self.squared_distance(position, point), self.ids[position])
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        def visit(start, end):
+            if end - start <= LEAF_SIZE:
+                for position in range(start, end):
+                    consider(position)
+                return
+            middle = (start + end) // 2
+            dimension = self.split_dimensions[middle]
+            consider(middle)
+            difference = point[dimension] - self.points[middle][dimension]
+            near, far = ((middle + 1, end), (start, middle)) if difference > 0 else ((start, middle), (middle + 1, end))
+            visit(*near)
+            # The far side can only hold closer points if the splitting plane is closer than the worst point kept
+            if len(heap) < k or difference * difference < -heap[0][0]:
+                visit(*far)
+
+        if k > 0:
+            visit(0, len(self.points))
+        return [(index, -negative_distance) for negative_distance, index in sorted(heap, reverse=True)]
+
+    def within_distance(self, point, radius):
+        """
+            Find every point within a distance of a point.
+
+            Args:
+                point (sequence): The query coordinates.
+                radius (float): The largest distance.
+
+            Returns:
+                list: (index, squared distance) pairs of the points found, closest first.
+        """
+        squared_radius = radius * radius
+        found = []
+
+        def visit(start, end):
+            if end - start <= LEAF_SIZE:
+                positions = range(start, end)
+            else:
+                middle = (start + end) // 2
+                difference = point[self.split_dimensions[middle]] - self.points[middle][self.split_dimensions[middle]]
+                if difference <= 0 or difference * difference <= squared_radius:
+                    visit(start, middle)
+                if difference >= 0 or difference * difference <= squared_radius:
+                    visit(middle + 1, end)
+                positions = (middle,)
+            for position in positions:
+                squared_distance = self.squared_distance(position, point)
+                if squared_distance <= squared_radius:
+                    found.append((self.ids[position], squared_distance))
+
+        visit(0, len(self.points))
+        found.sort(key=lambda entry: entry[1])
+        return found
+
+    def within_box(self, low, high):
+        """
+            Find every point inside an axis-aligned box.
+
+            Args:
+                low (sequence): The lowest coordinates of the box.
+                high (sequence): The highest coordinates of the box.
+
+            Returns:
+                list of int: Indices of the points inside the box.
+        """
+        found = []
+
+        def inside(position):
+            return all(a <= value <= b for a, value, b in zip(low, self.points[position], high))
+
+        def visit(start, end):
+            if end - start <= LEAF_SIZE:
+                found.extend(self.ids[position] for position in range(start, end) if inside(position))
+                return
+            middle = (start + end) // 2
+            dimension = self.split_dimensions[middle]
+            split = self.points[middle][dimension]
+            if low[dimension] <= split:
+                visit(start, middle)
+            if inside(middle):
+                found.append(self.ids[middle])
+            if high[dimension] >= split:
+                visit(middle + 1, end)
+
+        visit(0, len(self.points))
+        return found
+
+
+def unit_vectors(latitude, longitude):
+    # Points on the unit sphere, where the straight-line (chord) distance grows with the great-circle distance
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    return np.column_stack((np.cos(latitude) * np.cos(longitude), np.cos(latitude) * np.sin(longitude),
+                            np.sin(latitude)))
+
+
+def chord_to_km(squared_chord):
+    return 2 * EARTH_RADIUS * asin(min(1.0, squared_chord ** 0.5 / 2))
+
+
+class SpatialIndex:
+    """
+        Spatial index over airport coordinates for nearest, k-nearest, radius and bounding-box queries.
+
+        Nearest and radius queries run on a k-d tree of the airports as 3D unit vectors, where the chord between
+        two points orders them exactly like the great-circle (haversine) distance and has no seam at the
+        antimeridian or the poles. Bounding-box queries run on a second k-d tree over (latitude, longitude).
+        Every query takes logarithmic time plus the number of airports returned.
+    """
+
+    def __init__(self, iata_codes, latitude, longitude):
+        """
+            Args:
+                iata_codes (list of str): The IATA codes of the airports.
+                latitude (array-like): The latitude of every airport in degrees.
+                longitude (array-like): The longitude of every airport in degrees.
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        # Airports without coordinates cannot be located
+        located = np.isfinite(latitude) & np.isfinite(longitude)
+        self.iata_codes = [code for code, keep in zip(iata_codes, located.tolist()) if keep]
+        self.index = {code: i for i, code in enumerate(self.iata_codes)}
+        self.coordinates = list(zip(latitude[located].tolist(), longitude[located].tolist()))
+        self.sphere_tree = KDTree(unit_vectors(latitude[located], longitude[located]))
+        self.map_tree = KDTree(np.column_stack((latitude[located], longitude[located])))
+
+    @classmethod
+    def from_flight_graph(cls, graph):
+        """
+            Build the index over the airports of a FlightGraph.
+
+            Args:
+                graph (FlightGraph): The flight graph.
+
+            Returns:
+                SpatialIndex: The spatial index.
+        """
+        iata_codes = list(graph.airports)
+        return cls(iata_codes, [graph.airports[code].latitude for code in iata_codes],
+                   [graph.airports[code].longitude for code in iata_codes])
+
+    def nearest(self, latitude, longitude, k=1, exclude=()):
+        """
+            Find the airports closest to a location.
+
+            Args:
+                latitude (float): The latitude of the location in degrees.
+                longitude (float): The longitude of the location in degrees.
+                k (int): The number of airports to find.
+                exclude (collection of str): IATA codes of airports to skip.
+
+            Returns:
+                list: (IATA code, great-circle distance in km) pairs of the closest airports, closest first.
+        """
+        point = unit_vectors([latitude], [longitude])[0].tolist()
+        excluded = {self.index[code] for code in exclude if code in self.index}
+        return [(self.iata_codes[i], chord_to_km(squared_chord))
+                for i, squared_chord in self.sphere_tree.nearest(point, k, excluded)]
+
+    def within_radius(self, latitude, longitude, radius):
+        """
+            Find the airports within a great-circle distance of a location.
+
+            Args:
+                latitude (float): The latitude of the location in degrees.
+                longitude (float): The longitude of the location in degrees.
+                radius (float): The largest distance in km.
+
+            Returns:
+                list: (IATA code, great-circle distance in km) pairs of the airports found, closest first.
+        """
+        point = unit_vectors([latitude], [longitude])[0].tolist()
+        # Chord length of the radius, covering the whole sphere from half its circumference
+        chord = 2 * sin(min(radius / EARTH_RADIUS, np.pi) / 2)
+        return [(self.iata_codes[i], chord_to_km(squared_chord))
+                for i, squared_chord in self.sphere_tree.within_distance(point, chord)]
+
+    def within_bounds(self, south, west, north, east):
+        """
+            Find the airports inside a latitude/longitude box, such as the viewport of a map.
+
+            Longitudes outside [-180, 180] (from a map panned across the antimeridian) are wrapped, and a box
+            with west greater than east is taken to cross the antimeridian.
+
+            Args:
+                south (float): The southern edge in degrees.
+                west (float): The western edge in degrees.
+                north (float): The northern edge in degrees.
+                east (float): The eastern edge in degrees.
+
+            Returns:
+                list of str: IATA codes of the airports inside the box.
+        """
+        if east - west >= 360:
+            boxes = [(-180, 180)]
+        else:
+            west, east = (west + 180) % 360 - 180, (east + 180) % 360 - 180
+            boxes = [(west, east)] if west <= east else [(west, 180), (-180, east)]
+        found = []
+        for box_west, box_east in boxes:
+            found.extend(self.map_tree.within_box((south, box_west), (north, box_east)))
+        return [self.iata_codes[i] for i in found]
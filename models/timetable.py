@@ -0,0 +1,207 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+
+# Columns of a timetable file, one row per scheduled flight
+TIMETABLE_COLUMNS = ['Source Airport IATA', 'Destination Airport IATA', 'Departure Time', 'Arrival Time']
+# One flight from an airport id at a departure time to an airport id at an arrival time, in minutes
+CONNECTION_DTYPE = np.dtype([('departure_stop', np.int32), ('arrival_stop', np.int32),
+                             ('departure_time', np.int32), ('arrival_time', np.int32)])
+
+MINUTES_PER_DAY = 24 * 60
+# Generated departures fall between these minutes of the day (06:00 to 22:00)
+SERVICE_START, SERVICE_END = 6 * 60, 22 * 60
+# Largest number of daily departures of a generated route
+MAX_DAILY_FLIGHTS = 4
+# Generated departure times are multiples of this many minutes
+DEPARTURE_STEP = 5
+# Days covered by a generated timetable, so that journeys can continue the next day
+TIMETABLE_DAYS = 2
+
+
+def parse_time(value):
+    """
+        Convert a time of the timetable to minutes since 00:00 of its first day.
+
+        Args:
+            value (str or int): 'HH:MM', 'HH:MM+D' for D days later, or a number of minutes.
+
+        Returns:
+            int: The minutes since the start of the timetable.
+    """
+    if not isinstance(value, str):
+        return int(value)
+    clock, _, days = value.strip().partition('+')
+    hours, _, minutes = clock.partition(':')
+    if not (hours.isdigit() and minutes.isdigit() and (not days or days.isdigit())) \
+            or int(hours) > 23 or int(minutes) > 59:
+        raise ValueError(f"Invalid time: '{value}'")
+    return int(days or 0) * MINUTES_PER_DAY + int(hours) * 60 + int(minutes)
+
+
+def format_time(minutes):
+    # 'HH:MM' on the first day of the timetable, 'HH:MM+D' on later days
+    days, minutes = divmod(int(minutes), MINUTES_PER_DAY)
+    clock = f"{minutes // 60:02d}:{minutes % 60:02d}"
+    return clock if days == 0 else f"{clock}+{days}"
+
+
+class Timetable:
+    """
+        Scheduled flights stored as one array of connections sorted by departure time, as scanned by the
+        Connection Scan Algorithm.
+
+        Times are whole minutes since 00:00 of the first day. Airports are numbered by the timetable itself,
+        so a timetable does not depend on the compiled graph and can cover airports the routes do not.
+    """
+
+    def __init__(self, iata_codes, connections):
+        """
+            Args:
+                iata_codes (list of str): The IATA code of every airport id used by the connections.
+                connections (numpy.ndarray): The flights, with the fields of CONNECTION_DTYPE, in any order.
+        """
+        self.iata_codes = list(iata_codes)
+        self.index = {code: i for i, code in enumerate(self.iata_codes)}
+        connections = np.asarray(connections, dtype=CONNECTION_DTYPE)
+        # Stable sort, so flights at the same times keep the order they were given in
+        self.connections = connections[np.lexsort((connections['arrival_time'], connections['departure_time']))]
+
+    def __len__(self):
+        return len(self.connections)
+
+    @classmethod
+    def from_flights(cls, sources, destinations, departures, arrivals):
+        """
+            Build a timetable from parallel lists of flights.
+
+            Args:
+                sources (list of str): The IATA code of the source airport of every flight.
+                destinations (list of str): The IATA code of the destination airport of every flight.
+                departures (list of int): The departure time of every flight in minutes.
+                arrivals (list of int): The arrival time of every flight in minutes.
+
+            Returns:
+                Timetable: The timetable.
+        """
+        index = {}
+        for code in list(sources) + list(destinations):
+            index.setdefault(code, len(index))
+        connections = np.empty(len(departures), dtype=CONNECTION_DTYPE)
+        connections['departure_stop'] = [index[code] for code in sources]
+        connections['arrival_stop'] = [index[code] for code in destinations]
+        connections['departure_time'] = departures
+        connections['arrival_time'] = arrivals
+        late = np.flatnonzero(connections['arrival_time'] <= connections['departure_time'])
+        if len(late):
+            flight = late[0]
+            raise ValueError(f"Flight from '{sources[flight]}' to '{destinations[flight]}' does not arrive after "
+                             f"it departs")
+        return cls(list(index), connections)
+
+    @classmethod
+    def generate(cls, graph, days=TIMETABLE_DAYS):
+        """
+            Generate a timetable for the routes of a graph, for when no real timetable is supplied.
+
+            Every route gets 1 to MAX_DAILY_FLIGHTS departures a day, spread over the service hours and repeated
+            every day, and takes the duration of the route. The number and times of the departures come from a
+            hash of the route's IATA codes, so the same routes always give the same timetable.
+
+            Args:
+                graph (FlightGraph): The flight graph.
+                days (int): The number of days to schedule.
+
+            Returns:
+                Timetable: The generated timetable.
+        """
+        sources, destinations, departures, arrivals = [], [], [], []
+        for source_airport, airport in graph.airports.items():
+            for route in airport.routes:
+                digest = hashlib.sha256(f"{source_airport}-{route.destination_airport}".encode('utf-8')).digest()
+                daily_flights = 1 + digest[0] % MAX_DAILY_FLIGHTS
+                slot = (SERVICE_END - SERVICE_START) / daily_flights
+                duration = max(1, round(route.get_weight('duration') * 60))
+                for flight in range(daily_flights):
+                    # A departure somewhere in the flight's share of the service hours
+                    minute = SERVICE_START + int(slot * (flight + digest[flight + 1] / 256))
+                    minute -= minute % DEPARTURE_STEP
+                    for day in range(days):
+                        departure = day * MINUTES_PER_DAY + minute
+                        sources.append(source_airport)
+                        destinations.append(route.destination_airport)
+                        departures.append(departure)
+                        arrivals.append(departure + duration)
+        return cls.from_flights(sources, destinations, departures, arrivals)
+
+    @classmethod
+    def load(cls, path):
+        """
+            Read a timetable file with the TIMETABLE_COLUMNS, times written as 'HH:MM' or 'HH:MM+D'.
+
+            Args:
+                path (str): The file to read.
+
+            Returns:
+                Timetable or None: The timetable, or None if the file is missing.
+        """
+        if not os.path.isfile(path):
+            return None
+        flights_df = pd.read_csv(path, usecols=TIMETABLE_COLUMNS, dtype=str)
+        return cls.from_flights(flights_df[TIMETABLE_COLUMNS[0]].tolist(), flights_df[TIMETABLE_COLUMNS[1]].tolist(),
+                                [parse_time(value) for value in flights_df[TIMETABLE_COLUMNS[2]].tolist()],
+                                [parse_time(value) for value in flights_df[TIMETABLE_COLUMNS[3]].tolist()])
+
+    def save(self, path):
+        """
+            Write the timetable to a file that load reads back.
+
+            Args:
+                path (str): The file to write.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connections = self.connections
+        pd.DataFrame({
+            TIMETABLE_COLUMNS[0]: [self.iata_codes[stop] for stop in connections['departure_stop'].tolist()],
+            TIMETABLE_COLUMNS[1]: [self.iata_codes[stop] for stop in connections['arrival_stop'].tolist()],
+            TIMETABLE_COLUMNS[2]: [format_time(time) for time in connections['departure_time'].tolist()],
+            TIMETABLE_COLUMNS[3]: [format_time(time) for time in connections['arrival_time'].tolist()],
+        }).to_csv(path, index=False)
+
+    def get_journey_information(self, journey):
+        """
+            Describe a journey in the form of FlightGraph.get_route_information, with the scheduled times.
+
+            Args:
+                journey (list of int): The indices of the connections taken, in order.
+
+            Returns:
+                dict: The path, the segments with their departure and arrival times, duration and layover (the
+                      wait for the next flight) in hours, and the departure, arrival, number of stops, total
+                      duration from departure to arrival and total layover time of the journey.
+        """
+        flights = self.connections[journey]
+        segments = []
+        for i, (departure_stop, arrival_stop, departure, arrival) in enumerate(flights.tolist()):
+            layover = (int(flights['departure_time'][i + 1]) - arrival) / 60 if i < len(flights) - 1 else 0
+            segments.append({
+                "from": self.iata_codes[departure_stop],
+                "to": self.iata_codes[arrival_stop],
+                "departure": format_time(departure),
+                "arrival": format_time(arrival),
+                "duration": (arrival - departure) / 60,
+                "layover": layover
+            })
+        departure, arrival = int(flights['departure_time'][0]), int(flights['arrival_time'][-1])
+        return {
+            "path": [segment["from"] for segment in segments] + [segments[-1]["to"]],
+            "segments": segments,
+            "departure": format_time(departure),
+            "arrival": format_time(arrival),
+            "total_stops": len(segments) - 1,
+            "total_duration": (arrival - departure) / 60,
+            "total_layover_time": sum(segment["layover"] for segment in segments)
+        }
@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flight_graph import DATA_DIRECTORY, DATASETS, FlightGraph  # noqa: E402
+
+
+def build_europe_graph(compiled=False):
+    # A new graph of the europe dataset for every test, instead of the shared graph of get_graph, so tests can
+    # change it and do not write snapshots
+    airports_file, flights_file = DATASETS['europe']
+    return FlightGraph(os.path.join(DATA_DIRECTORY, airports_file), os.path.join(DATA_DIRECTORY, flights_file),
+                       compiled=compiled)
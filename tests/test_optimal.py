@@ -0,0 +1,49 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from europe_graph import build_europe_graph  # noqa: E402
+
+
+class OptimalRouteTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_europe_graph()
+
+    def test_direct_flight_is_optimal(self):
+        # The direct flight, not the longer LHR-ZRH-SPU-ATH connection that is only a little cheaper
+        self.assertEqual(self.graph.find_route('LHR', 'ATH', 'optimal')["path"], ['LHR', 'ATH'])
+
+    def test_compiled_graph_gives_same_routes(self):
+        # Both graphs are new, so every route is searched rather than read from the route cache
+        compiled_graph = build_europe_graph(compiled=True)
+        self.assertIsNone(self.graph.get_compiled())
+        self.assertIsNotNone(compiled_graph.get_compiled())
+        destinations = sorted(self.graph.airports)[::20]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for source_airport in ['LHR', 'ATH', 'REG']:
+                for destination_airport in destinations:
+                    if destination_airport == source_airport:
+                        continue
+                    with self.subTest(source=source_airport, destination=destination_airport):
+                        route = self.graph.find_route(source_airport, destination_airport, 'optimal')
+                        compiled_route = compiled_graph.find_route(source_airport, destination_airport, 'optimal')
+                        self.assertEqual(route and route["path"], compiled_route and compiled_route["path"])
+
+    def test_find_routes_searches_optimal_separately(self):
+        routes = self.graph.find_routes('LHR', 'ATH', ["optimal", "least cost"])
+        self.assertEqual(routes["optimal"]["path"], ['LHR', 'ATH'])
+        self.assertEqual(routes["least cost"], self.graph.find_route('LHR', 'ATH', "least cost"))
+
+    def test_path_weight_queries_reject_optimal(self):
+        with self.assertRaises(ValueError):
+            next(self.graph.find_alternative_routes('LHR', 'ATH', 'optimal'))
+        with self.assertRaises(ValueError):
+            self.graph.find_constrained_routes('LHR', 'optimal', max_stops=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
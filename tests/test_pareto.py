@@ -0,0 +1,37 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from europe_graph import build_europe_graph  # noqa: E402
+
+# Weight of a route information minimised by every criteria on the front
+CRITERIA_WEIGHTS = {
+    "shortest distance": lambda route: round(route["total_distance"], 6),
+    "least cost": lambda route: round(route["total_cost"], 6),
+    "shortest duration": lambda route: round(route["total_duration"] + route["total_layover_time"], 6),
+    "least layovers": lambda route: route["total_stops"],
+}
+
+
+class ParetoRoutesTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_europe_graph(compiled=True)
+
+    def test_front_holds_the_best_route_of_every_criteria(self):
+        for source_airport, destination_airport in [('LHR', 'ATH'), ('REG', 'OSL'), ('AMS', 'SUF')]:
+            front = self.graph.find_pareto_routes(source_airport, destination_airport)
+            self.assertTrue(front)
+            for criteria, weight in CRITERIA_WEIGHTS.items():
+                with self.subTest(source=source_airport, destination=destination_airport, criteria=criteria):
+                    route = self.graph.find_route(source_airport, destination_airport, criteria)
+                    self.assertEqual(min(weight(entry) for entry in front), weight(route))
+
+    def test_unreachable_destination_has_empty_front(self):
+        # No flights arrive at Crotone (CRV)
+        self.assertEqual(self.graph.find_pareto_routes('LHR', 'CRV'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
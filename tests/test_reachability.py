@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import unittest
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from europe_graph import build_europe_graph  # noqa: E402
+from algorithms.reachability import ReachabilityIndex  # noqa: E402
+
+# Largest number of flights with k-hop tables in the index under test
+MAX_FLIGHTS = 3
+
+
+def flights_from(compiled, source):
+    # Fewest flights from an airport id to every airport id it reaches, by breadth first search
+    offsets, targets = compiled.offsets.tolist(), compiled.targets.tolist()
+    flights = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for edge in range(offsets[node], offsets[node + 1]):
+            if targets[edge] not in flights:
+                flights[targets[edge]] = flights[node] + 1
+                queue.append(targets[edge])
+    return flights
+
+
+class ReachabilityIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_europe_graph(compiled=True)
+        self.index = self.graph.prepare_reachability(max_flights=MAX_FLIGHTS)
+        self.compiled = self.graph.get_compiled()
+
+    def test_index_matches_breadth_first_search(self):
+        nodes = range(self.compiled.node_count)
+        for source in nodes[::7]:
+            flights = flights_from(self.compiled, source)
+            with self.subTest(source=self.compiled.iata_codes[source]):
+                self.assertEqual([self.index.reachable(source, target) for target in nodes],
+                                 [target in flights for target in nodes])
+                for max_flights in range(MAX_FLIGHTS + 1):
+                    self.assertEqual([self.index.within_flights(source, target, max_flights) for target in nodes],
+                                     [flights.get(target, max_flights + 1) <= max_flights for target in nodes])
+
+    def test_index_survives_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reachability.npz')
+            self.index.save(path)
+            loaded = ReachabilityIndex.load(path, build_europe_graph(compiled=True).get_compiled())
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.components.tolist(), self.index.components.tolist())
+        self.assertEqual(loaded.reach.tolist(), self.index.reach.tolist())
+        self.assertEqual(loaded.hops.tolist(), self.index.hops.tolist())
+
+    def test_unreachable_destination_is_ruled_out(self):
+        # No flights arrive at Crotone (CRV)
+        self.assertIs(self.graph.is_reachable('LHR', 'CRV'), False)
+        self.assertIs(self.graph.is_reachable('LHR', 'ATH'), True)
+        self.graph.add_flight_route('SUF', 'CRV', 60, 50, 0.5)
+        # The index belongs to the graph before the route was added
+        self.assertIsNone(self.graph.is_reachable('LHR', 'CRV'))
+
+
+if __name__ == '__main__':
+    unittest.main()
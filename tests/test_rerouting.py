@@ -0,0 +1,50 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from europe_graph import build_europe_graph  # noqa: E402
+
+CRITERIA = ["optimal", "shortest distance", "least cost", "shortest duration", "least layovers"]
+
+
+class ReroutingTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_europe_graph()
+
+    def test_reroutes_to_nearest_reachable_airport(self):
+        # No flights arrive at Crotone (CRV), Lamezia Terme (SUF) is the nearest airport that LHR reaches
+        for criteria in CRITERIA:
+            with self.subTest(criteria=criteria):
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    route = self.graph.find_route('LHR', 'CRV', criteria)
+                self.assertEqual(route["path"][0], 'LHR')
+                self.assertEqual(route["path"][-1], 'SUF')
+                self.assertIn("Rerouting to nearest airport SUF.", output.getvalue())
+
+    def test_repeated_query_reports_rerouting_again(self):
+        # Rerouted routes are not answered from the route cache, which would skip the messages
+        for _ in range(2):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                route = self.graph.find_route('LHR', 'CRV', 'least cost')
+            self.assertEqual(route["path"][-1], 'SUF')
+            self.assertIn("Flights to 'CRV' do not exist", output.getvalue())
+            self.assertIn("Rerouting to nearest airport SUF.", output.getvalue())
+        self.graph.find_route('LHR', 'ATH', 'least cost')
+        self.graph.find_route('LHR', 'ATH', 'least cost')
+        self.assertEqual(self.graph.route_cache.hits, 1)
+
+    def test_alternatives_are_ranked_by_distance(self):
+        alternatives = self.graph.find_reroute_alternatives('LHR', 'CRV', 'least cost')
+        self.assertEqual(alternatives[0]["airport"], 'SUF')
+        distances = [alternative["distance_from_destination"] for alternative in alternatives]
+        self.assertEqual(distances, sorted(distances))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from europe_graph import build_europe_graph  # noqa: E402
+from models.airport import AirportNode  # noqa: E402
+
+
+class RoutesToTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_europe_graph()
+        self.graph.dijkstra.search_mode = 'bidirectional'
+
+    def test_added_route_is_searched_backwards(self):
+        # No flights arrive at Crotone (CRV) until one is added from Lamezia Terme (SUF)
+        self.graph.add_flight_route('SUF', 'CRV', 60, 50, 0.5)
+        self.assertEqual([route.source_airport for route in self.graph.get_routes_to('CRV')], ['SUF'])
+        route = self.graph.find_route('LHR', 'CRV', 'shortest distance')
+        self.assertEqual(route["path"][-2:], ['SUF', 'CRV'])
+
+    def test_replaced_airport_routes_are_dropped(self):
+        self.graph.add_flight_route('SUF', 'CRV', 60, 50, 0.5)
+        airport = self.graph.airports['SUF']
+        self.graph.add_airport('SUF', AirportNode('SUF', airport.name, airport.city, airport.country,
+                                                  airport.latitude, airport.longitude))
+        self.assertEqual(self.graph.get_routes_to('CRV'), [])
+        with contextlib.redirect_stdout(io.StringIO()):
+            route = self.graph.find_route('LHR', 'CRV', 'shortest distance')
+        self.assertNotEqual(route["path"][-1], 'CRV')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,11 @@
 from math import radians, sin, cos, asin, sqrt, ceil
+import numpy as np
+
+EARTH_RADIUS = 6371  # radius of earth in kilometers
+BASE_COST = 25  # base cost of flights ($)
+MIN_COST_PER_KM = 0.19  # cost per kilometre of the cheapest (shortest) flights
+BASE_DURATION = 1  # hours to account for pre-flight/taxiing
+FLIGHT_SPEED = 800  # average flight speed (km/h)
 
 
 def haversine_formula_distance(lat1, lon1, lat2, lon2):
@@ -9,18 +16,30 @@ def haversine_formula_distance(lat1, lon1, lat2, lon2):
     dlat = lat2 - lat1
     a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
     c = 2 * asin(sqrt(a))
-    r = 6371  # radius of earth in kilometers
+    r = EARTH_RADIUS  # radius of earth in kilometers
+    return c * r
+
+
+def haversine_formula_distance_array(lat1, lon1, lat2, lon2):
+    # Vectorized haversine formula over arrays of coordinates (in degrees), returns kilometres
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arcsin(np.sqrt(a))
+    r = EARTH_RADIUS  # radius of earth in kilometers
     return c * r
 
 
 # function to calculate flight cost based on the distance in kilometres
 def calculate_flight_cost(distance):
-    base_cost = 25  # set the base cost of flights to be $25
+    base_cost = BASE_COST  # set the base cost of flights to be $25
     cost_per_km = 0  # initialise a cost per kilometre that would change based on the distance travelled
 
     if distance < 600:
         # Shortest flights (under 600km)
-        cost_per_km = 0.19
+        cost_per_km = MIN_COST_PER_KM
     elif distance < 1000:
         # Short haul (600km to under 1000km)
         cost_per_km = 0.2
@@ -36,6 +55,13 @@ def calculate_flight_cost(distance):
     return ceil(total_cost)  # return the total cost rounded up to the nearest whole number
 
 
+def calculate_flight_cost_array(distance):
+    # Vectorized calculate_flight_cost over an array of distances
+    distance = np.asarray(distance, dtype=np.float64)
+    cost_per_km = np.select([distance < 600, distance < 1000, distance < 1500], [MIN_COST_PER_KM, 0.2, 0.22], 0.25)
+    return np.ceil(BASE_COST + distance * cost_per_km).astype(np.int64)
+
+
 def calculate_flight_duration(distance):
     """Calculates the estimated flight duration in hours based on distance.
 
@@ -58,8 +84,8 @@ def calculate_flight_duration(distance):
         - The base_duration is an estimate and may vary depending on the airport and flight.
     """
 
-    base_duration = 1  # Hours to account for pre-flight/taxiing (adjust if needed)
-    flight_speed = 800  # Average flight speed (km/h) - adjust for a more accurate estimate
+    base_duration = BASE_DURATION  # Hours to account for pre-flight/taxiing (adjust if needed)
+    flight_speed = FLIGHT_SPEED  # Average flight speed (km/h) - adjust for a more accurate estimate
 
     # Calculate total flight time based on distance and average speed
     flight_duration = base_duration + (distance / flight_speed)
@@ -67,6 +93,11 @@ def calculate_flight_duration(distance):
     return flight_duration
 
 
+def calculate_flight_duration_array(distance):
+    # Vectorized calculate_flight_duration over an array of distances
+    return BASE_DURATION + np.asarray(distance, dtype=np.float64) / FLIGHT_SPEED
+
+
 def format_duration(duration):
     # get the hours and minutes taken
     hours = int(duration)